@@ -1,108 +1,247 @@
+import numpy as np
 import pandas as pd
-import plotly.express as px
-from typing import List, Tuple
-from utilities.is_relevant import is_relevant_chart_query
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from typing import List, Optional, Tuple
+from Visualizations import charts
+from Visualizations import distributions as dist
+from Visualizations import downsampling as ds
+from Visualizations import profiling
+from utilities.arrow_results import arrow_available, arrow_to_dataframe, pa
+from utilities.tracing import span
 
 
-def to_dataframe(rows: List[Tuple], columns: List[str]) -> pd.DataFrame:
-    return pd.DataFrame(rows, columns=columns)
+def to_dataframe(rows: List[Tuple], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    with span("dataframe_build"):
+        # Arrow results from the SQL layer become Arrow-backed frames without a row copy
+        if arrow_available() and isinstance(rows, pa.Table):
+            return arrow_to_dataframe(rows)
+        return pd.DataFrame(rows, columns=columns)
 
 
 def get_common_layout(title: str):
-    return dict(
-        title=dict(text=title, x=0.5, xanchor='center'),
-        template="plotly_dark",  # Try "simple_white" for a light theme
-        margin=dict(l=40, r=40, t=60, b=40),
-        font=dict(family="Segoe UI", size=14),
-        hoverlabel=dict(bgcolor="black", font_size=13, font_family="Segoe UI"),
-        plot_bgcolor="#111111",
-        paper_bgcolor="#111111"
-    )
+    # Styling lives in the registered chat template, see Visualizations/charts.py
+    return dict(title_text=title, template=charts.CHAT_TEMPLATE)
 
 
 def plot_univariate(df: pd.DataFrame, column: str):
     title = f"Distribution of {column}" if pd.api.types.is_numeric_dtype(df[column]) else f"Frequency of {column}"
     
     if pd.api.types.is_numeric_dtype(df[column]):
-        fig = px.histogram(
-            df,
-            x=column,
-            marginal="box",
-            nbins=30,
-            color_discrete_sequence=['#00CC96'],
-            opacity=0.85
-        )
-        fig.update_traces(
-        selector=dict(type='box'),
-        line=dict(color="white", width=2),
-        fillcolor='rgba(0,204,150,0.2)',  
-        marker=dict(color="white")
-    )
+        fig = plot_binned_distribution(df[column], column)
     else:
-        vc = df[column].value_counts().reset_index()
-        vc.columns = [column, "count"]
-        fig = px.bar(
-            vc,
-            x=column,
-            y="count",
-            labels={column: column, "count": "Count"},
-            color_discrete_sequence=['#636EFA']
-        )
+        vc = dist.top_counts(df[column])
+        fig = charts.bar_chart(vc, column, "count", text=False, template=charts.CHAT_TEMPLATE,
+                               labels={"count": "Count"})
     
     fig.update_layout(**get_common_layout(title))
     return fig
 
 
+def plot_binned_distribution(series: pd.Series, column: str) -> go.Figure:
+    """Histogram with a box marginal, drawn from bin counts and quartiles instead of raw values"""
+    values = dist.finite_values(series)
+    counts, edges = dist.histogram_counts(values)
+    stats = dist.box_stats(values)
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.03)
+    fig.add_trace(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        marker_color='#00CC96',
+        opacity=0.85,
+        name=column,
+        showlegend=False
+    ), row=2, col=1)
+    if stats:
+        fig.add_trace(go.Box(
+            y=[column],
+            q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+            lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+            mean=[stats["mean"]],
+            orientation='h',
+            line=dict(color="white", width=2),
+            fillcolor='rgba(0,204,150,0.2)',
+            marker=dict(color="white"),
+            showlegend=False
+        ), row=1, col=1)
+    fig.update_yaxes(showticklabels=False, row=1, col=1)
+    fig.update_yaxes(title_text="count", row=2, col=1)
+    fig.update_xaxes(title_text=column, row=2, col=1)
+    return fig
+
+
 def plot_bivariate(df: pd.DataFrame, x: str, y: str):
     title = f"{y} vs {x}"
     
     if pd.api.types.is_numeric_dtype(df[x]) and pd.api.types.is_numeric_dtype(df[y]):
-        fig = px.scatter(df, x=x, y=y, color_discrete_sequence=["#AB63FA"])
+        fig = plot_numeric_pair(df, x, y)
     elif pd.api.types.is_numeric_dtype(df[y]):
-        fig = px.box(df, x=x, y=y, color_discrete_sequence=["#EF553B"])
+        # One precomputed box per category instead of shipping every value
+        stats = dist.grouped_box_stats(df, x, y)
+        fig = go.Figure(go.Box(
+            x=stats[x], q1=stats["q1"], median=stats["median"], q3=stats["q3"],
+            lowerfence=stats["lowerfence"], upperfence=stats["upperfence"], mean=stats["mean"],
+            marker_color="#EF553B", name=y
+        ))
+        fig.update_xaxes(title_text=x)
+        fig.update_yaxes(title_text=y)
     else:
-        fig = px.histogram(df, x=x, color=y, barmode='group')
+        x_keys = df[x]
+        if pd.api.types.is_numeric_dtype(x_keys):  # numeric x is binned, as the histogram did
+            x_keys = pd.cut(x_keys.astype("float64"), bins=dist.HISTOGRAM_BINS)
+        counts = df.groupby([x_keys, df[y]], observed=True).size().reset_index(name="count")
+        counts[x] = counts[x].astype(str)
+        fig = charts.bar_chart(counts, x, "count", color=y, text=False, barmode="group",
+                               template=charts.CHAT_TEMPLATE)
 
     fig.update_layout(**get_common_layout(title))
     return fig
 
 
+def plot_numeric_pair(df: pd.DataFrame, x: str, y: str) -> go.Figure:
+    """Scatter for small results; LTTB line for large ordered series, binned density otherwise"""
+    if len(df) <= ds.SCATTER_MAX_POINTS and not (len(df) > ds.SERIES_MAX_POINTS and df[x].is_monotonic_increasing):
+        fig = go.Figure(go.Scatter(x=df[x], y=df[y], mode="markers", marker_color="#AB63FA"))
+        fig.update_xaxes(title_text=x)
+        fig.update_yaxes(title_text=y)
+        return fig
+
+    xs, ys = ds.numeric_values(df[x]), ds.numeric_values(df[y])
+    valid = ~(np.isnan(xs) | np.isnan(ys))
+    xs, ys = xs[valid], ys[valid]
+
+    if df[x].is_monotonic_increasing:
+        keep = ds.lttb(xs, ys, ds.SERIES_MAX_POINTS)
+        fig = go.Figure(go.Scattergl(x=xs[keep], y=ys[keep], mode="lines", line=dict(color="#AB63FA")))
+        note = f"LTTB downsampled: {len(keep):,} of {len(df):,} points"
+    else:
+        counts, x_centres, y_centres = ds.bin_2d(xs, ys)
+        fig = go.Figure(go.Heatmap(z=counts, x=x_centres, y=y_centres, colorscale="Viridis",
+                                   colorbar=dict(title="rows")))
+        note = f"{len(df):,} points binned into a {ds.SCATTER_BINS}x{ds.SCATTER_BINS} density grid"
+    fig.update_xaxes(title_text=x)
+    fig.update_yaxes(title_text=y)
+    return ds.annotate_reduction(fig, note)
+
+
 def plot_multivariate(df: pd.DataFrame, dimensions: List[str]):
+    full_rows = len(df)
+    limit = ds.SCATTER_3D_MAX_POINTS if len(dimensions) == 3 else ds.PARALLEL_MAX_ROWS
+    if len(dimensions) >= 3 and full_rows > limit:
+        df = ds.stratified_sample(df, dimensions[0], limit)
+
     if len(dimensions) == 3:
-        fig = px.scatter_3d(
-            df,
-            x=dimensions[0],
-            y=dimensions[1],
-            z=dimensions[2],
-            color=dimensions[0],
-            opacity=0.7
-        )
+        x, y, z = dimensions
+        fig = go.Figure(go.Scatter3d(
+            x=df[x], y=df[y], z=df[z],
+            mode="markers",
+            marker=dict(color=df[x], colorscale="Plasma", colorbar=dict(title=x), opacity=0.7)
+        ))
+        fig.update_layout(scene=dict(xaxis_title=x, yaxis_title=y, zaxis_title=z))
         fig.update_layout(**get_common_layout(f"3D Plot: {dimensions}"))
     elif len(dimensions) > 3:
-        fig = px.parallel_coordinates(df, dimensions=dimensions, color=df[dimensions[0]])
+        fig = go.Figure(go.Parcoords(
+            line=dict(color=df[dimensions[0]], colorscale="Plasma", showscale=True),
+            dimensions=[dict(label=d, values=df[d]) for d in dimensions]
+        ))
         fig.update_layout(**get_common_layout("Parallel Coordinates Plot"))
     else:
         print("Need at least 3 columns for multivariate plot")
         return
+    if len(df) < full_rows:
+        ds.annotate_reduction(fig, f"Stratified sample by {dimensions[0]}: {len(df):,} of {full_rows:,} rows")
     return fig
 
 
+def plot_time_series(df: pd.DataFrame, time_col: str, measures: List[str]) -> go.Figure:
+    """One line per measure over time, LTTB-downsampled per line for long series"""
+    times = df[time_col]
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times.astype(str), format="ISO8601", errors="coerce")
+    order = np.argsort(times.to_numpy(dtype="datetime64[ns]"), kind="stable")
+    xs = times.to_numpy(dtype="datetime64[ns]")[order]
+    valid_time = ~np.isnat(xs)
+
+    fig = go.Figure(layout=dict(template=charts.CHAT_TEMPLATE))
+    reduced = False
+    for measure in measures:
+        ys = ds.numeric_values(df[measure])[order]
+        valid = valid_time & ~np.isnan(ys)
+        x, y = xs[valid], ys[valid]
+        keep = ds.lttb(x.astype(np.int64).astype(np.float64), y, ds.SERIES_MAX_POINTS)
+        reduced = reduced or len(keep) < len(x)
+        fig.add_trace(go.Scattergl(x=x[keep], y=y[keep], mode="lines", name=measure))
+    fig.update_xaxes(title_text=time_col)
+    fig.update_yaxes(title_text=measures[0] if len(measures) == 1 else "value")
+    fig.update_layout(**get_common_layout(f"{', '.join(measures)} over {time_col}"))
+    if reduced:
+        ds.annotate_reduction(fig, f"LTTB downsampled to {ds.SERIES_MAX_POINTS:,} points per line")
+    return fig
+
+
+def plot_grouped_bar(df: pd.DataFrame, category: str, measures: List[str]) -> go.Figure:
+    """Measures per category; averaged when a category spans several rows"""
+    data = df[[category] + measures].copy()
+    data[category] = data[category].astype(str)
+    repeated = data[category].duplicated().any()
+    if repeated:
+        data = data.groupby(category, sort=False)[measures].mean().reset_index()
+    data = data.sort_values(measures[0], ascending=False).head(dist.TOP_CATEGORIES)
+    long = data.melt(id_vars=category, value_vars=measures, var_name="measure", value_name="value")
+    fig = charts.bar_chart(long, category, "value", color="measure" if len(measures) > 1 else None,
+                           text=False, barmode="group", template=charts.CHAT_TEMPLATE)
+    label = "mean " if repeated else ""
+    fig.update_layout(**get_common_layout(f"{label}{', '.join(measures)} by {category}"))
+    return fig
+
+
+def plot_heatmap(df: pd.DataFrame, x: str, y: str, value: Optional[str] = None) -> go.Figure:
+    """Category x category grid of row counts, or of the mean of `value`"""
+    keys = pd.DataFrame({x: df[x].astype(str), y: df[y].astype(str)})
+    if value is None:
+        grid = keys.groupby([y, x]).size().unstack(fill_value=0)
+        colorbar = "rows"
+    else:
+        keys[value] = df[value].to_numpy(dtype=np.float64, na_value=np.nan)
+        grid = keys.groupby([y, x])[value].mean().unstack()
+        colorbar = f"mean {value}"
+    fig = go.Figure(go.Heatmap(z=grid.to_numpy(), x=grid.columns, y=grid.index, colorscale="Viridis",
+                               colorbar=dict(title=colorbar)))
+    fig.update_xaxes(title_text=x, type="category")
+    fig.update_yaxes(title_text=y, type="category")
+    fig.update_layout(**get_common_layout(f"{colorbar} by {y} and {x}"))
+    return fig
+
+
+def plot_from_profile(df: pd.DataFrame) -> List[go.Figure]:
+    """Charts chosen from the column profile; empty when the table says it best"""
+    kind, columns = profiling.choose_chart(profiling.profile_columns(df))
+    if kind == "time_series":
+        return [plot_time_series(df, columns[0], columns[1:])]
+    if kind == "grouped_bar":
+        return [plot_grouped_bar(df, columns[0], columns[1:])]
+    if kind == "heatmap":
+        return [plot_heatmap(df, *columns)]
+    if kind == "univariate":
+        return [plot_univariate(df, columns[0])]
+    if kind == "bivariate":
+        return [plot_bivariate(df, *columns)]
+    if kind == "multivariate":
+        return [plot_multivariate(df, columns)]
+    return []
+
+
 def auto_visualize(df: pd.DataFrame, query: str):
+    with span("chart_build", rows=len(df)):
+        return _auto_visualize(df, query)
+
+
+def _auto_visualize(df: pd.DataFrame, query: str):
+    # Imported here so the plotting helpers load without the embedding models
+    from utilities.is_relevant import is_relevant_chart_query
     if is_relevant_chart_query(query):
-        figs = []
-        numeric = df.select_dtypes(include='number').columns.tolist()
-        
-        if len(numeric) == 1:
-            figs.append(plot_univariate(df, numeric[0]))
-        elif len(numeric) == 2:
-            figs.append(plot_bivariate(df, numeric[0], numeric[1]))
-        elif len(numeric) >= 3:
-            figs.append(plot_multivariate(df, numeric[:4]))  # choose first 4 numeric cols
-        else:
-            for col in df.columns:
-                if not pd.api.types.is_numeric_dtype(df[col]):
-                    figs.append(plot_univariate(df, col))
-                    break
-        return figs
+        return plot_from_profile(df)
     else:
         return None
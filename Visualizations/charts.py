@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from typing import Dict, List, Optional
+
+# Themes are registered once as Plotly templates, figures only reference them by
+# name instead of rebuilding and merging the same layout dict for every chart.
+DASHBOARD_TEMPLATE = "logbot_dashboard"
+CHAT_TEMPLATE = "logbot_chat"
+COLORWAY = ["#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A",
+            "#19D3F3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52"]  # px.colors.qualitative.Plotly
+TREND_COLOR = "#FFA15A"
+BUBBLE_MAX_SIZE = 20  # px.scatter default size_max
+
+
+def _register(name: str, **layout) -> None:
+    template = go.layout.Template(pio.templates["plotly_dark"])
+    template.layout.update(colorway=COLORWAY, **layout)
+    pio.templates[name] = template
+
+
+_register(
+    DASHBOARD_TEMPLATE,
+    margin=dict(l=20, r=20, t=60, b=20),
+    font=dict(family="Segoe UI", size=12),
+    plot_bgcolor="#0E1117",
+    paper_bgcolor="#0E1117",
+    hoverlabel=dict(bgcolor="#1F2C40", font_size=12),
+)
+_register(
+    CHAT_TEMPLATE,
+    title=dict(x=0.5, xanchor="center"),
+    margin=dict(l=40, r=40, t=60, b=40),
+    font=dict(family="Segoe UI", size=14),
+    hoverlabel=dict(bgcolor="black", font_size=13, font_family="Segoe UI"),
+    plot_bgcolor="#111111",
+    paper_bgcolor="#111111",
+)
+
+
+def new_figure(title: Optional[str] = None, template: str = DASHBOARD_TEMPLATE, data=None) -> go.Figure:
+    """Empty figure on a registered template"""
+    return go.Figure(data=data, layout=dict(template=template, title=dict(text=title) if title else None))
+
+
+def _groups(df: pd.DataFrame, color: Optional[str]):
+    """(name, rows) per trace, one trace per value of `color` like px does"""
+    if color is None or color not in df.columns:
+        return [(None, df)]
+    return [(str(key), rows) for key, rows in df.groupby(color, sort=False, observed=True)]
+
+
+def _axis_titles(fig: go.Figure, x: str, y: str, labels: Optional[Dict[str, str]] = None) -> go.Figure:
+    labels = labels or {}
+    fig.update_layout(xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y))
+    return fig
+
+
+def line_chart(df: pd.DataFrame, x: str, y: str, title: str = None, color: str = None,
+               trend_window: int = 7, template: str = DASHBOARD_TEMPLATE) -> go.Figure:
+    """Spline line with markers, plus a rolling average when there are enough points"""
+    groups = _groups(df, color)
+    fig = new_figure(title, template, [
+        go.Scatter(x=rows[x], y=rows[y], name=name, mode="lines+markers",
+                   line=dict(shape="spline"), showlegend=name is not None)
+        for name, rows in groups
+    ])
+    if trend_window and len(df) > trend_window:
+        fig.add_trace(go.Scatter(
+            x=df[x],
+            y=df[y].rolling(trend_window, min_periods=1).mean(),
+            name=f"{trend_window}-point Avg",
+            line=dict(color=TREND_COLOR, dash="dot")
+        ))
+    return _axis_titles(fig, x, y)
+
+
+def bar_chart(df: pd.DataFrame, x: str, y: str, title: str = None, color: str = None, text: bool = True,
+              barmode: str = "relative", template: str = DASHBOARD_TEMPLATE,
+              labels: Optional[Dict[str, str]] = None) -> go.Figure:
+    """Bars, one trace per `color` value, optionally labelled with their values"""
+    groups = _groups(df, color)
+    fig = new_figure(title, template, [
+        go.Bar(x=rows[x], y=rows[y], name=name, showlegend=name is not None,
+               text=rows[y] if text else None,
+               texttemplate="%{text:,}" if text else None,
+               textposition="outside" if text else None)
+        for name, rows in groups
+    ])
+    fig.update_layout(barmode=barmode)
+    return _axis_titles(fig, x, y, labels)
+
+
+def pie_chart(df: pd.DataFrame, names: str, values: str, title: str = None, hole: float = 0.4,
+              template: str = DASHBOARD_TEMPLATE) -> go.Figure:
+    """Donut chart"""
+    return new_figure(title, template, [go.Pie(labels=df[names], values=df[values], hole=hole)])
+
+
+def bubble_chart(df: pd.DataFrame, x: str, y: str, size: str, color: str = None, hover_name: str = None,
+                 hover_data: Optional[List[str]] = None, log_x: bool = False,
+                 labels: Optional[Dict[str, str]] = None, title: str = None,
+                 template: str = DASHBOARD_TEMPLATE) -> go.Figure:
+    """Scatter with marker area proportional to `size`, the dashboard's entity comparison chart"""
+    labels = labels or {}
+    extra = [x, y, size] + list(hover_data or [])
+    hovertemplate = "<br>".join(
+        f"{labels.get(col, col)}=%{{customdata[{i}]}}" for i, col in enumerate(extra)
+    )
+    if hover_name:
+        hovertemplate = "<b>%{hovertext}</b><br><br>" + hovertemplate
+    max_size = df[size].max() if len(df) else 1
+    sizeref = 2.0 * (max_size or 1) / BUBBLE_MAX_SIZE ** 2
+
+    fig = new_figure(title, template, [
+        go.Scatter(
+            x=rows[x], y=rows[y], name=name, mode="markers", showlegend=name is not None,
+            marker=dict(size=rows[size], sizemode="area", sizeref=sizeref, sizemin=0),
+            hovertext=rows[hover_name] if hover_name else None,
+            customdata=np.column_stack([rows[col].to_numpy(dtype=object) for col in extra]),
+            hovertemplate=hovertemplate + "<extra></extra>",
+        )
+        for name, rows in _groups(df, color)
+    ])
+    if log_x:
+        fig.update_xaxes(type="log")
+    return _axis_titles(fig, x, y, labels)
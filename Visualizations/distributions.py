@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+
+# Distribution charts are drawn from these aggregates, never from raw rows,
+# so the payload is O(bins) / O(categories) whatever the result size.
+HISTOGRAM_BINS = 30
+TOP_CATEGORIES = 30
+OTHER_LABEL = "Other"
+
+
+def finite_values(series: pd.Series) -> np.ndarray:
+    """Float64 NumPy array of the non-null values of a numeric column"""
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[np.isfinite(values)]
+
+
+def histogram_counts(values: np.ndarray, bins: int = HISTOGRAM_BINS) -> Tuple[np.ndarray, np.ndarray]:
+    """Bin counts and edges in one vectorized pass"""
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(1)
+    return np.histogram(values, bins=bins)
+
+
+def box_stats(values: np.ndarray) -> Dict[str, float]:
+    """Quartiles, Tukey fences and mean, enough for Plotly to draw a box without the points"""
+    if len(values) == 0:
+        return {}
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        "q1": q1, "median": median, "q3": q3,
+        "lowerfence": inside.min(), "upperfence": inside.max(),
+        "mean": values.mean(),
+    }
+
+
+def grouped_box_stats(df: pd.DataFrame, by: str, column: str) -> pd.DataFrame:
+    """box_stats for every group of `by`, computed with grouped quantiles"""
+    data = pd.DataFrame({by: df[by].astype(str), column: df[column].to_numpy(dtype=np.float64, na_value=np.nan)})
+    data = data.dropna()
+    quartiles = data.groupby(by)[column].quantile([0.25, 0.5, 0.75]).unstack()
+    quartiles.columns = ["q1", "median", "q3"]
+    data = data.join(quartiles, on=by)
+    iqr = data["q3"] - data["q1"]
+    inside = data[(data[column] >= data["q1"] - 1.5 * iqr) & (data[column] <= data["q3"] + 1.5 * iqr)]
+    fences = inside.groupby(by)[column].agg(lowerfence="min", upperfence="max")
+    means = data.groupby(by)[column].mean().rename("mean")
+    return quartiles.join(fences).join(means).reset_index()
+
+
+def top_counts(series: pd.Series, limit: int = TOP_CATEGORIES) -> pd.DataFrame:
+    """Value counts of the `limit` most frequent categories, the rest folded into Other"""
+    counts = series.dropna().astype(str).value_counts()
+    if len(counts) > limit:
+        other = counts.iloc[limit:].sum()
+        counts = pd.concat([counts.iloc[:limit], pd.Series({OTHER_LABEL: other})])
+    return counts.rename_axis(series.name).reset_index(name="count")
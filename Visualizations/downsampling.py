@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from typing import Tuple
+
+# Above these sizes charts are built from a reduced version of the result,
+# Plotly JSON grows linearly with the points shipped to the browser.
+SERIES_MAX_POINTS = 5_000      # ordered x: LTTB keeps the visual shape of the line
+SCATTER_MAX_POINTS = 20_000    # unordered x/y: 2D binned density instead of points
+SCATTER_3D_MAX_POINTS = 10_000
+PARALLEL_MAX_ROWS = 5_000
+SCATTER_BINS = 100
+STRATA = 10
+SEED = 0
+
+
+def numeric_values(series: pd.Series) -> np.ndarray:
+    """Float64 NumPy view of a numeric (possibly Arrow-backed) or datetime column"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("int64").to_numpy(dtype=np.float64)
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of n_out points keeping the series shape"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 buckets between the ends
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        keep[i + 1] = a
+    return keep
+
+
+def bin_2d(x: np.ndarray, y: np.ndarray, bins: int = SCATTER_BINS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Counts on a bins x bins grid plus the bin centres, for a density heatmap"""
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    return counts.T, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+
+
+def stratified_sample(df: pd.DataFrame, column: str, n: int, strata: int = STRATA, seed: int = SEED) -> pd.DataFrame:
+    """About n rows, proportional per quantile stratum of column so tails are kept"""
+    if len(df) <= n:
+        return df
+    rng = np.random.default_rng(seed)
+    groups = pd.qcut(numeric_values(df[column]), q=strata, labels=False, duplicates="drop")
+    groups = np.nan_to_num(groups, nan=-1)
+    picked = []
+    for g in np.unique(groups):
+        idx = np.flatnonzero(groups == g)
+        take = max(1, round(len(idx) * n / len(df)))
+        picked.append(rng.choice(idx, size=min(take, len(idx)), replace=False))
+    return df.iloc[np.sort(np.concatenate(picked))]
+
+
+def annotate_reduction(fig: go.Figure, text: str) -> go.Figure:
+    """Small note on the chart saying what was done to the data"""
+    fig.add_annotation(
+        text=f"ⓘ {text}", xref="paper", yref="paper", x=0, y=1.0, yanchor="bottom",
+        showarrow=False, font=dict(size=11, color="#A0AEC0"),
+    )
+    return fig
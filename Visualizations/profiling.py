@@ -0,0 +1,97 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+
+# Chart choice is driven by a per-column profile. Big results are profiled on
+# evenly spaced rows, so the cost is bounded whatever the result size and the
+# sample keeps the original row order for the monotonicity check.
+PROFILE_SAMPLE_ROWS = 50_000
+TIMESTAMP_PROBE_ROWS = 200
+TIMESTAMP_MIN_PARSED = 0.9
+MAX_BAR_CATEGORIES = 30
+MAX_MEASURES = 3
+ID_NAME = re.compile(r"(^|_)(id|uuid|key)$|^(request|trace|session|user)_?id", re.IGNORECASE)
+CODE_NAME = re.compile(r"(^|_)(code|status|port|level)$", re.IGNORECASE)  # integer labels, not quantities
+ISO_PREFIX = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+PROFILE_COLUMNS = ["column", "kind", "cardinality", "unique_ratio", "monotonic", "is_id"]
+
+
+def sample_rows(df: pd.DataFrame, limit: int = PROFILE_SAMPLE_ROWS) -> pd.DataFrame:
+    """Evenly spaced rows, order preserved"""
+    if len(df) <= limit:
+        return df
+    return df.iloc[np.linspace(0, len(df) - 1, limit).astype(np.int64)]
+
+
+def _looks_like_timestamp(values: pd.Series) -> bool:
+    probe = values.dropna().head(TIMESTAMP_PROBE_ROWS).astype(str)
+    if probe.empty or not probe.str.match(ISO_PREFIX).all():
+        return False
+    parsed = pd.to_datetime(probe, format="ISO8601", errors="coerce")
+    return parsed.notna().mean() >= TIMESTAMP_MIN_PARSED
+
+
+def _kind(series: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    if pd.api.types.is_bool_dtype(series):
+        return "categorical"
+    if pd.api.types.is_numeric_dtype(series):
+        if pd.api.types.is_integer_dtype(series) and CODE_NAME.search(str(series.name)):
+            return "categorical"
+        return "numeric"
+    if _looks_like_timestamp(series):
+        return "datetime"
+    return "categorical"
+
+
+def profile_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per column: kind, cardinality, unique ratio, monotonicity and id-likeness"""
+    sample = sample_rows(df)
+    cardinality = sample.nunique(dropna=True)
+    non_null = sample.notna().sum().clip(lower=1)
+    rows = []
+    for position, column in enumerate(sample.columns):
+        series = sample.iloc[:, position]
+        kind = _kind(series)
+        unique_ratio = float(cardinality.iloc[position] / non_null.iloc[position])
+        monotonic = bool(series.is_monotonic_increasing or series.is_monotonic_decreasing) if len(series) > 1 else False
+        is_id = bool(ID_NAME.search(str(column))) and kind != "datetime"
+        if kind == "numeric" and not is_id and len(series) > MAX_BAR_CATEGORIES:
+            # Row numbers and surrogate keys: distinct integers densely covering a range.
+            # The sample always holds the first and last row, so the span is exact.
+            if pd.api.types.is_integer_dtype(series) and unique_ratio == 1.0 and monotonic:
+                is_id = abs(int(series.iloc[-1]) - int(series.iloc[0])) == len(df) - 1
+        elif kind == "categorical" and unique_ratio > 0.95 and len(series) > MAX_BAR_CATEGORIES:
+            is_id = True  # free text or identifiers, nothing to group by
+        rows.append((column, kind, int(cardinality.iloc[position]), unique_ratio, monotonic, is_id))
+    return pd.DataFrame(rows, columns=PROFILE_COLUMNS)
+
+
+def choose_chart(profile: pd.DataFrame) -> Tuple[str, List[str]]:
+    """(chart kind, columns) for a profiled result; "table" when nothing is worth plotting"""
+    usable = profile[~profile["is_id"] & (profile["cardinality"] > 1)]
+    times = usable[usable["kind"] == "datetime"]["column"].tolist()
+    measures = usable[usable["kind"] == "numeric"]["column"].tolist()
+    categories = (usable[(usable["kind"] == "categorical") & (usable["cardinality"] <= MAX_BAR_CATEGORIES)]
+                  .sort_values("cardinality", kind="stable")["column"].tolist())
+
+    if times and measures:
+        return "time_series", [times[0]] + measures[:MAX_MEASURES]
+    if categories and measures:
+        if len(categories) >= 2 and len(measures) == 1:
+            return "heatmap", categories[:2] + measures
+        return "grouped_bar", [categories[0]] + measures[:MAX_MEASURES]
+    if len(categories) >= 2:
+        return "heatmap", categories[:2]
+    if len(measures) == 1:
+        return "univariate", measures
+    if len(measures) == 2:
+        return "bivariate", measures
+    if len(measures) >= 3:
+        return "multivariate", measures[:4]
+    if categories:
+        return "univariate", categories[:1]
+    return "table", []
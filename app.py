@@ -12,21 +12,45 @@ from Visualizations.AutoVisualizer import to_dataframe, auto_visualize
 from sql_LLM import run_sql_llm,general_answers
 from utilities.is_relevant import is_relevant_log_query_zero_shot,is_relevant_chart_query,is_relevant_log_query_pre_trained
 import re
+import time
 import torch
 import monitor
+from utilities.tracing import RERUN_STAGE, record, span, trace
+from utilities.result_store import ResultStore
+from utilities.llm import LOCAL_PROVIDERS, PROVIDER, warm_up
+from utilities.templates import match_question
+from utilities.trail import describe, request_trail, trail_question
 torch.classes.__path__ = [] # add this line to manually set it to empty.
+EAGER_RESULTS = 2  # most recent assistant results rendered without expanding
 # Can you get the correlation between the users and the success rate of the status code
 
+@st.cache_resource
+def warm_local_llm() -> float:
+    """Load the local model once per server process, before the first question"""
+    return warm_up()
+
+
 st.sidebar.title("Navigation")
-app_mode = st.sidebar.selectbox("Choose the app mode", ["Chatbot", "Monitoring Dashboard"])
+if PROVIDER in LOCAL_PROVIDERS:
+    with st.spinner(f"Loading local {PROVIDER} model..."):
+        st.sidebar.caption(f"🧠 Local {PROVIDER} model ready ({warm_local_llm():.1f}s to load)")
+app_mode = st.sidebar.selectbox("Choose the app mode", ["Chatbot", "Monitoring Dashboard", "Pipeline Latency"])
 
 if app_mode == "Chatbot":
     st.title("Logbot - Your Log Assistant")
 
 
-    # Keep track of chat history
+    # Keep track of chat history, DataFrames and figures live in the result store
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    if "result_store" not in st.session_state:
+        st.session_state.result_store = ResultStore()
+    store = st.session_state.result_store
+
+    def add_turn(question, answer, df=None, figs=None):
+        st.session_state.chat_history.append({"role": "user", "text": question})
+        ref = store.put(df, figs) if df is not None or figs else None
+        st.session_state.chat_history.append({"role": "assistant", "text": answer, "result": ref})
 
     # Text input area styled like a chatbot prompt
     user_input = st.chat_input("Ask me anything about your logs")
@@ -34,56 +58,68 @@ if app_mode == "Chatbot":
 
     # Handle input
     if user_input:
-        with st.spinner("Thinking real hard..."):
+        with st.spinner("Thinking real hard..."), trace("chat"):
             try:
-                if is_relevant_log_query_pre_trained(user_input):
-                    result = run_sql_llm(user_input)
-                    print(result['query'])  # For debugging
-                    df = to_dataframe(result['result'], result['columns'])
-
-                    # Save to chat history
-                    st.session_state.chat_history.append({
-                        "role": "user", "text": user_input
-                    })
-                    st.session_state.chat_history.append({
-                        "role": "assistant", "text": result['answer'], "df": df ,"figs": auto_visualize(df, user_input)
-                    })
+                # Messages that only name req-xxxxxxxx ids get their trail straight from the index, no LLM call
+                trail_ids = trail_question(user_input)
+                if trail_ids:
+                    with span("trail_lookup", ids=len(trail_ids)):
+                        trail = request_trail(trail_ids)
+                    add_turn(user_input, describe(trail, trail_ids), trail)
                 else:
-                    st.session_state.chat_history.append({
-                        "role": "user", "text": user_input
-                    })
-                    
-                    st.session_state.chat_history.append({
-                        "role": "assistant", "text": general_answers(user_input), "df": None , "figs": None
-                    })
+                    with span("relevance"):
+                        # A question a template recognises is a log question, no classifier call needed
+                        is_log_query = (match_question(user_input) is not None
+                                        or is_relevant_log_query_pre_trained(user_input))
+                    if is_log_query:
+                        result = run_sql_llm(user_input)
+                        print(result['query'])  # For debugging
+                        df = to_dataframe(result['result'], result['columns'])
+                        add_turn(user_input, result['answer'], df, auto_visualize(df, user_input))
+                    else:
+                        add_turn(user_input, general_answers(user_input))
 
             except Exception as e:
-                st.session_state.chat_history.append({
-                    "role": "user", "text": user_input
-                })
-                st.session_state.chat_history.append({
-                    "role": "assistant", "text":general_answers(e,"error"), "df": None , "figs": None
-                })
+                add_turn(user_input, general_answers(e, "error"))
+
+    def show_result(i, ref):
+        result = store.get(ref)
+        if result["df"] is not None:
+            st.subheader("📊 Result Table")
+            st.dataframe(result["df"], use_container_width=True)
+
+        if result["figs"]:  # ✅ Show stored figures if any
+            st.subheader("📈 Auto Visualization")
+            for j, fig in enumerate(result["figs"]):
+                st.plotly_chart(fig, use_container_width=True, key=f"plot_{i}_{j}")
 
     # ✅ Display chat history once, at the bottom
+    render_start = time.perf_counter()
+    with_results = [i for i, entry in enumerate(st.session_state.chat_history) if entry.get("result")]
+    eager = set(with_results[-EAGER_RESULTS:])
     for i, entry in enumerate(st.session_state.chat_history):
         if entry["role"] == "user":
             message(entry["text"], is_user=True, key=f"user_{i}")
         else:
             message(entry["text"], key=f"assistant_{i}")
-            if entry.get("df") is not None:
-                st.subheader("📊 Result Table")
-                st.dataframe(entry["df"], use_container_width=True)
+            if not entry.get("result"):
+                continue
+            # Older results are collapsed and only loaded back when opened
+            if i in eager or st.toggle("Show table and charts", key=f"expand_{i}"):
+                show_result(i, entry["result"])
 
-            if entry.get("figs"):  # ✅ Show stored figures if any
-                st.subheader("📈 Auto Visualization")
-                for j, fig in enumerate(entry["figs"]):
-                    st.plotly_chart(fig, use_container_width=True, key=f"plot_{i}_{j}")
+    # Only after a question: widget clicks rerun the page too, and a span per click would swamp the trace table
+    if user_input:
+        record(RERUN_STAGE, (time.perf_counter() - render_start) * 1000,
+               turns=len(st.session_state.chat_history) // 2)
 
 
 elif app_mode == "Monitoring Dashboard":
     monitor.main() 
 
+elif app_mode == "Pipeline Latency":
+    monitor.pipeline_latency_page()
+
 
 
 
@@ -0,0 +1,67 @@
+"""
+Anomaly detector throughput on synthetic access and VPC logs.
+
+    python -m benchmarks.bench_anomalies --rows 10000000
+
+Rows per table; a brute-force burst is injected and must come out on top.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utilities.anomalies import detect
+
+ATTACKER = "attacker"
+ATTACK_IP = "45.227.253.109"
+
+
+def make_frames(rows: int, days: int = 90, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2025-01-01T00:00:00")
+    seconds = rng.integers(0, days * 86_400, rows)
+    timestamps = pd.Series(start + seconds.astype("timedelta64[s]"))
+    users = [f"user_{i}" for i in range(5_000)]
+    ips = [f"10.{i // 250}.{i % 250}.1" for i in range(20_000)]
+    access = pd.DataFrame({
+        "timestamp": timestamps,
+        "user_id": pd.Categorical.from_codes(rng.integers(0, len(users), rows), users),
+        "status_code": rng.choice([200, 201, 204, 301, 400, 401, 403, 404, 500], rows,
+                                  p=[.5, .15, .1, .05, .05, .05, .04, .04, .02]),
+    })
+    vpc = pd.DataFrame({
+        "timestamp": timestamps,
+        "src_ip": pd.Categorical.from_codes(rng.integers(0, len(ips), rows), ips),
+        "action": rng.choice(["ACCEPT", "REJECT", "DROP"], rows, p=[.9, .07, .03]),
+        "bytes_sent": rng.integers(500, 10_000, rows),
+    })
+
+    # 80 failed logins in 24 seconds, the pattern create_logs_db.py injects
+    burst = pd.Series(start + (days // 2 * 86_400 + np.arange(80) * 0.3).astype("timedelta64[s]"))
+    access = pd.concat([access, pd.DataFrame({"timestamp": burst, "user_id": ATTACKER, "status_code": 401})],
+                       ignore_index=True)
+    vpc = pd.concat([vpc, pd.DataFrame({"timestamp": burst, "src_ip": ATTACK_IP, "action": "REJECT",
+                                        "bytes_sent": 300})], ignore_index=True)
+    access["user_id"] = access["user_id"].astype("category")
+    vpc["src_ip"] = vpc["src_ip"].astype("category")
+    return access, vpc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    access, vpc = make_frames(args.rows)
+    start = time.perf_counter()
+    alerts = detect(access, vpc)
+    seconds = time.perf_counter() - start
+    total = len(access) + len(vpc)
+    print(f"{total:,} rows scored in {seconds:.2f}s ({total / seconds / 1e6:.1f}M rows/s), {len(alerts):,} alerts")
+    print(alerts.head(10).to_string(index=False))
+    assert {ATTACKER, ATTACK_IP} <= set(alerts["entity"].head(10)), "injected burst not in the top alerts"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare the tuple based result path against the Arrow path on a large result.
+
+    python -m benchmarks.bench_arrow_results --rows 1000000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utilities.arrow_results import arrow_to_dataframe, query_arrow, pa
+
+QUERY = "SELECT timestamp, user_id, duration_ms, bytes_sent, status FROM bench_logs"
+
+
+def build_db(path: str, rows: int) -> None:
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE bench_logs (
+            timestamp TEXT, user_id TEXT, duration_ms INTEGER, bytes_sent REAL, status TEXT
+        )
+    """)
+    base = np.datetime64("2025-04-01T00:00:00")
+    chunk = 200_000
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        ts = (base + np.arange(start, start + n).astype("timedelta64[s]")).astype(str)
+        users = np.char.add("user_", rng.integers(1, 500, n).astype(str))
+        duration = rng.integers(50, 2000, n).astype(object)
+        duration[rng.random(n) < 0.05] = None  # nullable numeric column
+        sent = rng.random(n) * 10000
+        status = rng.choice(["SUCCESS", "FAILED", "TIMEOUT"], n)
+        conn.executemany(
+            "INSERT INTO bench_logs VALUES (?, ?, ?, ?, ?)",
+            zip(ts.tolist(), users.tolist(), duration.tolist(), sent.tolist(), status.tolist()),
+        )
+    conn.commit()
+    conn.close()
+
+
+def tuple_path(conn: sqlite3.Connection) -> pd.DataFrame:
+    """The original path: fetchall -> DataFrame -> replace NaN with None"""
+    cursor = conn.execute(QUERY)
+    rows = cursor.fetchall()
+    columns = [d[0] for d in cursor.description]
+    return pd.DataFrame(rows, columns=columns).replace({np.nan: None})
+
+
+def arrow_path(conn: sqlite3.Connection) -> pd.DataFrame:
+    return arrow_to_dataframe(query_arrow(conn, QUERY))
+
+
+def measure(name: str, fn, conn: sqlite3.Connection) -> dict:
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = fn(conn)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "path": name,
+        "seconds": round(elapsed, 3),
+        "python_peak_mb": round(peak / 2**20, 1),
+        "arrow_mb": round((pa.total_allocated_bytes() - arrow_before) / 2**20, 1),
+        "frame_mb": round(float(df.memory_usage(deep=True).sum()) / 2**20, 1),
+        "dtypes": ", ".join(str(t) for t in df.dtypes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_db(path, args.rows)
+        conn = sqlite3.connect(path)
+        for name, fn in (("tuples", tuple_path), ("arrow", arrow_path)):
+            result = measure(name, fn, conn)
+            print(result)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
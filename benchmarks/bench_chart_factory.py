@@ -0,0 +1,134 @@
+"""
+Figure construction time of the dashboard's charts: plotly.express plus a
+per-figure layout merge (the previous approach) vs the shared go-based factory
+on a registered template.
+
+    python -m benchmarks.bench_chart_factory --repeat 20
+
+Only construction is timed, serialisation is the same for both.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from Visualizations import charts
+
+LAYOUT = dict(
+    template="plotly_dark",
+    margin=dict(l=20, r=20, t=60, b=20),
+    font=dict(family="Segoe UI", size=12),
+    plot_bgcolor="#0E1117",
+    paper_bgcolor="#0E1117",
+    hoverlabel=dict(bgcolor="#1F2C40", font_size=12),
+)
+
+
+def px_line(df, x, y, title, color=None):
+    fig = px.line(df, x=x, y=y, title=title, color=color, line_shape="spline", markers=True,
+                  color_discrete_sequence=px.colors.qualitative.Plotly)
+    fig.update_layout(**LAYOUT)
+    if len(df) > 7:
+        fig.add_trace(go.Scatter(x=df[x], y=df[y].rolling(7, min_periods=1).mean(), name="7-day Avg",
+                                 line=dict(color="#FFA15A", dash="dot")))
+    return fig
+
+
+def px_bar(df, x, y, title, color=None):
+    fig = px.bar(df, x=x, y=y, title=title, color=color, text=y,
+                 color_discrete_sequence=px.colors.qualitative.Plotly)
+    fig.update_layout(**LAYOUT)
+    fig.update_traces(texttemplate="%{text:,}", textposition="outside")
+    return fig
+
+
+def px_pie(df, names, values, title):
+    fig = px.pie(df, names=names, values=values, title=title, hole=0.4,
+                 color_discrete_sequence=px.colors.qualitative.Plotly)
+    fig.update_layout(**LAYOUT)
+    return fig
+
+
+def px_bubble(df, x, y, size, color=None, hover_name=None, hover_data=None, log_x=False, labels=None):
+    fig = px.scatter(df, x=x, y=y, size=size, color=color, hover_name=hover_name, hover_data=hover_data,
+                     log_x=log_x, labels=labels)
+    fig.update_layout(**LAYOUT)
+    return fig
+
+
+def make_data() -> dict:
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2025-01-01", periods=30).strftime("%Y-%m-%d")
+    endpoints = [f"/api/v1/resource{i}" for i in range(20)]
+    return {
+        "trend": pd.DataFrame({
+            "date": days, "requests": rng.integers(1_000, 5_000, 30), "latency": rng.gamma(5, 40, 30),
+            "success_rate": rng.uniform(90, 100, 30), "daily_users": rng.integers(50, 300, 30),
+        }),
+        "endpoints": pd.DataFrame({
+            "endpoint": endpoints, "method": rng.choice(["GET", "POST", "PUT"], 20),
+            "requests": rng.integers(100, 10_000, 20), "avg_duration": rng.gamma(5, 40, 20),
+            "success_rate": rng.uniform(80, 100, 20),
+        }),
+        "status": pd.DataFrame({"status": ["SUCCESS", "ERROR", "TIMEOUT"], "count": [9_000, 700, 300]}),
+        "ips": pd.DataFrame({
+            "src_ip": [f"10.0.0.{i}" for i in range(25)], "request_count": rng.integers(100, 5_000, 25),
+            "error_rate": rng.uniform(0, 60, 25), "users_affected": rng.integers(1, 40, 25),
+            "endpoints_accessed": rng.integers(1, 20, 25),
+        }),
+        "users": pd.DataFrame({
+            "user_id": [f"user_{i}" for i in range(50)], "active_days": rng.integers(2, 30, 50),
+            "total_requests": rng.integers(10, 2_000, 50), "success_rate": rng.uniform(70, 100, 50),
+        }),
+        "stages": pd.DataFrame({
+            "stage": np.repeat(["schema_fetch", "sql_generation", "sql_execution", "summary"], 3),
+            "percentile": ["p50_ms", "p95_ms", "p99_ms"] * 4, "latency_ms": rng.gamma(5, 100, 12).round(1),
+        }),
+    }
+
+
+def dashboard(d: dict, line, bar, pie, bubble) -> list:
+    """The ~12 figures one full dashboard render builds"""
+    return [
+        line(d["trend"], "date", "requests", "Request Volume"),
+        line(d["trend"], "date", "latency", "Latency Trend"),
+        line(d["trend"], "date", "success_rate", "Success Rate Trend"),
+        line(d["trend"], "date", "daily_users", "Daily Active Users"),
+        bar(d["endpoints"].head(10), "endpoint", "requests", "Top Endpoints by Request Count", "method"),
+        bubble(d["endpoints"], "avg_duration", "success_rate", "requests", color="endpoint",
+               hover_name="endpoint", log_x=True),
+        bar(d["status"], "status", "count", "Execution Status"),
+        pie(d["status"], "status", "count", "Status Distribution"),
+        bubble(d["ips"], "request_count", "error_rate", "users_affected", color="src_ip",
+               hover_name="src_ip", hover_data=["endpoints_accessed"], log_x=True),
+        bar(d["users"].head(10), "user_id", "total_requests", "Top Users by Request Volume"),
+        bubble(d["users"], "active_days", "success_rate", "total_requests", color="user_id", hover_name="user_id"),
+        bar(d["stages"], "stage", "latency_ms", "Latency per Stage", "percentile"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    data = make_data()
+    builders = {
+        "px + layout": (px_line, px_bar, px_pie, px_bubble),
+        "go factory": (charts.line_chart, charts.bar_chart, charts.pie_chart, charts.bubble_chart),
+    }
+    print(f"{'builder':<12} {'charts':>6} {'ms/dashboard':>13} {'ms/chart':>9}")
+    for name, fns in builders.items():
+        dashboard(data, *fns)  # warm up template and validator caches
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            figs = dashboard(data, *fns)
+        ms = (time.perf_counter() - start) * 1000 / args.repeat
+        print(f"{name:<12} {len(figs):>6} {ms:>13.1f} {ms / len(figs):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Subnet queries on VPC logs: text matching against the integer IP index.
+
+    python -m benchmarks.bench_cidr --rows 10000000
+
+Generates --rows VPC rows and runs each subnet query three ways: string
+matching on src_ip (LIKE for octet-aligned blocks), IN_CIDR(src_ip, block)
+per row, and a src_ip_int range on the covering index. Counts must agree.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from typing import Optional
+
+from benchmarks.bench_e2e import DATASET_DAYS, DATASET_END
+from utilities.cidr import PRIVATE_RANGES, cidr_condition, ensure_ip_indexes, with_ip_columns
+from utilities.sketches import register_sql_functions
+
+# (label, blocks, LIKE condition when the blocks are octet-aligned)
+SUBNETS = [
+    ("10.0.0.0/24", ["10.0.0.0/24"], "src_ip LIKE '10.0.0.%'"),
+    ("10.0.0.0/28", ["10.0.0.0/28"], None),
+    ("45.227.253.0/24", ["45.227.253.0/24"], "src_ip LIKE '45.227.253.%'"),
+    ("private ranges", list(PRIVATE_RANGES), "(src_ip LIKE '10.%' OR src_ip LIKE '192.168.%' OR "
+                                              "src_ip GLOB '172.1[6-9].*' OR src_ip GLOB '172.2[0-9].*' OR "
+                                              "src_ip GLOB '172.3[01].*')"),
+]
+SHAPES = {
+    "count": "SELECT COUNT(*) FROM vpc_logs WHERE {}",
+    "by_action": "SELECT action, COUNT(*), SUM(bytes_sent) FROM vpc_logs WHERE {} GROUP BY action ORDER BY action",
+}
+
+
+def build(path: str, rows: int, workers: int) -> None:
+    """VPC rows only, with the integer IP columns"""
+    from utilities.create_logs_db import generate
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        for frames in generate(rows, DATASET_END - timedelta(days=DATASET_DAYS), DATASET_END, workers=workers):
+            with_ip_columns({"vpc_logs": frames["vpc_logs"]})["vpc_logs"].to_sql(
+                "vpc_logs", conn, if_exists="append", index=False, chunksize=100_000)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def timed(conn: sqlite3.Connection, query: str, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = conn.execute(query).fetchall()
+        timings.append(time.perf_counter() - started)
+    return result, statistics.median(timings) * 1000
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000, help="VPC rows")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="logbot-cidr-") as workdir:
+        path = os.path.join(workdir, "vpc.db")
+        print(f"⏳ Generating {args.rows:,} VPC rows...")
+        build(path, args.rows, args.workers)
+        conn = register_sql_functions(sqlite3.connect(path))
+        try:
+            started = time.perf_counter()
+            ensure_ip_indexes(conn)
+            print(f"📊 Integer IP indexes built in {time.perf_counter() - started:.1f}s, "
+                  f"database {os.path.getsize(path) / 2 ** 20:,.0f} MiB")
+            print(f"   {'subnet':<18} {'query':<10} {'rows':>10} {'text ms':>9} {'IN_CIDR ms':>11} {'index ms':>9} "
+                  f"{'speedup':>8}")
+            for label, blocks, like in SUBNETS:
+                in_cidr = "(" + " OR ".join(f"IN_CIDR(src_ip, '{block}')" for block in blocks) + ")"
+                for shape, template in SHAPES.items():
+                    indexed, index_ms = timed(conn, template.format(cidr_condition(blocks)), args.repeat)
+                    by_function, function_ms = timed(conn, template.format(in_cidr), 1)
+                    text, text_ms = timed(conn, template.format(like), args.repeat) if like else (indexed, None)
+                    if not indexed == by_function == text:
+                        raise SystemExit(f"❌ {label} {shape}: results differ")
+                    baseline = text_ms if text_ms is not None else function_ms
+                    rows = sum(row[1] for row in indexed) if shape == "by_action" else indexed[0][0]
+                    text_cell = f"{text_ms:>9.1f}" if text_ms is not None else f"{'-':>9}"
+                    print(f"   {label:<18} {shape:<10} {rows:>10,} {text_cell} {function_ms:>11.1f} {index_ms:>9.1f} "
+                          f"{baseline / index_ms:>7.1f}x")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
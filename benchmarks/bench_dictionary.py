@@ -0,0 +1,110 @@
+"""
+Database size and aggregate query time, plain against dictionary-encoded.
+
+    python -m benchmarks.bench_dictionary --rows 1000000
+
+Generates the same --rows rows per table twice, plain and with --encode,
+both with their usual indexes, then reports the file size, the bytes in
+the log tables and their covering indexes, and the median time of each
+aggregate on both. Results must agree.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from benchmarks.bench_e2e import DATASET_DAYS, DATASET_END
+from utilities.sketches import register_sql_functions
+
+# Aggregates over the encoded columns, shaped like the dashboard's and the SQL prompt's queries
+QUERIES = {
+    "requests per endpoint": "SELECT endpoint, COUNT(*) FROM access_logs GROUP BY endpoint",
+    "top error users": "SELECT user_id, COUNT(*) AS n FROM access_logs WHERE status_code >= 400 "
+                       "GROUP BY user_id ORDER BY n DESC, user_id LIMIT 10",
+    "method x status": "SELECT method, status_code, COUNT(*) FROM access_logs GROUP BY method, status_code",
+    "latency per function": "SELECT function_name, status, COUNT(*), AVG(duration_ms) FROM execution_logs "
+                            "GROUP BY function_name, status",
+    "bytes per action": "SELECT action, COUNT(*), SUM(bytes_sent) FROM vpc_logs GROUP BY action",
+    "one endpoint": "SELECT COUNT(*) FROM access_logs WHERE endpoint = '/api/admin'",
+    "failed executions": "SELECT COUNT(*) FROM execution_logs WHERE status = 'FAILED'",
+    "no encoded column": "SELECT COUNT(*), AVG(status_code) FROM access_logs WHERE timestamp >= '2025-03-01'",
+}
+
+
+def build(path: str, rows: int, workers: int, encoded: bool) -> None:
+    from utilities.create_logs_db import SqliteSink, generate
+    sink = SqliteSink(path, sketches=False, encoded=encoded)
+    try:
+        for frames in generate(rows, DATASET_END - timedelta(days=DATASET_DAYS), DATASET_END, workers=workers):
+            sink.write(frames)
+    finally:
+        sink.close()
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")  # compare the data, not leftovers of the bulk load
+    conn.close()
+
+
+def log_bytes(conn: sqlite3.Connection) -> Optional[Dict[str, int]]:
+    """Bytes in the log tables (data tables and dictionaries when encoded) and in their B-tree indexes"""
+    try:
+        rows = conn.execute(
+            "SELECT m.type, SUM(s.pgsize) FROM dbstat AS s JOIN sqlite_master AS m ON m.name = s.name "
+            "WHERE m.tbl_name GLOB '*_logs' OR m.tbl_name GLOB '*_logs_data' OR m.tbl_name GLOB 'dict_*' "
+            "GROUP BY m.type").fetchall()
+    except sqlite3.OperationalError:  # SQLite built without the dbstat table
+        return None
+    return dict(rows)
+
+
+def timed(conn: sqlite3.Connection, query: str, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = conn.execute(query).fetchall()
+        timings.append(time.perf_counter() - started)
+    return sorted(result, key=repr), statistics.median(timings) * 1000
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows per table")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="logbot-dictionary-") as workdir:
+        paths = {layout: os.path.join(workdir, f"{layout}.db") for layout in ("plain", "encoded")}
+        for layout, path in paths.items():
+            print(f"⏳ Generating {args.rows:,} rows per table, {layout}...")
+            build(path, args.rows, args.workers, layout == "encoded")
+        conns = {layout: register_sql_functions(sqlite3.connect(path)) for layout, path in paths.items()}
+        try:
+            print(f"📊 {'':<22} {'plain':>10} {'encoded':>10} {'change':>8}")
+            sizes = {layout: os.path.getsize(path) for layout, path in paths.items()}
+            breakdown = {layout: log_bytes(conn) or {} for layout, conn in conns.items()}
+            for label, plain, encoded in [
+                ("file MiB", sizes["plain"], sizes["encoded"]),
+                ("log tables MiB", breakdown["plain"].get("table"), breakdown["encoded"].get("table")),
+                ("log indexes MiB", breakdown["plain"].get("index"), breakdown["encoded"].get("index")),
+            ]:
+                if plain and encoded:
+                    print(f"   {label:<22} {plain / 2 ** 20:>10.1f} {encoded / 2 ** 20:>10.1f} "
+                          f"{encoded / plain - 1:>+8.0%}")
+            print(f"   {'query ms':<22} {'plain':>10} {'encoded':>10} {'change':>8}")
+            for name, query in QUERIES.items():
+                plain, plain_ms = timed(conns["plain"], query, args.repeat)
+                encoded, encoded_ms = timed(conns["encoded"], query, args.repeat)
+                if plain != encoded:
+                    raise SystemExit(f"❌ {name}: results differ")
+                print(f"   {name:<22} {plain_ms:>10.1f} {encoded_ms:>10.1f} {encoded_ms / plain_ms - 1:>+8.0%}")
+        finally:
+            for conn in conns.values():
+                conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Payload size and build time of AutoVisualizer charts with and without reduction.
+
+    python -m benchmarks.bench_downsampling --rows 500000
+
+Build time covers figure construction plus JSON serialisation, which is what
+Streamlit ships to the browser; browser render time scales with the payload.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from Visualizations import downsampling as ds
+from Visualizations.AutoVisualizer import plot_bivariate, plot_multivariate
+
+CASES = {
+    "ordered series": lambda df: plot_bivariate(df, "t", "latency"),
+    "scatter": lambda df: plot_bivariate(df, "bytes", "latency"),
+    "scatter 3d": lambda df: plot_multivariate(df, ["latency", "bytes", "status"]),
+    "parallel coords": lambda df: plot_multivariate(df, ["latency", "bytes", "status", "t"]),
+}
+LIMITS = ("SERIES_MAX_POINTS", "SCATTER_MAX_POINTS", "SCATTER_3D_MAX_POINTS", "PARALLEL_MAX_ROWS")
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    t = np.arange(rows)
+    return pd.DataFrame({
+        "t": t,
+        "latency": 500 + 200 * np.sin(t / 5000) + rng.gamma(2, 50, rows),
+        "bytes": rng.lognormal(8, 1, rows),
+        "status": rng.choice([200, 201, 401, 403, 500], rows),
+    })
+
+
+def measure(build, df: pd.DataFrame) -> tuple:
+    start = time.perf_counter()
+    payload = build(df).to_json()
+    return time.perf_counter() - start, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    defaults = {name: getattr(ds, name) for name in LIMITS}
+    print(f"{'chart':<16} {'mode':<8} {'seconds':>8} {'payload MB':>11}")
+    for case, build in CASES.items():
+        for mode in ("full", "reduced"):
+            for name, value in defaults.items():
+                setattr(ds, name, args.rows + 1 if mode == "full" else value)
+            seconds, size = measure(build, df)
+            print(f"{case:<16} {mode:<8} {seconds:>8.2f} {size / 2**20:>11.2f}")
+    for name, value in defaults.items():
+        setattr(ds, name, value)
+
+
+if __name__ == "__main__":
+    main()
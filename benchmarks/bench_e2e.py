@@ -0,0 +1,276 @@
+"""
+End-to-end benchmarks at several dataset sizes, written as JSON to compare between commits.
+
+    python -m benchmarks.bench_e2e --sizes 10000,100000,1000000 --out after.json
+    python -m benchmarks.bench_e2e --compare before.json after.json
+
+Per size, in its own process so peak memory is per size:
+- ingest: the seeded generator into SQLite with sketches
+- alerts: full anomaly rescan
+- dashboard: every panel through monitor.fetch_panels over the whole window
+- questions: the qust.txt questions' SQL through execution, DataFrame and charts
+- chat: the full LangGraph pipeline on benchmarks.fake_llm (needs LangChain installed)
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+DATASET_END = datetime(2025, 6, 1)
+DATASET_DAYS = 90
+DEFAULT_SIZES = "10000,100000,1000000"
+REGRESSION_PCT = 10.0
+HIGHER_IS_BETTER = {"rows/s"}
+
+
+class Recorder:
+    """Flat (phase, metric, value, unit) rows for one dataset size"""
+    def __init__(self, size: int):
+        self.size = size
+        self.rows: List[dict] = []
+
+    def add(self, phase: str, metric: str, value: float, unit: str = "ms") -> None:
+        self.rows.append({"size": self.size, "phase": phase, "metric": metric,
+                          "value": round(float(value), 3), "unit": unit})
+
+    def memory(self, phase: str) -> None:
+        # ru_maxrss is KiB on Linux, the process peak so far
+        self.add(phase, "peak_rss", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "MiB")
+
+    def stages(self, phase: str, trace_db: str) -> None:
+        from utilities.tracing import load_spans, stage_percentiles
+        for row in stage_percentiles(load_spans(path=trace_db)).itertuples(index=False):
+            self.add(phase, f"{row.stage}_p50", row.p50_ms)
+            self.add(phase, f"{row.stage}_p95", row.p95_ms)
+
+
+def _median_ms(samples: List[float]) -> float:
+    return statistics.median(samples) * 1000
+
+
+# ==============================================
+# PHASES
+# ==============================================
+def bench_ingest(rec: Recorder, rows: int, path: str, workers: int) -> None:
+    from utilities.create_logs_db import SqliteSink, generate
+    started = time.perf_counter()
+    sink = SqliteSink(path)
+    try:
+        for frames in generate(rows, DATASET_END - timedelta(days=DATASET_DAYS), DATASET_END, workers=workers):
+            sink.write(frames)
+    finally:
+        sink.close()
+    seconds = time.perf_counter() - started
+    rec.add("ingest", "seconds", seconds * 1000)
+    rec.add("ingest", "throughput", 3 * rows / seconds, "rows/s")
+    rec.add("ingest", "db_size", os.path.getsize(path) / 2 ** 20, "MiB")
+    rec.memory("ingest")
+
+
+def bench_alerts(rec: Recorder, path: str) -> None:
+    from utilities.anomalies import rebuild
+    started = time.perf_counter()
+    written = rebuild(path)
+    rec.add("alerts", "rescan", (time.perf_counter() - started) * 1000)
+    rec.add("alerts", "alerts", written, "count")
+    rec.memory("alerts")
+
+
+def bench_dashboard(rec: Recorder, path: str, repeat: int) -> None:
+    import monitor
+    from streamlit.logger import set_log_level
+    from utilities.db import connect
+    from utilities.sketches import register_sql_functions
+    set_log_level("error")  # bare-mode warnings on every cached call, there is no Streamlit runtime here
+    monitor.sketches_ready.clear()
+    monitor.alerts_ready.clear()
+    start = (DATASET_END - timedelta(days=DATASET_DAYS)).strftime(monitor.DATE_FORMAT)
+    end = DATASET_END.strftime(monitor.DATE_FORMAT)
+    connect_fn = lambda: register_sql_functions(connect(path, read_only=True))
+
+    totals, ready = [], {name: [] for name, _, _ in monitor.PANELS}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = monitor.fetch_panels(monitor.PANELS, connect_fn, start, end)
+        totals.append(time.perf_counter() - started)
+        for name, result in results.items():
+            ready[name].append(result["ready_ms"] / 1000)
+            if result["errors"]:
+                raise RuntimeError(f"panel {name} failed: {result['errors']}")
+    rec.add("dashboard", "total_p50", _median_ms(totals))
+    for name, samples in ready.items():
+        rec.add("dashboard", f"{name}_ready_p50", _median_ms(samples))
+    rec.memory("dashboard")
+
+
+def bench_questions(rec: Recorder, path: str, questions: List[str], repeat: int) -> None:
+    """The canned SQL of every question through the post-LLM stages, without the model"""
+    from benchmarks.fake_llm import canned_sql
+    from utilities.arrow_results import query_arrow
+    from utilities.db import connect
+    from utilities.sketches import register_sql_functions
+    from utilities.tracing import span, trace
+    from Visualizations.AutoVisualizer import plot_from_profile, to_dataframe
+
+    totals = []
+    for _ in range(repeat):
+        for question in questions:
+            started = time.perf_counter()
+            with trace("bench"):
+                with span("sql_execution"):
+                    conn = register_sql_functions(connect(path, read_only=True))
+                    try:
+                        table = query_arrow(conn, canned_sql(question))
+                    finally:
+                        conn.close()
+                df = to_dataframe(table)
+                # The chart relevance classifier needs the embedding models, only the charts are timed
+                with span("chart_build", rows=len(df)):
+                    plot_from_profile(df)
+            totals.append(time.perf_counter() - started)
+    rec.add("questions", "question_p50", _median_ms(totals))
+    rec.add("questions", "question_max", max(totals) * 1000)
+    rec.stages("questions", "traces.db")
+    rec.memory("questions")
+
+
+def bench_chat(rec: Recorder, questions: List[str], latency_ms: float) -> Optional[str]:
+    """Full run_sql_llm pipeline on the stub model; returns why it was skipped, if it was"""
+    try:
+        from sql_LLM import run_sql_llm
+    except ImportError as e:
+        return f"chat skipped: {e}"
+    from benchmarks.fake_llm import patch_llm
+    from utilities.tracing import span, trace
+    from Visualizations.AutoVisualizer import plot_from_profile, to_dataframe
+
+    totals = []
+    with patch_llm(latency_ms) as model:
+        for question in questions:
+            started = time.perf_counter()
+            with trace("chat"):
+                result = run_sql_llm(question)
+                df = to_dataframe(result["result"], result["columns"])
+                with span("chart_build", rows=len(df)):
+                    plot_from_profile(df)
+            totals.append(time.perf_counter() - started)
+    rec.add("chat", "question_p50", _median_ms(totals))
+    rec.add("chat", "question_max", max(totals) * 1000)
+    rec.add("chat", "llm_calls", model.calls, "count")
+    rec.stages("chat", "chat_traces.db")
+    rec.memory("chat")
+    return None
+
+
+def run_size(rows: int, args: argparse.Namespace) -> Dict[str, list]:
+    """Every phase on a fresh dataset of `rows` rows per table"""
+    from benchmarks.fake_llm import load_questions
+    from utilities import tracing
+    rec = Recorder(rows)
+    notes = []
+    questions = load_questions()
+    with tempfile.TemporaryDirectory(prefix="logbot-bench-") as workdir:
+        # sql_LLM and the dashboard open logs2.db relative to the working directory
+        os.chdir(workdir)
+        path = os.path.join(workdir, "logs2.db")
+        bench_ingest(rec, rows, path, args.workers)
+        bench_alerts(rec, path)
+        bench_dashboard(rec, path, args.repeat)
+        tracing.TRACE_DB = "traces.db"
+        bench_questions(rec, path, questions, args.repeat)
+        tracing.TRACE_DB = "chat_traces.db"
+        skipped = bench_chat(rec, questions, args.llm_latency_ms)
+        if skipped:
+            notes.append(skipped)
+    return {"results": rec.rows, "notes": notes}
+
+
+# ==============================================
+# RESULTS
+# ==============================================
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path: str, after_path: str, threshold: float = REGRESSION_PCT) -> int:
+    """Print every shared metric with its change; returns the number of regressions over `threshold` %"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    old = {(r["size"], r["phase"], r["metric"]): r["value"] for r in before["results"]}
+    regressions = 0
+    print(f"{before.get('commit')} → {after.get('commit')}")
+    print(f"{'size':>10} {'phase':<10} {'metric':<28} {'before':>12} {'after':>12} {'change':>8}")
+    for r in after["results"]:
+        key = (r["size"], r["phase"], r["metric"])
+        if key not in old or r["unit"] == "count":
+            continue
+        change = 100.0 * (r["value"] - old[key]) / old[key] if old[key] else 0.0
+        worse = -change if r["unit"] in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > threshold:
+            regressions += 1
+            flag = " ⚠️"
+        print(f"{r['size']:>10,} {r['phase']:<10} {r['metric']:<28} {old[key]:>12,.1f} {r['value']:>12,.1f} "
+              f"{change:>+7.1f}%{flag}")
+    print(f"\n{regressions} metrics worse by more than {threshold:g}%")
+    return regressions
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated rows per table")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per dashboard load and question")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="stub model response time")
+    parser.add_argument("--workers", type=int, default=1, help="generator processes during ingest")
+    parser.add_argument("--out", default="bench_e2e.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--threshold", type=float, default=REGRESSION_PCT, help="regression threshold in %")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        raise SystemExit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+
+    report = {
+        "commit": _commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "results": [],
+        "notes": [],
+    }
+    # A fresh interpreter per size keeps peak RSS and warm caches from leaking between sizes
+    context = multiprocessing.get_context("spawn")
+    for rows in (int(s) for s in args.sizes.split(",")):
+        print(f"⏳ {rows:,} rows per table...")
+        with context.Pool(1) as pool:
+            outcome = pool.apply(run_size, (rows, args))
+        report["results"] += outcome["results"]
+        report["notes"] += [n for n in outcome["notes"] if n not in report["notes"]]
+        for r in outcome["results"]:
+            print(f"   {r['phase']:<10} {r['metric']:<28} {r['value']:>14,.1f} {r['unit']}")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    for note in report["notes"]:
+        print(f"⚠️ {note}")
+    print(f"✅ {len(report['results'])} results written to '{args.out}'")
+
+
+if __name__ == "__main__":
+    main()
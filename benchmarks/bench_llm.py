@@ -0,0 +1,87 @@
+"""
+SQL generation latency per model provider on the qust.txt question set.
+
+    python -m benchmarks.bench_llm --providers groq,llamacpp --out llm.json
+    python -m benchmarks.bench_e2e --compare groq_only.json llm.json
+
+Runs every question through run_sql_llm against ./logs2.db with each
+provider in turn. Load time is measured separately from the questions, which
+run on the warm model. Providers are configured as in the app, e.g.
+LOGBOT_LLM_MODEL=models/sqlcoder-7b.Q4_K_M.gguf LOGBOT_LLM_THREADS=8.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from benchmarks.bench_e2e import Recorder, _commit, _median_ms
+from benchmarks.fake_llm import load_questions
+
+
+def bench_provider(rec: Recorder, provider: str, questions: List[str], trace_db: str) -> None:
+    import sql_LLM
+    from utilities import llm, tracing
+
+    rec.add(provider, "load", llm.warm_up(provider) * 1000)
+    tracing.TRACE_DB = trace_db
+    totals, failures = [], 0
+    # run_sql_llm asks get_llm for the configured provider, pin it to the one being measured
+    original = sql_LLM.get_llm, sql_LLM.match_question
+    sql_LLM.get_llm = lambda temperature=0.0: llm.get_llm(temperature, provider)
+    sql_LLM.match_question = lambda question: None  # template hits would skip the model being measured
+    try:
+        for question in questions:
+            started = time.perf_counter()
+            try:
+                with tracing.trace(provider):
+                    sql_LLM.run_sql_llm(question)
+            except Exception as e:  # invalid SQL from the model counts against it, the run goes on
+                failures += 1
+                print(f"   ❌ {question}: {e}")
+            totals.append(time.perf_counter() - started)
+    finally:
+        sql_LLM.get_llm, sql_LLM.match_question = original
+    rec.add(provider, "question_p50", _median_ms(totals))
+    rec.add(provider, "question_max", max(totals) * 1000)
+    rec.add(provider, "failed_questions", failures, "count")
+    rec.stages(provider, trace_db)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", default="groq,llamacpp", help="comma separated, see utilities/llm.py")
+    parser.add_argument("--out", default="bench_llm.json")
+    args = parser.parse_args(argv)
+
+    questions = load_questions()
+    report = {
+        "commit": _commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "args": vars(args),
+        "results": [],
+        "notes": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="logbot-llm-") as workdir:
+        for provider in args.providers.split(","):
+            print(f"⏳ {provider}: {len(questions)} questions...")
+            rec = Recorder(0)
+            try:
+                bench_provider(rec, provider, questions, os.path.join(workdir, f"{provider}.db"))
+            except (ImportError, ValueError) as e:  # provider package or model file missing
+                report["notes"].append(f"{provider} skipped: {e}")
+                print(f"⚠️ {provider} skipped: {e}")
+                continue
+            report["results"] += rec.rows
+            for r in rec.rows:
+                print(f"   {r['metric']:<24} {r['value']:>12,.1f} {r['unit']}")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ {len(report['results'])} results written to '{args.out}'")
+
+
+if __name__ == "__main__":
+    main()
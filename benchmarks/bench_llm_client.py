@@ -0,0 +1,87 @@
+"""
+Shared LLM client against the local stand-in API: connection reuse, coalescing and backoff.
+
+    python -m benchmarks.bench_llm_client --analysts 8 --latency-ms 200 --rate-limit-every 15
+
+Every analyst thread asks the qust.txt questions in the same order through
+run_sql_llm against ./logs2.db, so identical questions are in flight
+together. Runs once with a fresh client per call (the old behaviour) and once
+with the shared client from utilities/llm.py.
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from unittest import mock
+
+from benchmarks.fake_llm import load_questions
+from benchmarks.stub_llm_server import StubLLMServer
+
+
+def ask_all(questions: List[str], analysts: int) -> Dict[str, float]:
+    from sql_LLM import run_sql_llm
+
+    def analyst(_) -> List[float]:
+        latencies = []
+        for question in questions:
+            started = time.perf_counter()
+            run_sql_llm(question)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=analysts) as pool:
+        latencies = [t for per_analyst in pool.map(analyst, range(analysts)) for t in per_analyst]
+    return {"wall_s": time.perf_counter() - started, "p50_ms": statistics.median(latencies) * 1000,
+            "max_ms": max(latencies) * 1000}
+
+
+def run_mode(mode: str, args: argparse.Namespace, questions: List[str]) -> Dict[str, float]:
+    import sql_LLM
+    from langchain.chat_models import init_chat_model
+    from utilities import llm, llm_client
+
+    with StubLLMServer(latency_ms=args.latency_ms, rate_limit_every=args.rate_limit_every) as server:
+        if mode == "per_call":
+            # A new client, and so new connections, for every question; retries left to the SDK
+            factory = lambda temperature=0.0: init_chat_model(llm.REMOTE_MODEL, model_provider="groq",
+                                                              temperature=temperature, base_url=server.url)
+        else:
+            llm.BASE_URL = server.url
+            llm._load.cache_clear()
+            llm_client.STATS.reset()
+            factory = llm.get_llm
+        # Template hits never reach the client, every question goes to the model here
+        with mock.patch.object(sql_LLM, "get_llm", factory), \
+                mock.patch.object(sql_LLM, "match_question", lambda question: None):
+            result = ask_all(questions, args.analysts)
+        result.update({f"server_{k}": v for k, v in server.stats.items()})
+    if mode == "shared":
+        result.update({f"client_{k}": v for k, v in llm_client.STATS.snapshot().items()})
+    return result
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--analysts", type=int, default=8, help="concurrent chat sessions")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="stand-in API response time")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with a 429")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    questions = load_questions()
+    for mode in ("per_call", "shared"):
+        print(f"⏳ {mode}: {args.analysts} analysts x {len(questions)} questions...")
+        try:
+            result = run_mode(mode, args, questions)
+        except ImportError as e:
+            print(f"⚠️ Needs langchain and langchain-groq: {e}")
+            return
+        for name, value in result.items():
+            print(f"   {name:<24} {value:>12,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Column profiling and chart choice time on large results.
+
+    python -m benchmarks.bench_profiler --rows 1000000
+
+Profiling runs on at most PROFILE_SAMPLE_ROWS evenly spaced rows, so its time
+should stay flat as --rows grows; the check at the end fails loudly if not.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from Visualizations import profiling
+
+BUDGET_SECONDS = 1.0
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    start = np.datetime64("2025-01-01T00:00:00")
+    return pd.DataFrame({
+        "request_id": [f"req-{i:08d}" for i in range(rows)],
+        "timestamp": (start + np.sort(rng.integers(0, 90 * 86_400, rows)).astype("timedelta64[s]"))
+        .astype(str),
+        "endpoint": rng.choice([f"/api/v1/resource{i}" for i in range(14)], rows),
+        "status_code": rng.choice([200, 201, 400, 401, 403, 404, 500], rows),
+        "duration_ms": rng.gamma(2, 150, rows),
+        "row": np.arange(rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    for arrow in (False, True):
+        frame = df.convert_dtypes(dtype_backend="pyarrow") if arrow else df
+        start = time.perf_counter()
+        profile = profiling.profile_columns(frame)
+        chart = profiling.choose_chart(profile)
+        seconds = time.perf_counter() - start
+        print(f"{'arrow' if arrow else 'numpy'} backend, {args.rows:,} rows: {seconds:.3f}s -> {chart}")
+        print(profile.to_string(index=False))
+        assert seconds < BUDGET_SECONDS, f"profiling took {seconds:.2f}s, budget is {BUDGET_SECONDS}s"
+
+
+if __name__ == "__main__":
+    main()
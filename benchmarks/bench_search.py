@@ -0,0 +1,88 @@
+"""
+LIKE scans against the trigram search index on a generated dataset.
+
+    python -m benchmarks.bench_search --rows 1000000
+
+Each pattern is counted with a plain `column LIKE pattern` scan, through its
+`<table>_search` table, and as rewrite_query plans it (index only when the
+pattern is selective); the counts must agree.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Optional
+
+from benchmarks.bench_trail import build
+from utilities.search import ensure_search_index, rewrite_query, search_condition
+
+# (table, column, pattern): prefixes, substrings and suffixes analysts type
+PATTERNS = [
+    ("vpc_logs", "src_ip", "45.227.%"),
+    ("vpc_logs", "src_ip", "10.0.0.15%"),
+    ("vpc_logs", "dst_ip", "%.1.25_"),
+    ("access_logs", "user_id", "%hack%"),
+    ("access_logs", "user_id", "user_49%"),
+    ("access_logs", "endpoint", "%admin%"),
+    ("vpc_logs", "src_ip", "192.168.1.%"),
+    ("execution_logs", "function_name", "%_handler"),
+]
+
+
+def best_of(conn: sqlite3.Connection, query: str, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = conn.execute(query).fetchone()[0]
+        timings.append(time.perf_counter() - started)
+    return count, statistics.median(timings) * 1000
+
+
+def index_bytes(conn: sqlite3.Connection) -> Optional[int]:
+    try:
+        return conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE '%\\_search%' ESCAPE '\\'").fetchone()[0]
+    except sqlite3.OperationalError:  # SQLite built without the dbstat table
+        return None
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows per table")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--db", help="existing database to use instead of generating one, its search index is rebuilt")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="logbot-search-") as workdir:
+        path = args.db or os.path.join(workdir, "logs2.db")
+        if not args.db:
+            print(f"⏳ Generating {args.rows:,} rows per table...")
+            build(path, args.rows, args.workers)
+        conn = sqlite3.connect(path)
+        try:
+            started = time.perf_counter()
+            ensure_search_index(conn, rebuild=True)
+            print(f"📊 Index rebuilt in {time.perf_counter() - started:.1f}s, "
+                  f"{(index_bytes(conn) or 0) / 2 ** 20:.1f} MiB of {os.path.getsize(path) / 2 ** 20:.1f} MiB")
+            print(f"   {'pattern':<30} {'rows':>9} {'LIKE ms':>9} {'index ms':>9} {'planned ms':>11} {'plan':>6}")
+            for table, column, pattern in PATTERNS:
+                scan = f"SELECT COUNT(*) FROM {table} WHERE {column} LIKE '{pattern}'"
+                rows, scan_ms = best_of(conn, scan, args.repeat)
+                found, index_ms = best_of(conn, f"SELECT COUNT(*) FROM {table} WHERE "
+                                                f"{search_condition(table, column, pattern)}", args.repeat)
+                started = time.perf_counter()
+                planned = rewrite_query(conn, scan)
+                plan_ms = (time.perf_counter() - started) * 1000
+                planned_rows, planned_ms = best_of(conn, planned, args.repeat)
+                if not rows == found == planned_rows:
+                    raise SystemExit(f"❌ {table}.{column} LIKE '{pattern}': {rows} rows scanned, {found} from index")
+                print(f"   {f'{column} LIKE {pattern!r}':<30} {rows:>9,} {scan_ms:>9.1f} {index_ms:>9.1f} "
+                      f"{plan_ms + planned_ms:>11.1f} {'index' if planned != scan else 'scan':>6}")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
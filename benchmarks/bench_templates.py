@@ -0,0 +1,85 @@
+"""
+Template fast path hit rate and match latency on the sample questions.
+
+    python -m benchmarks.bench_templates --db logs2.db
+
+Question sets are qust.txt and the log_examples of utilities/is_relevant.py.
+Every emitted query is run against --db so broken SQL shows up as an error.
+"""
+import argparse
+import ast
+import os
+import sqlite3
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.fake_llm import load_questions
+from utilities.sketches import register_sql_functions
+from utilities.templates import match_question
+
+REPEAT = 200
+
+
+def log_examples() -> List[str]:
+    # Read from the source, importing utilities.is_relevant loads the embedding models
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utilities", "is_relevant.py")
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "log_examples":
+            return ast.literal_eval(node.value)
+    return []
+
+
+def report(name: str, questions: List[str], conn: sqlite3.Connection, verbose: bool) -> Dict[str, float]:
+    hits = errors = 0
+    timings = []
+    for question in questions:
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            template = match_question(question)
+        timings.append((time.perf_counter() - started) / REPEAT)
+        if template is None:
+            if verbose:
+                print(f"   ↪ LLM      {question}")
+            continue
+        hits += 1
+        try:
+            rows = len(conn.execute(template.sql).fetchall())
+            status = f"{rows:,} rows"
+        except sqlite3.Error as e:
+            errors += 1
+            status = f"❌ {e}"
+        if verbose:
+            print(f"   ⚡ {template.intent:<13} {question}\n      {template.sql}  [{status}]")
+    stats = {
+        "questions": len(questions),
+        "hit_rate": hits / len(questions) if questions else 0.0,
+        "sql_errors": errors,
+        "match_p50_us": statistics.median(timings) * 1e6,
+        "match_max_us": max(timings) * 1e6,
+    }
+    print(f"📊 {name}: {hits}/{len(questions)} answered by templates ({stats['hit_rate']:.0%}), "
+          f"{errors} SQL errors, match p50 {stats['match_p50_us']:.0f} µs, max {stats['match_max_us']:.0f} µs")
+    return stats
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="logs2.db")
+    parser.add_argument("--quiet", action="store_true", help="only the summary lines")
+    args = parser.parse_args(argv)
+
+    conn = register_sql_functions(sqlite3.connect(f"file:{args.db}?mode=ro", uri=True))
+    try:
+        results = {name: report(name, questions, conn, not args.quiet)
+                   for name, questions in (("qust.txt", load_questions()), ("log_examples", log_examples()))}
+    finally:
+        conn.close()
+    if any(r["sql_errors"] for r in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Request trail lookup latency with and without the request_id covering indexes.
+
+    python -m benchmarks.bench_trail --rows 1000000 --batch 5000
+
+Generates a dataset of --rows rows per table, then times single-id lookups
+and one batch lookup of --batch ids, first on the bare tables and then after
+ensure_trail_indexes. Ids are sampled from the data, so every lookup has hits.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from benchmarks.bench_e2e import DATASET_DAYS, DATASET_END
+from utilities.trail import LOG_TABLES, TRAIL_SQL, ensure_trail_indexes, index_name, lookup
+
+
+def build(path: str, rows: int, workers: int) -> None:
+    from utilities.create_logs_db import SqliteSink, generate
+    sink = SqliteSink(path, sketches=False)
+    try:
+        for frames in generate(rows, DATASET_END - timedelta(days=DATASET_DAYS), DATASET_END, workers=workers):
+            sink.write(frames)
+    finally:
+        sink.close()
+
+
+def time_lookups(conn: sqlite3.Connection, ids: List[str], singles: int, batch: int) -> Dict[str, float]:
+    single = []
+    for request_id in ids[:singles]:
+        started = time.perf_counter()
+        conn.execute(TRAIL_SQL, (json.dumps([request_id]),)).fetchall()
+        single.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    trail = lookup(conn, ids[:batch])
+    batch_s = time.perf_counter() - started
+    return {
+        "single_p50_ms": statistics.median(single) * 1000,
+        "single_max_ms": max(single) * 1000,
+        "batch_ms": batch_s * 1000,
+        "batch_rows": len(trail),
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows per table")
+    parser.add_argument("--batch", type=int, default=5000, help="ids in the batch lookup")
+    parser.add_argument("--singles", type=int, default=200, help="single-id lookups with the indexes")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="logbot-trail-") as workdir:
+        path = os.path.join(workdir, "logs2.db")
+        print(f"⏳ Generating {args.rows:,} rows per table...")
+        build(path, args.rows, args.workers)
+        conn = sqlite3.connect(path)
+        try:
+            ids = [row[0] for row in conn.execute("SELECT DISTINCT request_id FROM access_logs")]
+            random.Random(0).shuffle(ids)
+            for table in LOG_TABLES:  # the sink indexes on close, start from bare tables
+                conn.execute(f"DROP INDEX IF EXISTS {index_name(table)}")
+            # Full scans are slow, a handful of single lookups is enough to show it
+            bare = time_lookups(conn, ids, min(args.singles, 5), args.batch)
+            started = time.perf_counter()
+            ensure_trail_indexes(conn)
+            index_s = time.perf_counter() - started
+            indexed = time_lookups(conn, ids, args.singles, args.batch)
+        finally:
+            conn.close()
+
+    print(f"📊 {len(ids):,} distinct request ids, indexes built in {index_s:.2f}s")
+    print(f"   {'':<16} {'no index':>12} {'indexed':>12}")
+    for metric in bare:
+        print(f"   {metric:<16} {bare[metric]:>12,.3f} {indexed[metric]:>12,.3f}")
+
+
+if __name__ == "__main__":
+    main()
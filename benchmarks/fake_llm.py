@@ -0,0 +1,121 @@
+"""
+Deterministic stand-in for the chat model, so pipeline benchmarks measure our
+code and not the provider.
+
+Every question in qust.txt has canned SQL; the stub answers after a fixed,
+configurable delay. Only the model from `get_llm` is swapped, the LangChain and
+LangGraph code around it runs as in production.
+
+    with patch_llm(latency_ms=300):
+        run_sql_llm("Show all rejected VPC connections.")
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple
+from unittest import mock
+
+QUESTIONS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "qust.txt")
+
+# Dates are inside the benchmark datasets, which end at benchmarks.bench_e2e.DATASET_END
+CANNED_SQL: Dict[str, str] = {
+    "Show all rejected VPC connections.":
+        "SELECT * FROM vpc_logs WHERE action = 'REJECT';",
+    "Which source IPs sent the most data?":
+        "SELECT src_ip, SUM(bytes_sent) AS total_bytes FROM vpc_logs GROUP BY src_ip ORDER BY total_bytes DESC LIMIT 10;",
+    "List logs where the destination IP is 192.168.1.10.":
+        "SELECT * FROM vpc_logs WHERE dst_ip = '192.168.1.10';",
+    "How many VPC requests were accepted today?":
+        "SELECT COUNT(*) AS accepted FROM vpc_logs WHERE action = 'ACCEPT' "
+        "AND timestamp >= '2025-05-31T00:00:00';",
+    "What are the top 5 IP addresses by bytes sent?":
+        "SELECT src_ip, SUM(bytes_sent) AS total_bytes FROM vpc_logs GROUP BY src_ip ORDER BY total_bytes DESC LIMIT 5;",
+    "List all failed Lambda executions.":
+        "SELECT * FROM execution_logs WHERE status = 'FAILED';",
+    "Which function had the longest execution time?":
+        "SELECT function_name, duration_ms FROM execution_logs ORDER BY duration_ms DESC LIMIT 1;",
+    "How many times did process_order run last week?":
+        "SELECT COUNT(*) AS runs FROM execution_logs WHERE function_name = 'process_order' "
+        "AND timestamp BETWEEN '2025-05-19T00:00:00' AND '2025-05-25T23:59:59';",
+    "Show successful function calls and their durations.":
+        "SELECT timestamp, function_name, duration_ms FROM execution_logs WHERE status = 'SUCCESS';",
+    "What’s the average duration of each function?":
+        "SELECT function_name, AVG(duration_ms) AS avg_duration FROM execution_logs GROUP BY function_name "
+        "ORDER BY avg_duration DESC;",
+    "Which users accessed the /login endpoint?":
+        "SELECT DISTINCT user_id FROM access_logs WHERE endpoint = '/api/login';",
+    "List failed POST requests.":
+        "SELECT * FROM access_logs WHERE method = 'POST' AND status_code >= 400;",
+    "How many times was the /dashboard endpoint accessed?":
+        "SELECT COUNT(*) AS hits FROM access_logs WHERE endpoint = '/api/dashboard';",
+    "Show all requests by user ID u123.":
+        "SELECT * FROM access_logs WHERE user_id = 'u123';",
+    "Which endpoints are accessed the most?":
+        "SELECT endpoint, COUNT(*) AS hits FROM access_logs GROUP BY endpoint ORDER BY hits DESC;",
+    "Show the full request trail for request ID abc123.":
+        "SELECT access_logs.timestamp, access_logs.user_id, access_logs.endpoint, execution_logs.function_name, "
+        "execution_logs.status, vpc_logs.src_ip, vpc_logs.action FROM access_logs "
+        "LEFT JOIN execution_logs USING (request_id) LEFT JOIN vpc_logs USING (request_id) "
+        "WHERE access_logs.request_id = 'abc123';",
+    "For all failed executions, show the associated user ID and endpoint.":
+        "SELECT execution_logs.function_name, access_logs.user_id, access_logs.endpoint FROM execution_logs "
+        "JOIN access_logs USING (request_id) WHERE execution_logs.status = 'FAILED';",
+}
+DEFAULT_SQL = "SELECT COUNT(*) AS total_requests FROM access_logs;"
+
+
+def load_questions(path: str = QUESTIONS_FILE) -> List[str]:
+    """The sample questions, without blank lines and section headings"""
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.endswith("Questions") and not line.endswith(")")]
+
+
+def canned_sql(question: str) -> str:
+    return CANNED_SQL.get(question.strip(), DEFAULT_SQL)
+
+
+def _question(prompt: str) -> str:
+    # The SQL prompt ends with "Question:" followed by the user's question
+    return prompt.rsplit("Question:", 1)[-1].strip()
+
+
+class FakeMessage(NamedTuple):
+    content: str
+
+
+class FakeStructuredModel:
+    def __init__(self, model: "FakeChatModel"):
+        self.model = model
+
+    def invoke(self, prompt: str) -> dict:
+        self.model.wait()
+        return {"query": canned_sql(_question(prompt))}
+
+
+class FakeChatModel:
+    """Chat model with a fixed response time, SQL from CANNED_SQL and a short summary"""
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def wait(self) -> None:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def invoke(self, prompt: str) -> FakeMessage:
+        self.wait()
+        return FakeMessage(f"The query returned the requested rows ({len(prompt)} prompt chars).")
+
+    def with_structured_output(self, schema) -> FakeStructuredModel:
+        return FakeStructuredModel(self)
+
+
+@contextmanager
+def patch_llm(latency_ms: float = 0.0):
+    """Swap sql_LLM's model for FakeChatModel; yields the shared model for call counts"""
+    import sql_LLM
+    model = FakeChatModel(latency_ms)
+    with mock.patch.object(sql_LLM, "get_llm", lambda *a, **k: model):
+        yield model
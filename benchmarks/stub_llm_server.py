@@ -0,0 +1,140 @@
+"""
+Local stand-in for the Groq (OpenAI-compatible) chat completions API.
+
+Answers SQL generation with the canned SQL of benchmarks.fake_llm, after a
+fixed delay, optionally rate-limiting every Nth request with a 429. Counts
+the TCP connections it accepts, so connection reuse can be checked from the
+server side.
+
+    python -m benchmarks.stub_llm_server --port 8765 --latency-ms 200 --rate-limit-every 10
+    LOGBOT_LLM_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=stub streamlit run app.py
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from benchmarks.fake_llm import _question, canned_sql
+
+
+def completion(body: dict) -> dict:
+    """OpenAI-style chat completion for a request body: a tool call when tools are offered, text otherwise"""
+    prompt = body["messages"][-1]["content"]
+    message = {"role": "assistant", "content": None}
+    if body.get("tools"):
+        tool = body["tools"][0]["function"]["name"]
+        message["tool_calls"] = [{"id": "call_stub", "type": "function", "function": {
+            "name": tool, "arguments": json.dumps({"query": canned_sql(_question(prompt))})}}]
+        finish_reason = "tool_calls"
+    else:
+        message["content"] = "log_query" if "Classify this query" in prompt else "The query returned the requested rows."
+        finish_reason = "stop"
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20, "total_tokens": len(prompt) // 4 + 20},
+    }
+
+
+class StubLLMServer:
+    """Threaded HTTP/1.1 server on 127.0.0.1, started in the background"""
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, rate_limit_every: int = 0,
+                 retry_after: float = 0.2):
+        self.latency_ms = latency_ms
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.stats: Dict[str, int] = {"connections": 0, "requests": 0, "rate_limited": 0}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, one handler instance per connection
+
+            def setup(self):
+                super().setup()
+                server._count("connections")
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers: Optional[dict] = None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                server._count("requests")
+                if not self.path.endswith("/chat/completions"):
+                    return self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                if server.rate_limit_every and next(server._counter) % server.rate_limit_every == 0:
+                    server._count("rate_limited")
+                    return self._send(429, {"error": {"message": "Rate limit reached", "type": "tokens"}},
+                                      {"retry-after": str(server.retry_after)})
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                self._send(200, completion(body))
+
+        return Handler
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the chat completions API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with a 429")
+    args = parser.parse_args(argv)
+
+    server = StubLLMServer(args.port, args.latency_ms, args.rate_limit_every)
+    print(f"✅ Stub LLM API on {server.url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"📊 {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
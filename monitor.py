@@ -501,14 +501,27 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import sqlite3
 from datetime import datetime, timedelta
 import numpy as np
-from typing import Tuple, Optional, Dict, Any, List
+from typing import Tuple, Optional, Dict, Any, List, Callable
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from utilities.anomalies import Z_THRESHOLD, alerts_available, detect
+from utilities.arrow_results import query_dataframe
+from utilities.buckets import bucket_label_sql, bucket_sql, choose_bucket
+from utilities.cidr import cidr_range, ip_columns_enabled
+from utilities.db import DB_PATH, SHARD_DIR, connect
+from utilities.live_tail import LIVE_REFRESH_SECONDS, LiveTail
+from utilities.llm_client import STATS as LLM_CLIENT_STATS
+from utilities.sketches import (HLL_PRECISION, TOP_K, approx_distinct, approx_top, latency_percentiles,
+                                register_sql_functions, sketches_available)
+from utilities.shards import ShardWindowTooLarge, connect_window, fan_out, merge_aggregates, shards_for_window
+from utilities.tracing import load_spans, stage_percentiles, rerun_by_turns, RERUN_STAGE
+from Visualizations import charts
 
 # ==============================================
 # ENUMS AND CONSTANTS
@@ -529,7 +542,7 @@ class AlertLevel(Enum):
     LOW = ("🔵 Low", "#1C83E1")
     INFO = ("⚪ Info", "#808080")
 
-DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'  # same ISO form as the stored timestamps, so BETWEEN compares correctly
 DEFAULT_DATE_RANGE = TimeRange.LAST_7D
 
 # ==============================================
@@ -590,7 +603,7 @@ def get_db_connection(max_retries: int = 3) -> sqlite3.Connection:
             conn.row_factory = sqlite3.Row
             conn.execute("PRAGMA recursive_triggers = ON")
             conn.execute("SELECT 1").fetchone()
-            return conn
+            return register_sql_functions(conn)
         except sqlite3.Error as e:
             if attempt == max_retries - 1:
                 st.error(f"❌ Failed to connect to database after {max_retries} attempts: {str(e)}")
@@ -598,9 +611,9 @@ def get_db_connection(max_retries: int = 3) -> sqlite3.Connection:
             time.sleep(1)
 
 def run_query(_conn: sqlite3.Connection, query: str, params: tuple = ()) -> pd.DataFrame:
-    """Execute SQL query and return results as DataFrame"""
+    """Execute SQL query and return results as an Arrow-backed DataFrame with nullable columns"""
     try:
-        return pd.read_sql_query(query, _conn, params=params).replace({np.nan: None})
+        return query_dataframe(_conn, query, params)
     except Exception as e:
         st.error(f"❌ Query execution failed: {str(e)}")
         return pd.DataFrame()
@@ -609,6 +622,252 @@ def safe_get_first_row(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
     """Safely get first row of DataFrame or return None if empty"""
     return dict(df.iloc[0]) if not df.empty else None
 
+# Per-shard partial aggregates for the headline metrics, merged with merge_aggregates
+SHARD_METRICS_QUERY = """
+SELECT 
+    (SELECT COUNT(*) FROM access_logs WHERE timestamp BETWEEN ? AND ?) as total_requests,
+    (SELECT SUM(duration_ms) FROM execution_logs WHERE timestamp BETWEEN ? AND ?) as latency_sum,
+    (SELECT COUNT(duration_ms) FROM execution_logs WHERE timestamp BETWEEN ? AND ?) as latency_count,
+    (SELECT SUM(CASE WHEN status = 'SUCCESS' THEN 1 ELSE 0 END) FROM execution_logs WHERE timestamp BETWEEN ? AND ?) as successes,
+    (SELECT COUNT(*) FROM execution_logs WHERE timestamp BETWEEN ? AND ?) as executions,
+    (SELECT COUNT(*) FROM vpc_logs WHERE action = 'REJECT' AND timestamp BETWEEN ? AND ?) as rejected_connections,
+    (SELECT COUNT(*) FROM execution_logs WHERE status = 'FAILED' AND timestamp BETWEEN ? AND ?) as failed_executions
+"""
+
+def fetch_sharded_metrics(start_date: str, end_date: str) -> pd.DataFrame:
+    """Headline metrics computed shard by shard in parallel and merged"""
+    partials = fan_out(SHARD_DIR, SHARD_METRICS_QUERY, (start_date, end_date) * 7, start_date, end_date)
+    totals = safe_get_first_row(merge_aggregates(partials, sums=[
+        'total_requests', 'latency_sum', 'latency_count', 'successes', 'executions',
+        'rejected_connections', 'failed_executions'
+    ]))
+    if totals is None:
+        return pd.DataFrame()
+
+    # Distinct users span shards, so merge the per-shard user sets rather than counts
+    users = fan_out(SHARD_DIR, "SELECT DISTINCT user_id FROM access_logs WHERE timestamp BETWEEN ? AND ?",
+                    (start_date, end_date), start_date, end_date)
+    return pd.DataFrame([{
+        'total_requests': int(totals['total_requests']),
+        'avg_latency': totals['latency_sum'] / totals['latency_count'] if totals['latency_count'] else 0,
+        'active_users': pd.concat(users)['user_id'].nunique() if users else 0,
+        'success_rate': 100.0 * totals['successes'] / totals['executions'] if totals['executions'] else 0,
+        'rejected_connections': int(totals['rejected_connections']),
+        'failed_executions': int(totals['failed_executions']),
+    }])
+
+# ==============================================
+# APPROXIMATE COUNTS
+# ==============================================
+@st.cache_data(ttl=300)
+def sketches_ready() -> bool:
+    """Whether the database has the hourly user/IP sketches written at ingest"""
+    conn = connect(DB_PATH, read_only=True)
+    try:
+        return sketches_available(conn)
+    finally:
+        conn.close()
+
+def use_sketches() -> bool:
+    """Approximate mode: sketches present and not switched off in the sidebar"""
+    return not SHARD_DIR and st.session_state.get("approximate_counts", True) and sketches_ready()
+
+def sketch_query(fn: Callable, *args) -> Callable[[], Any]:
+    """Panel query answered from the sketches, on its own read-only connection"""
+    def run():
+        conn = connect(DB_PATH, read_only=True)
+        try:
+            return fn(conn, *args)
+        finally:
+            conn.close()
+    return run
+
+def top_items(table: str, column: str, label: str, start_date: str, end_date: str, limit: int = 10) -> Any:
+    """Top `column` values by row count: Top-K sketch in approximate mode, GROUP BY otherwise"""
+    if use_sketches():
+        source = f"{table}.{column}"
+        return sketch_query(lambda conn: approx_top(conn, source, start_date, end_date, limit)
+                            .rename(columns={"item": column, "count": label}))
+    query = f"""
+    SELECT {column}, COUNT(*) as {label}, 0 as error
+    FROM {table}
+    WHERE timestamp BETWEEN ? AND ?
+    GROUP BY {column}
+    ORDER BY {label} DESC
+    LIMIT {int(limit)}
+    """
+    return (query, (start_date, end_date))
+
+def subnet_items(cidr: str, start_date: str, end_date: str, limit: int = 20) -> Any:
+    """Traffic per source IP inside a CIDR block, one range of the covering src_ip_int index"""
+    lo, hi = cidr_range(cidr)
+    column = "src_ip_int" if ip_columns_enabled() else "IP_TO_INT(src_ip)"
+    query = f"""
+    SELECT
+        INT_TO_IP({column}) as src_ip,
+        COUNT(*) as connections,
+        SUM(action = 'REJECT') as rejected,
+        SUM(bytes_sent) as bytes_sent
+    FROM vpc_logs
+    WHERE {column} BETWEEN ? AND ?
+    AND timestamp BETWEEN ? AND ?
+    GROUP BY {column}
+    ORDER BY connections DESC
+    LIMIT {int(limit)}
+    """
+    return (query, (lo, hi, start_date, end_date))
+
+def subnet_filter() -> Optional[str]:
+    """CIDR block typed in the sidebar, None when empty or not a valid block"""
+    cidr = st.session_state.get("subnet", "").strip()
+    try:
+        return cidr if cidr and cidr_range(cidr) else None
+    except ValueError:
+        return None
+
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+
+def latency_quantiles(dimension: str, start_date: str, end_date: str) -> Any:
+    """p50/p95/p99 latency per function or endpoint: merged digests in approximate mode, exact ranks otherwise"""
+    if use_sketches():
+        return sketch_query(latency_percentiles, start_date, end_date, dimension, LATENCY_QUANTILES)
+    # Exact: the row at rank q * (n - 1) of each group, as the digests pick theirs
+    percentiles = ", ".join(f"MAX(CASE WHEN rn = CAST({q} * (n - 1) AS INTEGER) + 1 THEN duration_ms END) "
+                            f"as p{q * 100:g}" for q in LATENCY_QUANTILES)
+    source = "execution_logs"
+    if dimension == "endpoint":
+        # request ids repeat in the access log: an execution takes its first access row's endpoint
+        source = """execution_logs e
+    JOIN (SELECT request_id, endpoint, MIN(rowid) FROM access_logs GROUP BY request_id) a
+        ON a.request_id = e.request_id"""
+    query = f"""
+    SELECT {dimension}, MAX(n) as count, {percentiles}
+    FROM (
+        SELECT {dimension}, duration_ms,
+               ROW_NUMBER() OVER (PARTITION BY {dimension} ORDER BY duration_ms) as rn,
+               COUNT(*) OVER (PARTITION BY {dimension}) as n
+        FROM {source}
+        WHERE timestamp BETWEEN ? AND ? AND duration_ms IS NOT NULL
+    )
+    GROUP BY {dimension}
+    ORDER BY count DESC
+    """
+    return (query, (start_date, end_date))
+
+# ==============================================
+# ANOMALY ALERTS
+# ==============================================
+ALERT_UNITS = {"request_burst": "requests", "error_burst": "errors", "rejection_burst": "rejected connections",
+               "exfiltration": "bytes sent"}
+
+@st.cache_data(ttl=300)
+def alerts_ready() -> bool:
+    """Whether the database has an alerts table maintained by the detector"""
+    conn = connect(DB_PATH, read_only=True)
+    try:
+        return alerts_available(conn)
+    finally:
+        conn.close()
+
+def detect_in_window(start_date: str, end_date: str, limit: int) -> pd.DataFrame:
+    """Run the detector over the window's rows, for databases without an alerts table"""
+    conn = connect_window(SHARD_DIR, start_date, end_date) if SHARD_DIR else connect(DB_PATH, read_only=True)
+    try:
+        params = (start_date, end_date)
+        access = query_dataframe(conn, "SELECT timestamp, user_id, status_code FROM access_logs "
+                                       "WHERE timestamp BETWEEN ? AND ?", params)
+        vpc = query_dataframe(conn, "SELECT timestamp, src_ip, action, bytes_sent FROM vpc_logs "
+                                    "WHERE timestamp BETWEEN ? AND ?", params)
+    finally:
+        conn.close()
+    return detect(access, vpc).head(limit)
+
+def alert_items(start_date: str, end_date: str, limit: int) -> Any:
+    """Highest scored alerts overlapping the window"""
+    if SHARD_DIR or not alerts_ready():
+        return lambda: detect_in_window(start_date, end_date, limit)
+    query = f"""
+    SELECT entity_type, entity, kind, window_start, window_end, value, baseline, score, windows
+    FROM alerts
+    WHERE window_end >= ? AND window_start <= ?
+    ORDER BY score DESC
+    LIMIT {int(limit)}
+    """
+    return (query, (start_date, end_date))
+
+def alert_level(score: float) -> AlertLevel:
+    if score >= 10:
+        return AlertLevel.CRITICAL
+    if score >= 6:
+        return AlertLevel.HIGH
+    return AlertLevel.MEDIUM
+
+# ==============================================
+# PARALLEL PANEL EXECUTION
+# ==============================================
+PANEL_WORKERS = 4
+
+def fetch_panels(panels: List[Tuple[str, Any, Any]], connect_fn: Callable[[], sqlite3.Connection],
+                 start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+    """Run every panel's declared queries concurrently, one read-only connection per worker thread.
+
+    A declared query is either (sql, params) or a callable returning a DataFrame.
+    Returns per panel its frames, query errors and timings (ready_ms is when the
+    panel's last query finished, query_ms the summed query time).
+    """
+    local = threading.local()
+    opened = []
+    lock = threading.Lock()
+
+    def open_connection():
+        local.conn = connect_fn()
+        with lock:
+            opened.append(local.conn)
+
+    def run(panel: str, key: str, spec: Any):
+        started = time.perf_counter()
+        try:
+            df = spec() if callable(spec) else query_dataframe(local.conn, *spec)
+            error = None
+        except Exception as e:
+            df, error = pd.DataFrame(), str(e)
+        finished = time.perf_counter()
+        return panel, key, df, error, (finished - started) * 1000, (finished - t0) * 1000
+
+    tasks = [
+        (name, key, spec)
+        for name, declare_queries, _ in panels
+        for key, spec in declare_queries(start_date, end_date).items()
+    ]
+    results = {name: {"data": {}, "errors": [], "query_ms": 0.0, "ready_ms": 0.0} for name, _, _ in panels}
+
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=PANEL_WORKERS, initializer=open_connection) as pool:
+            for panel, key, df, error, query_ms, ready_ms in pool.map(lambda task: run(*task), tasks):
+                result = results[panel]
+                result["data"][key] = df
+                result["query_ms"] += query_ms
+                result["ready_ms"] = max(result["ready_ms"], ready_ms)
+                if error:
+                    result["errors"].append(error)
+    finally:
+        for conn in opened:
+            conn.close()
+    return results
+
+def show_sketch_caption(top: pd.DataFrame) -> None:
+    """Error bound of a top-K chart drawn from sketches"""
+    if use_sketches():
+        st.caption(f"≈ Top-K sketch estimate: counts are upper bounds, at most {int(top['error'].max()):,} "
+                   f"over (worst case total rows / {TOP_K})")
+
+def show_panel_status(result: Dict[str, Any]) -> None:
+    """Per-panel timing caption and any query errors, rendered on the main thread"""
+    for error in result["errors"]:
+        st.error(f"❌ Query execution failed: {error}")
+    st.caption(f"⏱️ Data ready after {result['ready_ms']:.0f} ms ({result['query_ms']:.0f} ms of queries)")
+
 # ==============================================
 # UI COMPONENTS
 # ==============================================
@@ -622,16 +881,16 @@ def date_selector() -> Tuple[str, str]:
         index=[tr.value[0] for tr in TimeRange].index(DEFAULT_DATE_RANGE.value[0]))
     
     if selected_option != TimeRange.CUSTOM.value[0]:
+        # Relative ranges keep their exact times, the hour ranges would be whole days otherwise
         days = next(tr.value[1] for tr in TimeRange if tr.value[0] == selected_option)
-        start_date = datetime.now() - timedelta(days=days)
-        end_date = datetime.now()
+        end_dt = datetime.now().replace(microsecond=0)
+        start_dt = end_dt - timedelta(days=days)
     else:
         col1, col2 = st.sidebar.columns(2)
         start_date = col1.date_input("Start date", datetime.now() - timedelta(days=DEFAULT_DATE_RANGE.value[1]))
         end_date = col2.date_input("End date", datetime.now())
-    
-    start_dt = datetime.combine(start_date, datetime.min.time())
-    end_dt = datetime.combine(end_date, datetime.max.time())
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        end_dt = datetime.combine(end_date, datetime.max.time()).replace(microsecond=0)
     
     st.sidebar.caption(f"Selected range: {start_dt.strftime('%Y-%m-%d %H:%M')} to {end_dt.strftime('%Y-%m-%d %H:%M')}")
     return start_dt.strftime(DATE_FORMAT), end_dt.strftime(DATE_FORMAT)
@@ -667,97 +926,26 @@ def create_time_chart(df: pd.DataFrame, x: str, y: str, title: str, color: str =
     """Create time series chart with consistent theming"""
     if df.empty or x not in df.columns or y not in df.columns:
         return None
-        
-    fig = px.line(
-        df, 
-        x=x, 
-        y=y, 
-        title=title,
-        color=color,
-        line_shape="spline",
-        markers=True,
-        color_discrete_sequence=px.colors.qualitative.Plotly
-    )
-    
-    fig.update_layout(
-        template="plotly_dark",
-        margin=dict(l=20, r=20, t=60, b=20),
-        font=dict(family="Segoe UI", size=12),
-        plot_bgcolor="#0E1117",
-        paper_bgcolor="#0E1117",
-        hoverlabel=dict(bgcolor="#1F2C40", font_size=12)
-    )
-    
-    if len(df) > 7:  # Add trendline if enough data points
-        fig.add_trace(go.Scatter(
-            x=df[x], 
-            y=df[y].rolling(7, min_periods=1).mean(),
-            name='7-day Avg',
-            line=dict(color='#FFA15A', dash='dot')
-        ))
-    return fig
+    return charts.line_chart(df, x, y, title, color)
 
 def create_bar_chart(df: pd.DataFrame, x: str, y: str, title: str, color: str = None) -> Optional[go.Figure]:
     """Create bar chart with consistent theming"""
     if df.empty or x not in df.columns or y not in df.columns:
         return None
-        
-    fig = px.bar(
-        df, 
-        x=x, 
-        y=y, 
-        title=title,
-        color=color,
-        text=y,
-        color_discrete_sequence=px.colors.qualitative.Plotly
-    )
-    
-    fig.update_layout(
-        template="plotly_dark",
-        margin=dict(l=20, r=20, t=60, b=20),
-        font=dict(family="Segoe UI", size=12),
-        plot_bgcolor="#0E1117",
-        paper_bgcolor="#0E1117",
-        hoverlabel=dict(bgcolor="#1F2C40", font_size=12)
-    )
-    
-    fig.update_traces(texttemplate='%{text:,}', textposition='outside')
-    return fig
+    return charts.bar_chart(df, x, y, title, color)
 
 def create_pie_chart(df: pd.DataFrame, names: str, values: str, title: str) -> Optional[go.Figure]:
     """Create pie/donut chart with consistent theming"""
     if df.empty or names not in df.columns or values not in df.columns:
         return None
-        
-    fig = px.pie(
-        df,
-        names=names,
-        values=values,
-        title=title,
-        hole=0.4,
-        color_discrete_sequence=px.colors.qualitative.Plotly
-    )
-    
-    fig.update_layout(
-        template="plotly_dark",
-        margin=dict(l=20, r=20, t=60, b=20),
-        font=dict(family="Segoe UI", size=12),
-        plot_bgcolor="#0E1117",
-        paper_bgcolor="#0E1117",
-        hoverlabel=dict(bgcolor="#1F2C40", font_size=12)
-    )
-    
-    return fig
+    return charts.pie_chart(df, names, values, title)
 
 # ==============================================
 # DASHBOARD SECTIONS
 # ==============================================
-def system_health_overview(conn: sqlite3.Connection, start_date: str, end_date: str) -> None:
-    """Display key system health metrics and trends"""
-    st.header("📈 System Health Overview")
-    
-    # Get system metrics
-    query = """
+def system_health_queries(start_date: str, end_date: str) -> Dict[str, Any]:
+    """Queries behind the system health panel"""
+    metrics_query = """
     SELECT 
         (SELECT COUNT(*) FROM access_logs WHERE timestamp BETWEEN ? AND ?) as total_requests,
         (SELECT AVG(duration_ms) FROM execution_logs WHERE timestamp BETWEEN ? AND ?) as avg_latency,
@@ -767,9 +955,46 @@ def system_health_overview(conn: sqlite3.Connection, start_date: str, end_date:
         (SELECT COUNT(*) FROM vpc_logs WHERE action = 'REJECT' AND timestamp BETWEEN ? AND ?) as rejected_connections,
         (SELECT COUNT(*) FROM execution_logs WHERE status = 'FAILED' AND timestamp BETWEEN ? AND ?) as failed_executions
     """
-    params = (start_date, end_date) * 6
-    metrics_df = run_query(conn, query, params)
-    metrics = safe_get_first_row(metrics_df)
+    # Bucket sized from the window so the trend never exceeds MAX_BUCKETS points
+    bucket_seconds, _ = choose_bucket(datetime.fromisoformat(start_date), datetime.fromisoformat(end_date))
+    trend_query = f"""
+    SELECT 
+        {bucket_label_sql('a.timestamp', bucket_seconds)} as date,
+        COUNT(*) as requests,
+        AVG(e.duration_ms) as latency,
+        100.0 * SUM(CASE WHEN a.status_code < 400 THEN 1 ELSE 0 END) / COUNT(*) as success_rate,
+        COUNT(DISTINCT a.user_id) as daily_users
+    FROM access_logs a
+    LEFT JOIN execution_logs e ON a.request_id = e.request_id
+    WHERE a.timestamp BETWEEN ? AND ?
+    GROUP BY {bucket_sql('a.timestamp', bucket_seconds)}
+    ORDER BY date
+    """
+    if SHARD_DIR:
+        metrics = lambda: fetch_sharded_metrics(start_date, end_date)
+    elif use_sketches():
+        # Distinct users from the merged HyperLogLog instead of COUNT(DISTINCT user_id)
+        exact_users = "(SELECT COUNT(DISTINCT user_id) FROM access_logs WHERE timestamp BETWEEN ? AND ?)"
+        query = metrics_query.replace(exact_users, "NULL")
+        def metrics():
+            df = sketch_query(lambda conn: query_dataframe(conn, query, (start_date, end_date) * 5))()
+            users = sketch_query(approx_distinct, "access_logs.user_id", start_date, end_date)()
+            return df.assign(active_users=users)
+    else:
+        metrics = (metrics_query, (start_date, end_date) * 6)
+    return {
+        "metrics": metrics,
+        "alerts": alert_items(start_date, end_date, 5),
+        "trend": (trend_query, (start_date, end_date)),
+    }
+
+def system_health_overview(result: Dict[str, Any]) -> None:
+    """Display key system health metrics and trends"""
+    st.header("📈 System Health Overview")
+    show_panel_status(result)
+    data = result["data"]
+    
+    metrics = safe_get_first_row(data["metrics"]) or {}
     
     # Display metrics in cards
     col1, col2, col3 = st.columns(3)
@@ -781,7 +1006,8 @@ def system_health_overview(conn: sqlite3.Connection, start_date: str, end_date:
 
     with col2:
         display_metric_card("👥 Active Users", f"{metrics.get('active_users', 0):,}", 
-                      help_text="Unique users with activity")
+                      help_text="Unique users with activity" + (
+                          f" (HyperLogLog estimate, ±{104 / 2 ** (HLL_PRECISION / 2):.1f}%)" if use_sketches() else ""))
         display_metric_card("✅ Success Rate", f"{metrics.get('success_rate', 0):.1f}%", 
                       help_text="Percentage of successful executions")
 
@@ -793,56 +1019,22 @@ def system_health_overview(conn: sqlite3.Connection, start_date: str, end_date:
     
     # Alerts section
     st.subheader("🚨 Recent Alerts")
-    query = """
-    SELECT 
-        v.src_ip,
-        COUNT(*) as request_count,
-        SUM(CASE WHEN a.status_code >= 400 THEN 1 ELSE 0 END) as errors,
-        COUNT(DISTINCT a.user_id) as users_affected,
-        100.0 * SUM(CASE WHEN a.status_code >= 400 THEN 1 ELSE 0 END) / COUNT(*) as error_rate
-    FROM vpc_logs v
-    JOIN access_logs a ON v.request_id = a.request_id
-    WHERE v.timestamp BETWEEN ? AND ?
-    GROUP BY v.src_ip
-    HAVING request_count > 10 AND error_rate > 20
-    ORDER BY error_rate DESC
-    LIMIT 5
-    """
-    alerts = run_query(conn, query, (start_date, end_date))
+    alerts = data["alerts"]
     
     if not alerts.empty:
         for _, row in alerts.iterrows():
-            if row['error_rate'] > 50:
-                level = AlertLevel.CRITICAL
-            elif row['error_rate'] > 30:
-                level = AlertLevel.HIGH
-            else:
-                level = AlertLevel.MEDIUM
-                
             display_alert(
-                level,
-                f"Suspicious activity from {row['src_ip']}",
-                f"{row['error_rate']:.1f}% error rate across {row['request_count']} requests affecting {row['users_affected']} users"
+                alert_level(row['score']),
+                f"{row['kind'].replace('_', ' ').capitalize()} from {row['entity_type']} {row['entity']}",
+                f"{row['value']:,.0f} {ALERT_UNITS.get(row['kind'], '')} per window vs a typical {row['baseline']:,.1f} "
+                f"(z = {row['score']:.1f}), {row['window_start']} → {row['window_end']}"
             )
     else:
         st.info("🎉 No critical alerts detected in the selected time period")
     
     # Trend visualization
     with st.expander("📊 Trends Over Time", expanded=True):
-        query = """
-        SELECT 
-            strftime('%Y-%m-%d', a.timestamp) as date,
-            COUNT(*) as requests,
-            AVG(e.duration_ms) as latency,
-            100.0 * SUM(CASE WHEN a.status_code < 400 THEN 1 ELSE 0 END) / COUNT(*) as success_rate,
-            COUNT(DISTINCT a.user_id) as daily_users
-        FROM access_logs a
-        LEFT JOIN execution_logs e ON a.request_id = e.request_id
-        WHERE a.timestamp BETWEEN ? AND ?
-        GROUP BY date
-        ORDER BY date
-        """
-        trend_data = run_query(conn, query, (start_date, end_date))
+        trend_data = data["trend"]
         
         if not trend_data.empty:
             tab1, tab2 = st.tabs(["Request Metrics", "User Engagement"])
@@ -864,33 +1056,43 @@ def system_health_overview(conn: sqlite3.Connection, start_date: str, end_date:
                     st.plotly_chart(fig, use_container_width=True)
             
             with tab2:
-                fig = create_time_chart(trend_data, 'date', 'daily_users', 'Daily Active Users')
+                fig = create_time_chart(trend_data, 'date', 'daily_users', 'Active Users')
                 if fig:
                     st.plotly_chart(fig, use_container_width=True)
         else:
             st.warning("⚠️ No trend data available for selected period")
 
-def performance_analysis(conn: sqlite3.Connection, start_date: str, end_date: str) -> None:
+def performance_queries(start_date: str, end_date: str) -> Dict[str, Any]:
+    """Queries behind the performance panel"""
+    endpoint_query = """
+    SELECT 
+        endpoint,
+        method,
+        COUNT(*) as requests,
+        AVG(duration_ms) as avg_duration,
+        MAX(duration_ms) as max_duration,
+        100.0 * SUM(CASE WHEN status_code < 400 THEN 1 ELSE 0 END) / COUNT(*) as success_rate
+    FROM access_logs a
+    JOIN execution_logs e ON a.request_id = e.request_id
+    WHERE a.timestamp BETWEEN ? AND ?
+    GROUP BY endpoint, method
+    ORDER BY requests DESC
+    LIMIT 20
+    """
+    return {
+        "endpoints": (endpoint_query, (start_date, end_date)),
+        "function_latency": latency_quantiles("function_name", start_date, end_date),
+        "endpoint_latency": latency_quantiles("endpoint", start_date, end_date),
+    }
+
+def performance_analysis(result: Dict[str, Any]) -> None:
     """Analyze system performance metrics"""
     st.header("⚡ Performance Analysis")
+    show_panel_status(result)
+    data = result["data"]
     
     with st.expander("🔍 Endpoint Performance", expanded=True):
-        query = """
-        SELECT 
-            endpoint,
-            method,
-            COUNT(*) as requests,
-            AVG(duration_ms) as avg_duration,
-            MAX(duration_ms) as max_duration,
-            100.0 * SUM(CASE WHEN status_code < 400 THEN 1 ELSE 0 END) / COUNT(*) as success_rate
-        FROM access_logs a
-        JOIN execution_logs e ON a.request_id = e.request_id
-        WHERE a.timestamp BETWEEN ? AND ?
-        GROUP BY endpoint, method
-        ORDER BY requests DESC
-        LIMIT 20
-        """
-        endpoint_data = run_query(conn, query, (start_date, end_date))
+        endpoint_data = data["endpoints"]
         
         if not endpoint_data.empty:
             col1, col2 = st.columns(2)
@@ -909,7 +1111,7 @@ def performance_analysis(conn: sqlite3.Connection, start_date: str, end_date: st
             
             with col2:
                 st.subheader("Performance vs Success Rate")
-                fig = px.scatter(
+                fig = charts.bubble_chart(
                     endpoint_data,
                     x='avg_duration',
                     y='success_rate',
@@ -922,14 +1124,6 @@ def performance_analysis(conn: sqlite3.Connection, start_date: str, end_date: st
                         'success_rate': 'Success Rate (%)'
                     }
                 )
-                fig.update_layout(
-                    template="plotly_dark",
-                    margin=dict(l=20, r=20, t=60, b=20),
-                    font=dict(family="Segoe UI", size=12),
-                    plot_bgcolor="#0E1117",
-                    paper_bgcolor="#0E1117",
-                    hoverlabel=dict(bgcolor="#1F2C40", font_size=12)
-                )
                 st.plotly_chart(fig, use_container_width=True)
             
             st.subheader("Detailed Endpoint Metrics")
@@ -945,29 +1139,68 @@ def performance_analysis(conn: sqlite3.Connection, start_date: str, end_date: st
             )
         else:
             st.warning("⚠️ No endpoint performance data available")
+    
+    with st.expander("⏱️ Latency Percentiles", expanded=True):
+        for key, dimension, title in (("function_latency", "function_name", "Function"),
+                                      ("endpoint_latency", "endpoint", "Endpoint")):
+            latency = data[key]
+            if latency.empty:
+                st.warning(f"⚠️ No {title.lower()} latency data available")
+                continue
+            long = latency.head(10).melt(id_vars=dimension, value_vars=["p50", "p95", "p99"],
+                                         var_name="percentile", value_name="latency_ms")
+            fig = charts.bar_chart(long, dimension, "latency_ms", f"{title} Latency Percentiles (ms)",
+                                   color="percentile", text=False, barmode="group")
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(latency.round(1), use_container_width=True, hide_index=True)
+        if use_sketches():
+            st.caption("≈ Merged hourly latency digests: each percentile within 1% of a true latency")
+
+def security_queries(start_date: str, end_date: str) -> Dict[str, Any]:
+    """Queries behind the security panel"""
+    failed_auth_query = """
+    SELECT 
+        endpoint,
+        COUNT(*) as failed_attempts,
+        COUNT(DISTINCT user_id) as users_affected
+    FROM access_logs
+    WHERE timestamp BETWEEN ? AND ?
+    AND status_code = 401
+    GROUP BY endpoint
+    ORDER BY failed_attempts DESC
+    LIMIT 10
+    """
+    vpc_actions_query = """
+    SELECT 
+        action,
+        COUNT(*) as count,
+        100.0 * COUNT(*) / (SELECT COUNT(*) FROM vpc_logs WHERE timestamp BETWEEN ? AND ?) as percentage
+    FROM vpc_logs
+    WHERE timestamp BETWEEN ? AND ?
+    GROUP BY action
+    """
+    queries = {
+        "failed_auth": (failed_auth_query, (start_date, end_date)),
+        "vpc_actions": (vpc_actions_query, (start_date, end_date, start_date, end_date)),
+        "suspicious": alert_items(start_date, end_date, 50),
+        "top_ips": top_items("vpc_logs", "src_ip", "connections", start_date, end_date),
+    }
+    if subnet_filter():
+        queries["subnet"] = subnet_items(subnet_filter(), start_date, end_date)
+    return queries
 
-def security_analysis(conn: sqlite3.Connection, start_date: str, end_date: str) -> None:
+def security_analysis(result: Dict[str, Any]) -> None:
     """Analyze security-related patterns and anomalies"""
     st.header("🔒 Security Analysis")
+    show_panel_status(result)
+    data = result["data"]
     
     with st.expander("🛡️ Threat Detection", expanded=True):
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Failed Authentication Attempts")
-            query = """
-            SELECT 
-                endpoint,
-                COUNT(*) as failed_attempts,
-                COUNT(DISTINCT user_id) as users_affected
-            FROM access_logs
-            WHERE timestamp BETWEEN ? AND ?
-            AND status_code = 401
-            GROUP BY endpoint
-            ORDER BY failed_attempts DESC
-            LIMIT 10
-            """
-            failed_auth = run_query(conn, query, (start_date, end_date))
+            failed_auth = data["failed_auth"]
             
             if not failed_auth.empty:
                 fig = create_bar_chart(
@@ -982,16 +1215,7 @@ def security_analysis(conn: sqlite3.Connection, start_date: str, end_date: str)
         
         with col2:
             st.subheader("VPC Rejections Analysis")
-            query = """
-            SELECT 
-                action,
-                COUNT(*) as count,
-                100.0 * COUNT(*) / (SELECT COUNT(*) FROM vpc_logs WHERE timestamp BETWEEN ? AND ?) as percentage
-            FROM vpc_logs
-            WHERE timestamp BETWEEN ? AND ?
-            GROUP BY action
-            """
-            vpc_actions = run_query(conn, query, (start_date, end_date, start_date, end_date))
+            vpc_actions = data["vpc_actions"]
             
             if not vpc_actions.empty:
                 fig = create_pie_chart(
@@ -1003,91 +1227,94 @@ def security_analysis(conn: sqlite3.Connection, start_date: str, end_date: str)
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info("🛈 No VPC action data available")
+        
+        top_ips = data["top_ips"]
+        if not top_ips.empty:
+            st.subheader("Top Source IPs")
+            fig = create_bar_chart(top_ips, 'src_ip', 'connections', 'Top Source IPs by Connections')
+            st.plotly_chart(fig, use_container_width=True)
+            show_sketch_caption(top_ips)
+        
+        subnet = data.get("subnet")
+        if subnet is not None:
+            st.subheader(f"Source IPs in {subnet_filter()}")
+            if not subnet.empty:
+                st.dataframe(subnet, use_container_width=True, hide_index=True)
+            else:
+                st.info("🛈 No traffic from this subnet in the selected range")
     
     with st.expander("🔎 Suspicious Activity Patterns", expanded=True):
-        query = """
-        SELECT 
-            v.src_ip,
-            COUNT(*) as request_count,
-            SUM(CASE WHEN a.status_code >= 400 THEN 1 ELSE 0 END) as errors,
-            COUNT(DISTINCT a.user_id) as users_affected,
-            100.0 * SUM(CASE WHEN a.status_code >= 400 THEN 1 ELSE 0 END) / COUNT(*) as error_rate,
-            GROUP_CONCAT(DISTINCT a.endpoint) as endpoints_accessed
-        FROM vpc_logs v
-        JOIN access_logs a ON v.request_id = a.request_id
-        WHERE v.timestamp BETWEEN ? AND ?
-        GROUP BY v.src_ip
-        HAVING request_count > 10 AND error_rate > 20
-        ORDER BY error_rate DESC
-        LIMIT 20
-        """
-        suspicious_ips = run_query(conn, query, (start_date, end_date))
+        suspicious = data["suspicious"]
         
-        if not suspicious_ips.empty:
-            st.subheader("Suspicious IP Activity")
+        if not suspicious.empty:
+            st.subheader("Detected Anomalies")
             
             tab1, tab2 = st.tabs(["Table View", "Pattern Analysis"])
             
             with tab1:
                 st.dataframe(
-                    suspicious_ips.assign(
-                        request_count=lambda x: x['request_count'].apply("{:,}".format),
-                        error_rate=lambda x: x['error_rate'].round(1).astype(str) + "%",
-                        users_affected=lambda x: x['users_affected'].apply("{:,}".format)
+                    suspicious.assign(
+                        value=lambda x: x['value'].apply("{:,.0f}".format),
+                        baseline=lambda x: x['baseline'].round(1),
+                        score=lambda x: x['score'].round(1)
                     ),
                     height=500,
-                    use_container_width=True
+                    use_container_width=True,
+                    hide_index=True
                 )
             
             with tab2:
-                fig = px.scatter(
-                    suspicious_ips,
-                    x='request_count',
-                    y='error_rate',
-                    size='users_affected',
-                    color='src_ip',
-                    hover_name='src_ip',
-                    hover_data=['endpoints_accessed'],
+                fig = charts.bubble_chart(
+                    suspicious,
+                    x='value',
+                    y='score',
+                    size='windows',
+                    color='kind',
+                    hover_name='entity',
+                    hover_data=['entity_type', 'window_start', 'window_end'],
                     log_x=True,
                     labels={
-                        'request_count': 'Total Requests',
-                        'error_rate': 'Error Rate (%)',
-                        'users_affected': 'Users Affected'
+                        'value': 'Peak Window Value',
+                        'score': 'Anomaly Score (z)',
+                        'windows': 'Anomalous Windows'
                     }
                 )
-                fig.update_layout(
-                    template="plotly_dark",
-                    margin=dict(l=20, r=20, t=60, b=20),
-                    font=dict(family="Segoe UI", size=12),
-                    plot_bgcolor="#0E1117",
-                    paper_bgcolor="#0E1117",
-                    hoverlabel=dict(bgcolor="#1F2C40", font_size=12)
-                )
                 st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"Per-minute windows (hourly for exfiltration) scored against all windows of the same kind; "
+                       f"alerts at z ≥ {Z_THRESHOLD:g}")
         else:
             st.info("🛈 No suspicious activity patterns detected")
 
-def user_behavior_analysis(conn: sqlite3.Connection, start_date: str, end_date: str) -> None:
+def user_behavior_queries(start_date: str, end_date: str) -> Dict[str, Any]:
+    """Queries behind the user behavior panel"""
+    activity_query = """
+    SELECT
+        a.user_id,
+        COUNT(DISTINCT date(a.timestamp)) as active_days,
+        COUNT(*) as total_requests,
+        AVG(e.duration_ms) as avg_duration,
+        100.0 * SUM(CASE WHEN e.status = 'SUCCESS' THEN 1 ELSE 0 END) / COUNT(*) as success_rate
+    FROM access_logs a
+    JOIN execution_logs e ON a.request_id = e.request_id
+    WHERE a.timestamp BETWEEN ? AND ?
+    GROUP BY a.user_id
+    HAVING active_days > 1 AND total_requests > 10
+    ORDER BY total_requests DESC
+    LIMIT 50
+    """
+    return {
+        "user_activity": (activity_query, (start_date, end_date)),
+        "top_users": top_items("access_logs", "user_id", "total_requests", start_date, end_date),
+    }
+
+def user_behavior_analysis(result: Dict[str, Any]) -> None:
     """Analyze user behavior patterns"""
     st.header("👤 User Behavior Analysis")
+    show_panel_status(result)
+    data = result["data"]
     
     with st.expander("📊 User Activity Patterns", expanded=True):
-        query = """
-        SELECT
-            a.user_id,
-            COUNT(DISTINCT date(a.timestamp)) as active_days,
-            COUNT(*) as total_requests,
-            AVG(e.duration_ms) as avg_duration,
-            100.0 * SUM(CASE WHEN e.status = 'SUCCESS' THEN 1 ELSE 0 END) / COUNT(*) as success_rate
-        FROM access_logs a
-        JOIN execution_logs e ON a.request_id = e.request_id
-        WHERE a.timestamp BETWEEN ? AND ?
-        GROUP BY a.user_id
-        HAVING active_days > 1 AND total_requests > 10
-        ORDER BY total_requests DESC
-        LIMIT 50
-        """
-        user_activity = run_query(conn, query, (start_date, end_date))
+        user_activity = data["user_activity"]
         
         if not user_activity.empty:
             col1, col2 = st.columns(2)
@@ -1095,16 +1322,18 @@ def user_behavior_analysis(conn: sqlite3.Connection, start_date: str, end_date:
             with col1:
                 st.subheader("Top Users by Activity")
                 fig = create_bar_chart(
-                    user_activity.head(10),
+                    data["top_users"],
                     'user_id',
                     'total_requests',
                     'Top Users by Request Volume'
                 )
-                st.plotly_chart(fig, use_container_width=True)
+                if fig:
+                    st.plotly_chart(fig, use_container_width=True)
+                    show_sketch_caption(data["top_users"])
             
             with col2:
                 st.subheader("Engagement vs Success")
-                fig = px.scatter(
+                fig = charts.bubble_chart(
                     user_activity,
                     x='active_days',
                     y='success_rate',
@@ -1117,14 +1346,6 @@ def user_behavior_analysis(conn: sqlite3.Connection, start_date: str, end_date:
                         'total_requests': 'Total Requests'
                     }
                 )
-                fig.update_layout(
-                    template="plotly_dark",
-                    margin=dict(l=20, r=20, t=60, b=20),
-                    font=dict(family="Segoe UI", size=12),
-                    plot_bgcolor="#0E1117",
-                    paper_bgcolor="#0E1117",
-                    hoverlabel=dict(bgcolor="#1F2C40", font_size=12)
-                )
                 st.plotly_chart(fig, use_container_width=True)
             
             st.subheader("Detailed User Metrics")
@@ -1140,6 +1361,133 @@ def user_behavior_analysis(conn: sqlite3.Connection, start_date: str, end_date:
         else:
             st.warning("⚠️ No user behavior data available")
 
+# ==============================================
+# PIPELINE LATENCY
+# ==============================================
+def show_llm_client_stats() -> None:
+    """Reuse and throttling counters of the shared LLM client since this server process started"""
+    stats = LLM_CLIENT_STATS.snapshot()
+    if not stats["calls"]:
+        return
+    st.subheader("🔌 Shared LLM Client")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        display_metric_card("📨 Model Calls", f"{stats['calls']:,}",
+                            help_text=f"Peak {stats['peak_in_flight']} in flight")
+    with col2:
+        display_metric_card("♻️ Connection Reuse", f"{stats['reuse_ratio']:.0%}",
+                            help_text=f"{stats['connections']:,} connections for {stats['requests']:,} HTTP requests")
+    with col3:
+        display_metric_card("🔗 Coalesced", f"{stats['coalesced']:,}",
+                            help_text="Identical prompts answered by a call already in flight")
+    with col4:
+        display_metric_card("⏳ Rate-Limit Retries", f"{stats['retries']:,}",
+                            help_text="429 responses retried with backoff")
+
+def pipeline_latency_page() -> None:
+    """p50/p95/p99 latency per chat pipeline stage from the recorded trace spans"""
+    configure_theme()
+    st.header("⏱️ Chat Pipeline Latency")
+    start_date, end_date = date_selector()
+    show_llm_client_stats()
+
+    spans = load_spans(start_date, end_date)
+    reruns = rerun_by_turns(spans)
+    spans = spans[spans["stage"] != RERUN_STAGE]
+    if spans.empty:
+        st.info("🛈 No traced chat requests in the selected period")
+        return
+
+    stats = stage_percentiles(spans)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        display_metric_card("💬 Traced Requests", f"{spans['trace_id'].nunique():,}",
+                            help_text="Chat questions with recorded spans")
+    with col2:
+        per_trace = spans.groupby("trace_id")["duration_ms"].sum()
+        display_metric_card("⌛ p95 Traced Time", f"{per_trace.quantile(0.95):,.0f} ms",
+                            help_text="Sum of stage durations per request")
+    with col3:
+        matches = spans.loc[spans["stage"] == "template_match", "attrs"]
+        hit_rate = matches.str.contains('"hit": true', regex=False, na=False).mean() if len(matches) else 0.0
+        display_metric_card("⚡ Template Hits", f"{hit_rate:.0%}",
+                            help_text="Questions answered from a SQL template, without an LLM call")
+
+    long_stats = stats.melt(id_vars="stage", value_vars=["p50_ms", "p95_ms", "p99_ms"],
+                            var_name="percentile", value_name="latency_ms")
+    long_stats["latency_ms"] = long_stats["latency_ms"].round(1)
+    fig = create_bar_chart(long_stats, "stage", "latency_ms", "Latency per Stage", "percentile")
+    if fig:
+        fig.update_layout(barmode="group")
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Stage Percentiles")
+    st.dataframe(stats.round(1), use_container_width=True)
+
+    if not reruns.empty:
+        long_reruns = reruns.melt(id_vars="turns", value_vars=["p50_ms", "p95_ms"],
+                                  var_name="percentile", value_name="rerun_ms")
+        long_reruns["rerun_ms"] = long_reruns["rerun_ms"].round(1)
+        fig = create_bar_chart(long_reruns, "turns", "rerun_ms", "History Render Time vs Turns", "percentile")
+        if fig:
+            fig.update_layout(barmode="group")
+            fig.update_xaxes(title="Turns in history")
+            st.plotly_chart(fig, use_container_width=True)
+
+# ==============================================
+# LIVE TAIL
+# ==============================================
+LIVE_RANGES = [tr for tr in TimeRange if tr.value[1] is not None and tr.value[1] <= 1]
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_tail_view(time_range: TimeRange) -> None:
+    """Running aggregates over the last hours, refreshed with only the rows added since the last poll"""
+    tail = st.session_state.get("live_tail")
+    if tail is None or tail.window != timedelta(days=time_range.value[1]):
+        tail = st.session_state["live_tail"] = LiveTail(timedelta(days=time_range.value[1]))
+    tail.poll(get_db_connection())
+
+    st.header(f"🔴 Live Tail: {time_range.value[0]}")
+    st.caption(f"⏱️ {tail.last_poll['rows']:,} new rows folded in {tail.last_poll['ms']:.0f} ms, "
+               f"refreshing every {LIVE_REFRESH_SECONDS}s")
+    totals = tail.totals()
+    cols = st.columns(4)
+    with cols[0]:
+        display_metric_card("📈 Total Requests", f"{totals['total_requests']:,}")
+    with cols[1]:
+        display_metric_card("⏱️ Avg Latency", f"{totals['avg_latency']:,.1f} ms")
+    with cols[2]:
+        display_metric_card("✅ Success Rate", f"{totals['success_rate']:.1f}%")
+    with cols[3]:
+        display_metric_card("🛡️ Rejected Connections", f"{totals['rejected_connections']:,}")
+
+    series = tail.series()
+    if series.empty:
+        st.info("🛈 No log rows in the live window yet")
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = create_time_chart(series, "time", "requests", "Requests per Minute")
+        if fig:
+            st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = create_time_chart(series.dropna(subset=["avg_latency"]), "time", "avg_latency", "Latency per Minute")
+        if fig:
+            st.plotly_chart(fig, use_container_width=True)
+
+    error_ips = tail.error_ips()
+    if not error_ips.empty:
+        st.subheader("Source IPs with Errors")
+        st.dataframe(error_ips, use_container_width=True)
+
+# Panels declared up front: (name, queries for a date range, renderer)
+PANELS = [
+    ("system_health", system_health_queries, system_health_overview),
+    ("performance", performance_queries, performance_analysis),
+    ("security", security_queries, security_analysis),
+    ("user_behavior", user_behavior_queries, user_behavior_analysis),
+]
+
 # ==============================================
 # MAIN APPLICATION
 # ==============================================
@@ -1148,39 +1496,67 @@ def main():
     configure_theme()
     
     try:
-        # Get cached database connection
-        conn = get_db_connection()
-        
-        # Verify connection is working
-        test_df = run_query(conn, "SELECT name FROM sqlite_master WHERE type='table'")
-        if test_df.empty:
-            st.error("❌ No tables found in database. Please verify your database setup.")
-            st.stop()
-        
-        st.sidebar.success(f"✅ Connected to database with {len(test_df)} tables")
-        
-        # Get date range
-        start_date, end_date = date_selector()
+        if SHARD_DIR:
+            # Sharded mode: attach only the shards overlapping the selected window
+            start_date, end_date = date_selector()
+            shard_count = len(shards_for_window(SHARD_DIR, start_date, end_date))
+            try:
+                connect_window(SHARD_DIR, start_date, end_date).close()
+            except ShardWindowTooLarge as e:
+                st.error(f"❌ {e}")
+                st.stop()
+            connect_fn = lambda: register_sql_functions(connect_window(SHARD_DIR, start_date, end_date))
+            st.sidebar.success(f"✅ Sharded mode: {shard_count} shards in selected range")
+        else:
+            # Get cached database connection
+            conn = get_db_connection()
+            
+            # Verify connection is working
+            test_df = run_query(conn, "SELECT name FROM sqlite_master WHERE type='table'")
+            if test_df.empty:
+                st.error("❌ No tables found in database. Please verify your database setup.")
+                st.stop()
+            
+            st.sidebar.success(f"✅ Connected to database with {len(test_df)} tables")
+            
+            # Get date range
+            start_date, end_date = date_selector()
+            connect_fn = lambda: register_sql_functions(connect(DB_PATH, read_only=True))
         
         # Add sidebar filters
         st.sidebar.header("🔍 Filters")
         show_alerts = st.sidebar.checkbox("Show Critical Alerts Only", True)
-        # group_by_hour = st.sidebar.checkbox("Group Data by Hour", False)
-        
-        # Dashboard layout
-        system_health_overview(conn, start_date, end_date)
-        st.markdown("---")
+        if not SHARD_DIR and sketches_ready():
+            st.sidebar.checkbox("≈ Approximate counts (sketches)", True, key="approximate_counts",
+                                help="Distinct users and top users/IPs from hourly sketches, windows rounded to the hour")
+        subnet = st.sidebar.text_input("🌐 Subnet (CIDR)", key="subnet", placeholder="10.0.0.0/24",
+                                       help="Source IPs of this block in the security panel, e.g. 192.168.1.0/24")
+        if subnet.strip() and not subnet_filter():
+            st.sidebar.warning(f"⚠️ '{subnet}' is not an IPv4 CIDR block")
+        _, bucket_label = choose_bucket(datetime.fromisoformat(start_date), datetime.fromisoformat(end_date))
+        st.sidebar.caption(f"📊 Trends grouped by {bucket_label}")
         
-        # Performance Analysis
-        performance_analysis(conn, start_date, end_date)
-        st.markdown("---")
+        # Live tail polls only new rows, the full panels are not recomputed meanwhile
+        if not SHARD_DIR and st.sidebar.checkbox("🔴 Live Tail", False):
+            live_range = st.sidebar.selectbox("Live window", LIVE_RANGES, format_func=lambda tr: tr.value[0])
+            live_tail_view(live_range)
+            return
         
-        # Security Analysis
-        security_analysis(conn, start_date, end_date)
-        st.markdown("---")
+        # Run every panel's queries concurrently, render once all results are in
+        started = time.perf_counter()
+        with st.spinner("Loading dashboard..."):
+            results = fetch_panels(PANELS, connect_fn, start_date, end_date)
+        load_ms = (time.perf_counter() - started) * 1000
+        st.sidebar.caption(
+            f"⏱️ Dashboard data loaded in {load_ms:.0f} ms "
+            f"({sum(r['query_ms'] for r in results.values()):.0f} ms of queries in parallel)"
+        )
         
-        # User Behavior Analysis
-        user_behavior_analysis(conn, start_date, end_date)
+        # Dashboard layout
+        for i, (name, _, render) in enumerate(PANELS):
+            if i:
+                st.markdown("---")
+            render(results[name])
         
     except Exception as e:
         st.error(f"❌ Critical application error: {str(e)}")
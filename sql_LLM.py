@@ -1,40 +1,57 @@
-from langchain_community.utilities import SQLDatabase
 from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+from typing import Optional
 from typing_extensions import TypedDict, Annotated
-from langchain.chat_models import init_chat_model
 from langgraph.graph import START, StateGraph
 import os
 import sqlite3
+from utilities.arrow_results import arrow_available, query_arrow, result_length, result_rows
+from utilities.catalog import get_catalog, table_info as catalog_table_info
+from utilities.db import SHARD_DIR
+from utilities.cidr import PROMPT_HINT as CIDR_HINT, ip_columns_enabled
+from utilities.llm import get_llm
+from utilities.search import PROMPT_HINT as SEARCH_HINT, rewrite_query, search_enabled
+from utilities.shards import connect_for_query
+from utilities.sketches import register_sql_functions
+from utilities.templates import Template, match_question
+from utilities.tracing import span
 
+# More rows than this can never fit in the 800 character summary prompt
+SUMMARY_ROW_LIMIT = 200
 
 
+# Structured output format, defined once so the shared client reuses its runnable across questions
+class QueryOutput(TypedDict):
+    query: Annotated[str, ..., "Syntactically valid SQL query."]  # type: ignore
+
 
 def run_sql_llm(question:str)-> dict:
     """
     This function initializes a SQL LLM pipeline to analyze logs from a security and network observability platform.
-    It uses SQLite as the database backend and LangChain's SQLDatabase for querying.
+    It uses SQLite as the database backend, described to the LLM by the stored schema catalog.
     has question,query,result,columns,answer as the state variables.
     """
     # Set environment variables
     # os.environ["LANGSMITH_API_KEY"] = os.environ.get("LANGSMITH_API_KEY", "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")
     # os.environ["LANGSMITH_TRACING"] = "false"
     # os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY", "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")
-    os.environ["LANGSMITH_API_KEY"] = os.getenv("LANGSMITH_API_KEY")
+    # API keys are read from the environment by the provider clients, see utilities/llm.py
     os.environ["LANGSMITH_TRACING"] = os.getenv("LANGSMITH_TRACING", "false")
-    os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
-    # Initialize DB (SQLite version of our synthetic log system)
-    db = SQLDatabase.from_uri("sqlite:///logs2.db")
+    # Fast path: recognised question shapes get their SQL from a template, no LLM call
+    with span("template_match") as attrs:
+        template = match_question(question)
+        attrs["hit"] = template is not None
 
     # Define state for the pipeline
     class State(TypedDict): 
         question : str
         query : str
-        result : str
+        result : object  # pyarrow Table, or list of tuples without pyarrow
         columns : list
         answer : str
+        template : Optional[Template]
 
-    # Initialize LLM (Gemma via Groq)
-    llm = init_chat_model("gemma2-9b-it", model_provider="groq", temperature=0.0)
+    # Initialize LLM (Gemma via Groq, or the local model set in LOGBOT_LLM_PROVIDER)
+    llm = get_llm(temperature=0.0)
 
     # CUSTOM PROMPT FOR LOG ANALYSIS (RAG-style contextual guidance)
     CUSTOM_PROMPT = """
@@ -77,6 +94,8 @@ def run_sql_llm(question:str)-> dict:
     | 2025-04-13T12:04:00 | get_data      | 792         | SUCCESS | req-a8ea25b5 |
 
     Use the request_id to join tables when the question requires correlating events.
+    A PERCENTILE(column, p) aggregate is available for percentiles (p from 0 to 100), use it for p50/p95/p99 questions.
+    {index_hints}
 
     Some example questions:
     Example Question → SQL:
@@ -111,6 +130,9 @@ def run_sql_llm(question:str)-> dict:
     - Count of failed requests by endpoint where latency was greater than 500ms.  
     → SELECT access_logs.endpoint, COUNT(*) AS failed_count FROM execution_logs JOIN access_logs USING (request_id) WHERE execution_logs.status = 'FAILED' AND execution_logs.duration_ms > 500 GROUP BY access_logs.endpoint;
 
+    - What is the p95 latency of each function?  
+    → SELECT function_name, PERCENTILE(duration_ms, 95) AS p95_ms FROM execution_logs GROUP BY function_name ORDER BY p95_ms DESC;
+
     if the question is not related to the logs, say "I can't help with that".
 
     Now, using the following user question and schema, generate a syntactically valid SQL query that works for SQLite. Do NOT explain the query — just return the SQL.
@@ -122,19 +144,23 @@ def run_sql_llm(question:str)-> dict:
     {input}
     """
 
-    # Structured output format
-    class QueryOutput(TypedDict):
-        query: Annotated[str, ..., "Syntactically valid SQL query."]  # type: ignore
-  
-
     # Step 1: SQL generation
     def write_query(state: State):
+        if state.get("template"):
+            return {"query": state["template"].sql}
+        # Schema, samples and column values of the log tables, rebuilt only when the schema changes
+        with span("schema_fetch") as attrs:
+            catalog = get_catalog()
+            attrs["version"] = catalog.get("version")
+            table_info = catalog_table_info(catalog)
         prompt = CUSTOM_PROMPT.format(
-            table_info=db.get_table_info(),
+            table_info=table_info,
+            index_hints=(SEARCH_HINT if search_enabled() else "") + (CIDR_HINT if ip_columns_enabled() else ""),
             input=state["question"]
         )
         structured_llm = llm.with_structured_output(QueryOutput)
-        result = structured_llm.invoke(prompt)
+        with span("sql_generation"):
+            result = structured_llm.invoke(prompt)
         return {"query": result["query"]}
 
 
@@ -142,15 +168,37 @@ def run_sql_llm(question:str)-> dict:
     def execute_query(state: State):
         # execute_query_tool = QuerySQLDatabaseTool(db=db)
         # return {"result": execute_query_tool.invoke(state["query"])}
-            conn = sqlite3.connect("logs2.db")
-            cursor = conn.cursor()
-            cursor.execute(state["query"])
-            rows = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]  # 👈 column names
-            return {"result": rows, "columns": columns}
+        with span("sql_execution") as attrs:
+            if SHARD_DIR:
+                # Sharded mode: only the shards the query's dates can touch are attached
+                conn = connect_for_query(SHARD_DIR, state["query"])
+            else:
+                conn = sqlite3.connect("logs2.db")
+            register_sql_functions(conn)
+            try:
+                # Selective LIKE filters on endpoints, users, functions and IPs go through the trigram index
+                query = rewrite_query(conn, state["query"])
+                attrs["search"] = query != state["query"]
+                if arrow_available():
+                    # Columnar fetch, the table goes to the DataFrame without a row copy
+                    table = query_arrow(conn, query)
+                    attrs["rows"] = table.num_rows
+                    return {"result": table, "columns": table.column_names}
+                cursor = conn.cursor()
+                cursor.execute(query)
+                rows = cursor.fetchall()
+                columns = [desc[0] for desc in cursor.description]  # 👈 column names
+                attrs["rows"] = len(rows)
+                return {"result": rows, "columns": columns}
+            finally:
+                conn.close()
 
     # Step 3: Answer generation from SQL result
     def generate_answer(state: State):
+        if state.get("template"):
+            return {"answer": state["template"].answer(state["result"])}
+        if result_length(state["result"]) > SUMMARY_ROW_LIMIT:
+            return {"answer":"The data is shown below"}
         prompt = (
             "You are a log analysis assistant.\n\n"
             "Given the following user question, SQL query, and result, explain the outcome, only the outcome not any others.You should striclty just explain the summary of the result only:\n\n"
@@ -159,15 +207,15 @@ def run_sql_llm(question:str)-> dict:
             "The answer should be like an reply from a human.\n\n" 
             f"User Question: {state['question']}\n"
             f"SQL Query: {state['query']}\n"
-            f"SQL Result: {state['result']}\n\n"
+            f"SQL Result: {result_rows(state['result'])}\n\n"
             "Answer:"
         )
-        print(len(prompt))
-        if len(prompt) < 800:
-            response = llm.invoke(prompt)
-            return {"answer": response.content}
-        else:
-             return {"answer":"The data is shown below"}
+        with span("summary", prompt_chars=len(prompt)):
+            if len(prompt) < 800:
+                response = llm.invoke(prompt)
+                return {"answer": response.content}
+            else:
+                 return {"answer":"The data is shown below"}
 
     # Build LangGraph workflow
     graph_builder = StateGraph(State).add_sequence(
@@ -183,7 +231,7 @@ def run_sql_llm(question:str)-> dict:
     #     print(step)
 
 
-    final_state = graph.invoke({"question": question})
+    final_state = graph.invoke({"question": question, "template": template})
     return final_state
 
 
@@ -192,7 +240,7 @@ def general_answers(question:str,mode="normal")->str:
     os.environ["LANGSMITH_API_KEY"] = os.environ.get("LANGSMITH_API_KEY", "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")
     os.environ["LANGSMITH_TRACING"] = "false"
     os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY", "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")
-    llm = init_chat_model("gemma2-9b-it", model_provider="groq",  temperature=0.0)
+    llm = get_llm(temperature=0.0)
     prompt = ""
     if mode=="error":
         prompt = f"""
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The repo is run from its root (`streamlit run app.py`, `python -m utilities...`), not installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
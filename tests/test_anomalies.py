@@ -0,0 +1,72 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from utilities.anomalies import ALERT_COLUMNS, detect
+from utilities.arrow_results import query_dataframe
+
+
+def _window(conn: sqlite3.Connection, start: str, end: str):
+    access = query_dataframe(conn, "SELECT timestamp, user_id, status_code FROM access_logs "
+                                   "WHERE timestamp BETWEEN ? AND ?", (start, end))
+    vpc = query_dataframe(conn, "SELECT timestamp, src_ip, action, bytes_sent FROM vpc_logs "
+                                "WHERE timestamp BETWEEN ? AND ?", (start, end))
+    return access, vpc
+
+
+def _database() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE access_logs (timestamp TEXT, user_id TEXT, status_code INTEGER)")
+    conn.execute("CREATE TABLE vpc_logs (timestamp TEXT, src_ip TEXT, action TEXT, bytes_sent INTEGER)")
+    conn.executemany("INSERT INTO access_logs VALUES (?, ?, ?)",
+                     [(f"2025-03-01T10:{m:02d}:00", "user_1", 200) for m in range(30)])
+    return conn
+
+
+def test_empty_window_has_no_alerts():
+    conn = _database()
+    access, vpc = _window(conn, "2026-01-01T00:00:00", "2026-01-08T00:00:00")
+    alerts = detect(access, vpc)
+    assert alerts.empty
+    assert list(alerts.columns) == ALERT_COLUMNS
+
+
+def test_window_with_one_empty_table_scores_the_other():
+    conn = _database()
+    access, vpc = _window(conn, "2025-03-01T00:00:00", "2025-03-02T00:00:00")
+    assert len(access) == 30 and vpc.empty
+    assert detect(access, vpc).empty  # a steady user, nothing to flag
+
+
+def test_empty_frames():
+    empty = pd.DataFrame(columns=["timestamp", "user_id", "status_code", "src_ip", "action", "bytes_sent"])
+    assert detect(empty, empty).empty
+
+
+def _requests(user: str, per_minute: dict) -> pd.DataFrame:
+    rows = [(f"2025-03-01T{minute // 60:02d}:{minute % 60:02d}:{second % 60:02d}", user, 200)
+            for minute, n in per_minute.items() for second in range(n)]
+    return pd.DataFrame(rows, columns=["timestamp", "user_id", "status_code"])
+
+
+def test_each_entity_is_scored_against_its_own_baseline():
+    rng = np.random.default_rng(0)
+    busy = _requests("busy", {m: int(n) for m, n in enumerate(rng.integers(90, 110, 120))})
+    quiet = {m: int(n) for m, n in enumerate(rng.integers(1, 3, 120))}
+    quiet[60] = 40  # far above the quiet user's own rate, well below the busy one's
+    access = pd.concat([busy, _requests("quiet", quiet)], ignore_index=True)
+    empty_vpc = pd.DataFrame(columns=["timestamp", "src_ip", "action", "bytes_sent"])
+
+    alerts = detect(access, empty_vpc)
+    bursts = alerts[alerts["kind"] == "request_burst"]
+    assert bursts["entity"].tolist() == ["quiet"]
+    assert bursts.iloc[0]["window_start"] == "2025-03-01T01:00:00"
+    assert bursts.iloc[0]["baseline"] < 5
+
+
+def test_short_histories_use_the_detector_baseline():
+    access = pd.concat([_requests("steady", {m: 2 for m in range(120)}), _requests("newcomer", {30: 60})],
+                       ignore_index=True)
+    alerts = detect(access, pd.DataFrame(columns=["timestamp", "src_ip", "action", "bytes_sent"]))
+    assert alerts["entity"].tolist() == ["newcomer"]  # one window, no baseline of its own to be normal against
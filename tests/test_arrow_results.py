@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from utilities.arrow_results import query_arrow, query_dataframe
+
+pa = pytest.importorskip("pyarrow")  # optional dependency, the plain pandas path has no null-typed columns
+
+
+def _database() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE vpc_logs (timestamp TEXT, src_ip TEXT, action TEXT, bytes_sent INTEGER, "
+                 "ratio REAL)")
+    conn.executemany("INSERT INTO vpc_logs VALUES (?, ?, ?, ?, ?)",
+                     [("2025-03-01T10:00:00", "10.0.0.1", "ACCEPT", None, None),
+                      ("2025-03-01T10:01:00", "10.0.0.2", None, None, None)])
+    return conn
+
+
+def test_empty_result_takes_declared_types():
+    table = query_arrow(_database(), "SELECT timestamp, action, bytes_sent, ratio, COUNT(*) AS n "
+                                     "FROM vpc_logs WHERE 0 GROUP BY timestamp")
+    assert table.num_rows == 0
+    assert table.schema.types == [pa.string(), pa.string(), pa.int64(), pa.float64(), pa.int64()]
+
+
+def test_all_null_column_takes_declared_type():
+    table = query_arrow(_database(), "SELECT bytes_sent, ratio, NULL AS extra FROM vpc_logs")
+    assert table.schema.types == [pa.int64(), pa.float64(), pa.int64()]
+    assert table.column("bytes_sent").null_count == 2
+
+
+def test_empty_frame_supports_comparisons():
+    frame = query_dataframe(_database(), "SELECT bytes_sent, action FROM vpc_logs WHERE 0")
+    assert not (frame["bytes_sent"].to_numpy() >= 400).any()
+    assert not frame["action"].isin(["REJECT", "DROP"]).any()
+
+
+def test_types_follow_the_query_not_the_column_name():
+    conn = _database()
+    conn.execute("CREATE TABLE other (action INTEGER)")  # same name as vpc_logs.action, another type
+    conn.execute("CREATE VIEW decoded AS SELECT (SELECT action FROM vpc_logs LIMIT 1) AS code FROM other")
+    table = query_arrow(conn, "SELECT v.action, o.action AS other_action, d.code FROM vpc_logs AS v, other AS o, "
+                              "decoded AS d WHERE v.timestamp > ?", ("9999",))
+    assert table.schema.types == [pa.string(), pa.int64(), pa.string()]
+
+
+def test_read_only_connection(tmp_path):
+    path = str(tmp_path / "logs.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE access_logs (timestamp TEXT, status_code INTEGER)")
+    conn.close()
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    table = query_arrow(conn, "SELECT status_code, timestamp FROM access_logs")
+    assert table.schema.types == [pa.int64(), pa.string()]
@@ -0,0 +1,47 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from monitor import TimeRange
+from utilities.buckets import MAX_BUCKETS, bucket_count, bucket_label_sql, bucket_sql, choose_bucket
+
+END = datetime(2025, 4, 29, 17, 43, 12)
+RANGES = [r for r in TimeRange if r.value[1] is not None]
+
+
+def _buckets(start: datetime, end: datetime, bucket_seconds: int, step: timedelta) -> int:
+    """Distinct buckets bucket_sql gives rows every `step` across the window"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (timestamp TEXT)")
+    n = int((end - start) / step) + 1
+    conn.executemany("INSERT INTO t VALUES (?)", ((f"{start + i * step:%Y-%m-%dT%H:%M:%S}",) for i in range(n)))
+    return conn.execute(f"SELECT COUNT(DISTINCT {bucket_sql('timestamp', bucket_seconds)}) FROM t").fetchone()[0]
+
+
+@pytest.mark.parametrize("time_range", RANGES, ids=lambda r: r.value[0])
+def test_each_time_range_stays_within_the_point_budget(time_range):
+    start = END - timedelta(days=time_range.value[1])
+    seconds, _ = choose_bucket(start, END)
+    assert bucket_count((END - start).total_seconds(), seconds) <= MAX_BUCKETS
+    assert _buckets(start, END, seconds, timedelta(minutes=1)) <= MAX_BUCKETS
+
+
+@pytest.mark.parametrize("time_range, label", list(zip(RANGES, ["minute", "5 minutes", "5 minutes", "5 minutes",
+                                                                "hour", "day"])), ids=str)
+def test_finest_bucket_that_fits(time_range, label):
+    assert choose_bucket(END - timedelta(days=time_range.value[1]), END)[1] == label
+
+
+@pytest.mark.parametrize("days", [365, 3 * 365])
+def test_long_custom_ranges_use_multi_day_buckets(days):
+    start = END - timedelta(days=days)
+    seconds, label = choose_bucket(start, END)
+    assert label.endswith("days")
+    assert _buckets(start, END, seconds, timedelta(hours=6)) <= MAX_BUCKETS
+
+
+def test_bucket_sql_floors_to_the_bucket_start():
+    conn = sqlite3.connect(":memory:")
+    label = conn.execute(f"SELECT {bucket_label_sql(repr('2025-04-29T17:43:12'), 300)}").fetchone()[0]
+    assert label == "2025-04-29 17:40:00"
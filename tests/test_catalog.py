@@ -0,0 +1,86 @@
+import hashlib
+import os
+import sqlite3
+
+from utilities.catalog import catalog_path, get_catalog, refresh_catalog
+
+
+def _database(path: str) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE access_logs (timestamp TEXT, user_id TEXT, endpoint TEXT, method TEXT, "
+                 "status_code INTEGER, request_id TEXT)")
+    conn.executemany("INSERT INTO access_logs VALUES (?, ?, ?, ?, ?, ?)",
+                     [(f"2025-03-01T10:{i % 60:02d}:00", f"user_{i % 5}", "/api/items", "GET", 200, f"req-{i}")
+                      for i in range(100)])
+    conn.commit()
+    conn.close()
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def test_get_catalog_never_writes_the_database(tmp_path):
+    path = str(tmp_path / "logs.db")
+    _database(path)
+    before = _digest(path)
+
+    catalog = get_catalog(path)
+
+    assert catalog["tables"]["access_logs"]["rows"] == 100
+    assert _digest(path) == before
+    assert os.path.exists(catalog_path(path))
+
+
+def test_appends_and_retention_deletes_rebuild_the_catalog(tmp_path):
+    path = str(tmp_path / "logs.db")
+    _database(path)
+    assert get_catalog(path)["tables"]["access_logs"]["rows"] == 100
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO access_logs VALUES ('2025-03-02T09:00:00', 'user_9', '/admin', 'POST', 403, 'req-x')")
+    conn.commit()
+    info = get_catalog(path)["tables"]["access_logs"]
+    assert info["rows"] == 101
+    assert info["ranges"]["timestamp"][1] == "2025-03-02T09:00:00"
+
+    conn.execute("DELETE FROM access_logs WHERE rowid <= 10")  # oldest rows, as retention deletes them
+    conn.commit()
+    conn.close()
+    assert get_catalog(path)["tables"]["access_logs"]["rows"] == 91
+
+
+def test_other_tables_only_restamp_the_catalog(tmp_path):
+    path = str(tmp_path / "logs.db")
+    _database(path)
+    built_at = get_catalog(path)["built_at"]
+
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+    catalog = get_catalog(path)
+    assert catalog["built_at"] == built_at
+    assert catalog["version"] == sqlite3.connect(path).execute("PRAGMA schema_version").fetchone()[0]
+
+
+def test_refresh_drops_the_legacy_table_and_saves_the_sidecar(tmp_path):
+    path = str(tmp_path / "logs.db")
+    _database(path)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE schema_catalog (id INTEGER PRIMARY KEY, version INTEGER, catalog TEXT)")
+    conn.commit()
+
+    catalog = refresh_catalog(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'schema_catalog'").fetchone()[0] == 0
+    conn.close()
+    loaded = get_catalog(path)  # from the sidecar file, not rebuilt
+    assert (loaded["built_at"], loaded["version"]) == (catalog["built_at"], catalog["version"])
+
+
+def test_in_memory_refresh_saves_nothing():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE access_logs (timestamp TEXT, user_id TEXT)")
+    assert refresh_catalog(conn)["tables"]["access_logs"]["rows"] == 0
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.stub_llm_server import StubLLMServer
+from utilities import llm_client
+from utilities.llm_client import STATS, SharedLLM
+
+
+class HttpModel:
+    """Chat model posting to the stand-in API through the shared httpx client, as the provider SDK does"""
+    def __init__(self, url: str):
+        self.url = url
+
+    def invoke(self, prompt: str) -> str:
+        body = {"model": "stub", "messages": [{"role": "user", "content": prompt}]}
+        response = llm_client.http_client().post(f"{self.url}/chat/completions", json=body)
+        response.raise_for_status()  # httpx.HTTPStatusError carries the 429 response and its Retry-After
+        return response.json()["choices"][0]["message"]["content"]
+
+
+class SchemaModel:
+    def with_structured_output(self, schema):
+        return ("runnable", schema)
+
+
+@pytest.fixture
+def httpx():
+    httpx = pytest.importorskip("httpx")
+    STATS.reset()
+    yield httpx
+    if llm_client._http is not None:
+        llm_client._http.close()
+        llm_client._http = None
+
+
+def test_identical_prompts_in_flight_are_sent_once(httpx):
+    with StubLLMServer(latency_ms=300) as server:
+        llm = SharedLLM(HttpModel(server.url))
+        barrier = threading.Barrier(6)
+        replies = []
+
+        def ask():
+            barrier.wait()
+            replies.append(llm.invoke("How many failed logins?"))
+
+        threads = [threading.Thread(target=ask) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(replies) == 6 and len(set(replies)) == 1
+    assert server.stats["requests"] == 1
+    assert STATS.snapshot()["coalesced"] == 5
+
+
+def test_sequential_calls_reuse_one_connection(httpx):
+    with StubLLMServer() as server:
+        llm = SharedLLM(HttpModel(server.url))
+        for i in range(5):
+            llm.invoke(f"question {i}")
+    assert server.stats["connections"] == 1
+    assert STATS.snapshot()["reuse_ratio"] == pytest.approx(0.8)
+
+
+def test_rate_limit_waits_for_retry_after(httpx):
+    # Every second request is answered with a 429 asking for a wait longer than the first backoff step
+    with StubLLMServer(rate_limit_every=2, retry_after=1.0) as server:
+        llm = SharedLLM(HttpModel(server.url))
+        llm.invoke("first")
+        started = time.perf_counter()
+        reply = llm.invoke("second")
+        waited = time.perf_counter() - started
+
+    assert reply == "The query returned the requested rows."
+    assert waited >= 1.0
+    assert server.stats == {"connections": 1, "requests": 3, "rate_limited": 1}
+    counts = STATS.snapshot()
+    assert (counts["calls"], counts["retries"], counts["rate_limited"]) == (3, 1, 1)
+
+
+def test_rate_limit_gives_up_after_max_retries(httpx, monkeypatch):
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 2)
+    with StubLLMServer(rate_limit_every=1, retry_after=0.0) as server:
+        llm = SharedLLM(HttpModel(server.url))
+        with pytest.raises(httpx.HTTPStatusError):
+            llm.invoke("always throttled")
+    assert server.stats["requests"] == 3
+
+
+def test_structured_runnables_are_kept_per_schema_object():
+    llm = SharedLLM(SchemaModel())
+
+    def schema():
+        class QueryOutput(dict):
+            pass
+        return QueryOutput
+
+    first, second = schema(), schema()  # same name, different schemas
+    assert llm.with_structured_output(first) is llm.with_structured_output(first)
+    assert llm.with_structured_output(first).runnable == ("runnable", first)
+    assert llm.with_structured_output(second).runnable == ("runnable", second)
+    assert llm.with_structured_output({"title": "QueryOutput"}).runnable == ("runnable", {"title": "QueryOutput"})
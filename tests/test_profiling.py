@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from benchmarks.bench_profiler import BUDGET_SECONDS, make_frame
+from Visualizations.profiling import PROFILE_SAMPLE_ROWS, choose_chart, profile_columns, sample_rows
+
+ROWS = 1_000_000
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return make_frame(ROWS)
+
+
+def _check(df):
+    started = time.perf_counter()
+    profile = profile_columns(df).set_index("column")
+    chart = choose_chart(profile.reset_index())
+    assert time.perf_counter() - started < BUDGET_SECONDS
+
+    assert profile.loc["request_id", "is_id"] and profile.loc["row", "is_id"]
+    assert profile.loc["timestamp", "kind"] == "datetime"
+    assert profile.loc["status_code", "kind"] == "categorical"
+    assert profile.loc["endpoint", "cardinality"] == 14
+    assert chart == ("time_series", ["timestamp", "duration_ms"])
+
+
+def test_profiling_a_million_rows_stays_within_budget(frame):
+    assert len(sample_rows(frame)) == PROFILE_SAMPLE_ROWS
+    _check(frame)
+
+
+def test_profiling_a_million_arrow_backed_rows_stays_within_budget(frame):
+    pytest.importorskip("pyarrow")
+    _check(frame.convert_dtypes(dtype_backend="pyarrow"))
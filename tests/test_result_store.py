@@ -0,0 +1,58 @@
+import gc
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from utilities.result_store import SPILL_PREFIX, ResultStore, sweep_stale
+
+pytest.importorskip("pyarrow")  # Parquet spills
+
+
+def _frame(rows: int = 2000) -> pd.DataFrame:
+    return pd.DataFrame({"user_id": [f"user_{i}" for i in range(rows)], "count": range(rows)})
+
+
+def test_spilled_results_load_back():
+    store = ResultStore(capacity=1)
+    first = store.put(_frame(), None)
+    store.put(_frame(10), None)
+    assert os.listdir(store.spill_dir)
+    assert store.get(first)["df"]["count"].sum() == sum(range(2000))
+    store.clear()
+    assert not os.path.exists(store.spill_dir)
+
+
+def test_spill_directory_goes_with_the_store():
+    store = ResultStore(capacity=1)
+    store.put(_frame(), None)
+    store.put(_frame(), None)
+    spill_dir = store.spill_dir
+    assert os.path.isdir(spill_dir)
+    del store
+    gc.collect()
+    assert not os.path.exists(spill_dir)
+
+
+def test_disk_use_is_capped():
+    probe = ResultStore(capacity=0)
+    probe.put(_frame(), None)
+    one = probe.spilled_bytes()
+
+    store = ResultStore(capacity=0, max_spill_bytes=int(one * 2.5))
+    refs = [store.put(_frame(), None) for _ in range(5)]
+    assert store.spilled_bytes() <= one * 2.5
+    assert len(os.listdir(store.spill_dir)) == 2
+    assert store.get(refs[0])["df"] is None  # dropped, least recently used
+    assert len(store.get(refs[-1])["df"]) == 2000
+
+
+def test_sweep_removes_only_stale_directories(tmp_path):
+    stale, fresh = tmp_path / (SPILL_PREFIX + "old"), tmp_path / (SPILL_PREFIX + "new")
+    stale.mkdir()
+    fresh.mkdir()
+    old = time.time() - 2 * 24 * 3600
+    os.utime(stale, (old, old))
+    sweep_stale(str(tmp_path))
+    assert not stale.exists() and fresh.exists()
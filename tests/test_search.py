@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from utilities.dictionary import encode_table
+from utilities.search import ensure_search_index, index_current, rewrite_query, search_enabled
+
+QUERY = "SELECT user_id FROM access_logs WHERE endpoint LIKE '%/admin%'"
+
+
+def _database(encoded: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE access_logs (timestamp TEXT, user_id TEXT, endpoint TEXT, method TEXT, "
+                 "status_code INTEGER, request_id TEXT)")
+    rows = [("2025-03-01T10:00:00", f"user_{i % 50}", f"/api/items/{i % 7}", "GET", 200, f"req-{i:08x}")
+            for i in range(2000)]
+    rows.append(("2025-03-01T11:00:00", "user_1", "/admin/login", "POST", 200, "req-ffffffff"))
+    conn.executemany("INSERT INTO access_logs VALUES (?, ?, ?, ?, ?, ?)", rows)
+    if encoded:
+        encode_table(conn, "access_logs")
+    ensure_search_index(conn)
+    return conn
+
+
+def _append(conn: sqlite3.Connection, encoded: bool) -> None:
+    if encoded:
+        conn.execute("INSERT INTO access_logs_data (timestamp, user_id_id, endpoint_id) VALUES "
+                     "('2025-03-01T12:00:00', (SELECT id FROM dict_user_id WHERE value = 'user_2'), "
+                     "(SELECT id FROM dict_endpoint WHERE value = '/admin/login'))")
+    else:
+        conn.execute("INSERT INTO access_logs (timestamp, user_id, endpoint) "
+                     "VALUES ('2025-03-01T12:00:00', 'user_2', '/admin/login')")
+
+
+@pytest.mark.parametrize("encoded", [False, True])
+def test_stale_index_is_not_used_until_it_catches_up(encoded):
+    conn = _database(encoded)
+    assert "access_logs_search" in rewrite_query(conn, QUERY)
+
+    _append(conn, encoded)
+    assert not index_current(conn, "access_logs")
+    assert rewrite_query(conn, QUERY) == QUERY  # a scan, which sees the new row
+    assert sorted(conn.execute(QUERY).fetchall()) == [("user_1",), ("user_2",)]
+
+    ensure_search_index(conn)  # appends the new row to the index
+    assert index_current(conn, "access_logs")
+    rewritten = rewrite_query(conn, QUERY)
+    assert "access_logs_search" in rewritten
+    assert sorted(conn.execute(rewritten).fetchall()) == [("user_1",), ("user_2",)]
+
+
+def test_index_without_state_is_rebuilt():
+    conn = _database(False)
+    conn.execute("DROP TABLE search_state")
+    assert rewrite_query(conn, QUERY) == QUERY
+    ensure_search_index(conn)
+    assert index_current(conn, "access_logs")
+
+
+@pytest.mark.parametrize("condition", [
+    "NOT endpoint LIKE '%/admin%'",
+    "endpoint NOT LIKE '%/admin%'",
+    "NOT (method = ')' OR endpoint LIKE '%/admin%')",
+    "NOT ((endpoint LIKE '%/admin%'))",
+])
+def test_negated_filters_are_left_as_scans(condition):
+    conn = _database(False)
+    conn.execute("INSERT INTO access_logs (timestamp, user_id) VALUES ('2025-03-01T12:00:00', 'user_null')")
+    ensure_search_index(conn)
+    query = f"SELECT COUNT(*) FROM access_logs WHERE {condition}"
+    assert rewrite_query(conn, query) == query
+    assert conn.execute(query).fetchone()[0] == 2000  # the row without an endpoint is not counted
+
+
+def test_filter_inside_a_negated_subquery_is_still_rewritten():
+    conn = _database(False)
+    query = ("SELECT COUNT(*) FROM access_logs a WHERE NOT EXISTS "
+             "(SELECT 1 FROM access_logs b WHERE b.endpoint LIKE '%/admin%' AND b.user_id = a.user_id)")
+    rewritten = rewrite_query(conn, query)
+    assert "access_logs_search" in rewritten
+    assert conn.execute(rewritten).fetchall() == conn.execute(query).fetchall()
+
+
+def test_search_enabled_follows_the_index(tmp_path):
+    path = str(tmp_path / "logs.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE access_logs (timestamp TEXT, user_id TEXT, endpoint TEXT)")
+    conn.commit()
+    assert not search_enabled(path)
+
+    ensure_search_index(conn)
+    assert search_enabled(path)
+
+    conn.execute("DROP TABLE search_terms")
+    conn.commit()
+    conn.close()
+    assert not search_enabled(path)
@@ -0,0 +1,60 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utilities.shards import connect_for_query, window_from_sql, write_shards
+
+END = "T23:59:59.999999"
+
+
+@pytest.mark.parametrize("query, window", [
+    ("SELECT COUNT(*) FROM access_logs WHERE timestamp >= '2025-05-01'", ("2025-05-01", None)),
+    ("SELECT COUNT(*) FROM access_logs WHERE timestamp < '2025-05-01'", (None, "2025-05-01" + END)),
+    ("SELECT * FROM access_logs WHERE timestamp > '2025-05-01T10:00:00' AND timestamp <= '2025-05-03'",
+     ("2025-05-01", "2025-05-03" + END)),
+    ("SELECT * FROM vpc_logs v WHERE v.timestamp BETWEEN '2025-05-01' AND '2025-05-02 12:00:00'",
+     ("2025-05-01", "2025-05-02" + END)),
+    ("SELECT * FROM execution_logs WHERE date(timestamp) = '2025-05-04'", ("2025-05-04", "2025-05-04" + END)),
+    ("SELECT COUNT(*) FROM access_logs", (None, None)),
+    # Dates the window cannot account for leave it open
+    ("SELECT * FROM access_logs WHERE timestamp < '2025-05-01' OR timestamp > '2025-05-20'", (None, None)),
+    ("SELECT * FROM access_logs WHERE strftime('%Y-%m-%d', timestamp) = '2025-05-01'", (None, None)),
+    ("SELECT * FROM access_logs WHERE timestamp >= '2025-05-01' AND user_id IN "
+     "(SELECT user_id FROM access_logs WHERE timestamp < '2025-04-01')", (None, None)),
+])
+def test_window_from_sql(query, window):
+    assert window_from_sql(query) == window
+
+
+@pytest.fixture(scope="module")
+def shard_dir(tmp_path_factory):
+    """Twelve daily shards, more than one connection can attach, one access row per hour"""
+    path = str(tmp_path_factory.mktemp("shards"))
+    timestamps = pd.date_range("2025-05-01", periods=12 * 24, freq="h").strftime("%Y-%m-%dT%H:%M:%S")
+    access = pd.DataFrame({"timestamp": timestamps, "user_id": "user_1", "endpoint": "/api/items",
+                           "method": "GET", "status_code": 200, "request_id": [f"req-{i:08x}" for i in range(288)]})
+    write_shards({"access_logs": access}, path)
+    return path
+
+
+def _count(shard_dir: str, query: str) -> int:
+    conn = connect_for_query(shard_dir, query)
+    try:
+        return conn.execute(query).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_open_ended_ranges_read_every_shard_they_touch(shard_dir):
+    assert _count(shard_dir, "SELECT COUNT(*) FROM access_logs WHERE timestamp >= '2025-05-10'") == 3 * 24
+    assert _count(shard_dir, "SELECT COUNT(*) FROM access_logs WHERE timestamp < '2025-05-03'") == 2 * 24
+    assert _count(shard_dir, "SELECT COUNT(*) FROM access_logs WHERE date(timestamp) = '2025-05-05'") == 24
+
+
+def test_unbounded_queries_gather_more_shards_than_attach_allows(shard_dir):
+    assert sqlite3.connect(":memory:").getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) < 12
+    assert _count(shard_dir, "SELECT COUNT(*) FROM access_logs") == 12 * 24
+    assert _count(shard_dir, "SELECT COUNT(*) FROM access_logs WHERE timestamp < '2025-05-02' "
+                             "OR timestamp >= '2025-05-12'") == 2 * 24
+    assert _count(shard_dir, "SELECT COUNT(*) FROM vpc_logs") == 0  # no shard has the table
@@ -0,0 +1,37 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import monitor
+from utilities.sketches import CountMin
+
+
+def test_count_min_merge_all_leaves_its_inputs_alone():
+    first = CountMin().add(np.array(["a", "a", "b"], dtype=object))
+    second = CountMin().add(np.array(["a"], dtype=object))
+    merged = CountMin.merge_all([first, second])
+    assert merged is not first
+    assert merged.estimate("a") >= 3
+    assert first.estimate("a") == 2 and second.estimate("a") == 1
+
+
+def test_exact_latency_quantiles_are_exact(monkeypatch):
+    monkeypatch.setattr(monitor, "use_sketches", lambda: False)
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "timestamp": "2025-03-01T10:00:00",
+        "function_name": rng.choice(["auth", "payment", "search"], 5000),
+        "duration_ms": rng.integers(1, 5000, 5000),
+    })
+    conn = sqlite3.connect(":memory:")
+    frame.to_sql("execution_logs", conn, index=False)
+    conn.execute("INSERT INTO execution_logs VALUES ('2025-03-01T10:00:00', 'auth', NULL)")
+
+    query, params = monitor.latency_quantiles("function_name", "2025-03-01", "2025-03-02")
+    result = pd.read_sql_query(query, conn, params=params).set_index("function_name")
+    grouped = frame.groupby("function_name")["duration_ms"]
+    for q in monitor.LATENCY_QUANTILES:
+        expected = grouped.quantile(q, interpolation="lower")
+        assert (result[f"p{q * 100:g}"] == expected.reindex(result.index)).all()
+    assert (result["count"] == grouped.size().reindex(result.index)).all()
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from utilities.templates import match_question
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+@pytest.mark.parametrize("question", [
+    "requests excluding user_5",
+    "traffic except from 10.0.0.5",
+    "Show requests not from user_5",
+    "Which endpoints were never hit?",
+    "List connections without rejected traffic",
+    "Show users other than user_5",
+    "Which users didn't fail?",
+])
+def test_negated_questions_go_to_the_llm(question):
+    assert match_question(question, NOW) is None
+
+
+@pytest.mark.parametrize("question, sql", [
+    ("How many users are there?", "SELECT COUNT(DISTINCT user_id) AS count FROM access_logs"),
+    ("How many unique IPs are there?", "SELECT COUNT(DISTINCT src_ip) AS count FROM vpc_logs"),
+    ("Number of endpoints containing admin",
+     "SELECT COUNT(DISTINCT endpoint) AS count FROM access_logs WHERE endpoint LIKE '%admin%'"),
+])
+def test_counting_an_entity_counts_distinct_values(question, sql):
+    template = match_question(question, NOW)
+    assert template.intent == "distinct_count"
+    assert template.sql == sql
+
+
+def test_counting_rows_stays_count_star():
+    template = match_question("How many times was process_payment called?", NOW)
+    assert template.sql == "SELECT COUNT(*) AS count FROM execution_logs WHERE function_name = 'process_payment'"
+    template = match_question("How many requests per user?", NOW)
+    assert template.intent == "grouped_count"
+
+
+def test_superlative_without_a_measure_goes_to_the_llm():
+    assert match_question("Which endpoints are slowest?", NOW) is None
+    template = match_question("Which functions are slowest by duration?", NOW)
+    assert template.intent == "extreme"
+    assert template.sql.endswith("ORDER BY duration_ms DESC LIMIT 1")
+
+
+@pytest.mark.parametrize("question", [
+    "How many DELETE requests failed in 2024?",  # the year has no slot
+    "List users who accessed the admin endpoint",  # neither "admin" nor the second entity has one
+    "What is the success rate of each function?",  # nor a rate
+])
+def test_unused_words_go_to_the_llm(question):
+    assert match_question(question, NOW) is None
+
+
+def test_top_n_by_number_of_rows():
+    template = match_question("Top 3 users by number of failed requests", NOW)
+    assert template.sql == ("SELECT user_id, COUNT(*) AS count FROM access_logs WHERE status_code >= 400 "
+                            "GROUP BY user_id ORDER BY count DESC LIMIT 3")
+
+
+def test_exact_status_code_takes_no_status_class():
+    template = match_question("Which API calls succeeded with 200 status?", NOW)
+    assert template.sql.endswith("FROM access_logs WHERE status_code = 200")
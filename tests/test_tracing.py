@@ -0,0 +1,48 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import utilities.tracing as tracing
+from utilities.tracing import load_spans, record, trace
+
+
+def test_recent_window_finds_spans(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_DB", str(tmp_path / "traces.db"))
+    now = datetime.now()
+    with trace():
+        record("sql_execution", 12.5, now - timedelta(minutes=30))
+        record("summary", 3.0, now - timedelta(hours=3))
+
+    # The dashboard's 1h window, bounds in the log timestamps' ISO form
+    start, end = (now - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S"), now.strftime("%Y-%m-%dT%H:%M:%S")
+    assert load_spans(start, end)["stage"].tolist() == ["sql_execution"]
+    assert load_spans(start.replace("T", " "), end.replace("T", " "))["stage"].tolist() == ["sql_execution"]
+
+
+def test_spans_written_with_a_space_are_migrated(tmp_path):
+    path = str(tmp_path / "traces.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE spans (trace_id TEXT, stage TEXT, started_at TEXT, duration_ms REAL, attrs TEXT)")
+    conn.execute("INSERT INTO spans VALUES ('chat-1', 'summary', '2025-03-01 10:30:00.000000', 1.0, NULL)")
+    conn.commit()
+    conn.close()
+
+    spans = load_spans("2025-03-01T10:00:00", "2025-03-01T11:00:00", path=path)
+    assert spans["started_at"].tolist() == ["2025-03-01T10:30:00.000000"]
+
+
+def test_table_is_created_and_migrated_once_per_process(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.db")
+    monkeypatch.setattr(tracing, "TRACE_DB", path)
+    opened, real_open = [], tracing._open
+
+    def counting_open(p):
+        opened.append(p)
+        return real_open(p)
+
+    monkeypatch.setattr(tracing, "_open", counting_open)
+    for _ in range(3):
+        with trace():
+            record("summary", 1.0)
+    assert opened == [path]
+    assert len(load_spans()) == 3
+    tracing._discard(path)
@@ -0,0 +1,23 @@
+import pytest
+
+from utilities.trail import trail_question
+
+
+@pytest.mark.parametrize("text, ids", [
+    ("req-92cdced4", ["req-92cdced4"]),
+    ("show the trail for req-92cdced4", ["req-92cdced4"]),
+    ("req-92cdced4, req-e22ca430", ["req-92cdced4", "req-e22ca430"]),
+    ("show the full trace of req-92cdced4 and req-E22CA430", ["req-92cdced4", "req-e22ca430"]),
+])
+def test_trail_only_messages(text, ids):
+    assert trail_question(text) == ids
+
+
+@pytest.mark.parametrize("text", [
+    "did req-92cdced4 fail?",
+    "which of req-92cdced4 and req-e22ca430 took longer?",
+    "compare the latency of req-92cdced4, req-e22ca430 and req-118ab9fe",
+    "what is the weather",
+])
+def test_other_questions_go_to_the_llm(text):
+    assert trail_question(text) is None
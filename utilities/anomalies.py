@@ -0,0 +1,285 @@
+"""
+Vectorized anomaly detection over the access and VPC logs.
+
+Rows are bucketed per minute and folded into (entity, bucket) cells with one
+sort, rolling window sums come from prefix sums, and every window is scored
+with a z-score of its log-scaled value against the other active windows of
+the same entity, so a quiet user's burst is not hidden by busy ones.
+Entities with fewer than MIN_HISTORY active windows are scored against all
+windows of the detector instead. Consecutive flagged windows of an entity
+are merged into one alert.
+
+    python -m utilities.anomalies --db logs2.db          # new rows since the last run
+    python -m utilities.anomalies --db logs2.db --full   # rescan everything
+"""
+import argparse
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from utilities.db import DB_PATH, connect
+
+ALERT_TABLE = "alerts"
+STATE_TABLE = "alert_state"
+BUCKET_SECONDS = 60
+Z_THRESHOLD = 4.0
+MIN_STD = 0.25  # log-space floor, keeps near-constant baselines from flagging noise
+MIN_HISTORY = 10  # active windows an entity needs for a baseline of its own
+LOOKBACK_HOURS = 24  # context read before the first new row in incremental runs
+
+
+class Detector(NamedTuple):
+    kind: str
+    entity: str  # "user" or "src_ip"
+    metric: str
+    window_buckets: int
+    min_value: float  # absolute floor, a high z on a tiny count is not an alert
+
+
+DETECTORS = (
+    Detector("request_burst", "user", "requests", 1, 20),
+    Detector("error_burst", "user", "errors", 1, 10),
+    Detector("request_burst", "src_ip", "requests", 1, 20),
+    Detector("rejection_burst", "src_ip", "errors", 1, 10),
+    Detector("exfiltration", "src_ip", "bytes", 60, 1_000_000),
+)
+
+ALERT_COLUMNS = ["entity_type", "entity", "kind", "window_start", "window_end",
+                 "value", "baseline", "score", "windows"]
+
+
+def _epoch(timestamps: pd.Series) -> np.ndarray:
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, format="ISO8601")
+    return ((timestamps - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+
+def _codes(values: pd.Series):
+    """(integer codes, names), categoricals are used as they are"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(dtype=np.int64), np.asarray(values.cat.categories)
+    codes, names = pd.factorize(values)
+    return codes.astype(np.int64), np.asarray(names)
+
+
+def entity_metrics(access: pd.DataFrame, vpc: pd.DataFrame) -> Dict[str, dict]:
+    """Per entity type with rows: entity column, epoch seconds and per-row metric arrays"""
+    # An empty window's columns may carry no usable type (e.g. Arrow null), so they are not touched
+    metrics = {}
+    if len(access):
+        metrics["user"] = {
+            "entity": access["user_id"],
+            "epoch": _epoch(access["timestamp"]),
+            "requests": np.ones(len(access)),
+            "errors": (access["status_code"].to_numpy() >= 400).astype(float),
+        }
+    if len(vpc):
+        metrics["src_ip"] = {
+            "entity": vpc["src_ip"],
+            "epoch": _epoch(vpc["timestamp"]),
+            "requests": np.ones(len(vpc)),
+            "errors": vpc["action"].isin(["REJECT", "DROP"]).to_numpy(dtype=float),
+            "bytes": vpc["bytes_sent"].to_numpy(dtype=float),
+        }
+    return metrics
+
+
+def _cells(codes: np.ndarray, buckets: np.ndarray, span: int):
+    """Sorted unique (entity, bucket) keys and each row's cell index"""
+    keys = codes * span + buckets
+    return np.unique(keys, return_inverse=True)
+
+
+def _rolling(keys: np.ndarray, values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of each cell and the cells of the same entity in the window buckets before it"""
+    if window == 1:
+        return values
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    first = np.searchsorted(keys, keys - (window - 1), side="left")
+    return prefix[1:] - prefix[first]
+
+
+def _baselines(entity: np.ndarray, logged: np.ndarray, entities: int, min_history: int = MIN_HISTORY):
+    """Per cell: mean and std of its entity's log-scaled windows, the detector-wide ones for short histories"""
+    counts = np.bincount(entity, minlength=entities)
+    seen = np.maximum(counts, 1)
+    mean = np.bincount(entity, weights=logged, minlength=entities) / seen
+    variance = np.bincount(entity, weights=logged ** 2, minlength=entities) / seen - mean ** 2
+    enough = counts >= min_history
+    mean = np.where(enough, mean, logged.mean())
+    std = np.where(enough, np.sqrt(np.maximum(variance, 0)), logged.std())
+    return mean[entity], std[entity]
+
+
+def _episodes(entity: np.ndarray, bucket: np.ndarray, gap: int) -> np.ndarray:
+    """Start index of each run of flagged windows, split on entity change or a gap over `gap` buckets"""
+    if len(entity) == 0:
+        return np.empty(0, dtype=np.int64)
+    new = np.r_[True, (entity[1:] != entity[:-1]) | (np.diff(bucket) > gap)]
+    return np.flatnonzero(new)
+
+
+def detect(access: pd.DataFrame, vpc: pd.DataFrame, detectors=DETECTORS,
+           bucket_seconds: int = BUCKET_SECONDS, z_threshold: float = Z_THRESHOLD) -> pd.DataFrame:
+    """Scored alerts, one per run of anomalous windows, highest score first"""
+    alerts: List[pd.DataFrame] = []
+    for entity_type, data in entity_metrics(access, vpc).items():
+        codes, names = _codes(data["entity"])
+        buckets = data["epoch"] // bucket_seconds
+        origin = buckets.min()
+        buckets -= origin
+        windows = [d for d in detectors if d.entity == entity_type]
+        # Entities are spaced wider than the longest window so rolling sums never cross them
+        span = int(buckets.max()) + 1 + max(d.window_buckets for d in windows)
+        keys, inverse = _cells(codes, buckets, span)
+        cell_entity, cell_bucket = keys // span, keys % span
+        sums = {}
+        for detector in windows:
+            if detector.metric not in sums:
+                sums[detector.metric] = np.bincount(inverse, weights=data[detector.metric], minlength=len(keys))
+            value = _rolling(keys, sums[detector.metric], detector.window_buckets)
+            logged = np.log1p(value)
+            mean, std = _baselines(cell_entity, logged, len(names))
+            score = (logged - mean) / np.maximum(std, MIN_STD)
+            flagged = np.flatnonzero((score >= z_threshold) & (value >= detector.min_value))
+            starts = _episodes(cell_entity[flagged], cell_bucket[flagged], detector.window_buckets)
+            if not len(starts):
+                continue
+            first, last = flagged[starts], flagged[np.r_[starts[1:], len(flagged)] - 1]
+            alerts.append(pd.DataFrame({
+                "entity_type": entity_type,
+                "entity": names[cell_entity[first]].astype(str),
+                "kind": detector.kind,
+                "window_start": (cell_bucket[first] - detector.window_buckets + 1 + origin) * bucket_seconds,
+                "window_end": (cell_bucket[last] + 1 + origin) * bucket_seconds,
+                "value": np.maximum.reduceat(value[flagged], starts),
+                "baseline": np.expm1(mean[first]),
+                "score": np.maximum.reduceat(score[flagged], starts),
+                "windows": np.diff(np.r_[starts, len(flagged)]),
+            }))
+    if not alerts:
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+    result = pd.concat(alerts, ignore_index=True)
+    for column in ("window_start", "window_end"):
+        result[column] = pd.to_datetime(result[column], unit="s").dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return result.sort_values("score", ascending=False, ignore_index=True)
+
+
+# ==============================================
+# ALERTS TABLE
+# ==============================================
+def ensure_alert_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {ALERT_TABLE} (
+        entity_type TEXT NOT NULL,
+        entity TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        window_start TEXT NOT NULL,
+        window_end TEXT NOT NULL,
+        value REAL,
+        baseline REAL,
+        score REAL,
+        windows INTEGER,
+        detected_at TEXT,
+        PRIMARY KEY (entity_type, entity, kind, window_start)
+    )""")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} (source TEXT PRIMARY KEY, last_rowid INTEGER)")
+
+
+def alerts_available(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ALERT_TABLE,)
+    ).fetchone() is not None
+
+
+def write_alerts(conn: sqlite3.Connection, alerts: pd.DataFrame) -> int:
+    """Insert alerts, an episode seen again (same start) is replaced by its latest extent"""
+    ensure_alert_tables(conn)
+    detected_at = datetime.now().isoformat(timespec="seconds")
+    rows = alerts[ALERT_COLUMNS].assign(detected_at=detected_at).itertuples(index=False, name=None)
+    conn.executemany(f"INSERT OR REPLACE INTO {ALERT_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    return len(alerts)
+
+
+def _watermarks(conn: sqlite3.Connection) -> Dict[str, int]:
+    return dict(conn.execute(f"SELECT source, last_rowid FROM {STATE_TABLE}").fetchall())
+
+
+def mark_scanned(conn: sqlite3.Connection) -> None:
+    """Record the current end of the logs, the next incremental run starts after it"""
+    ensure_alert_tables(conn)
+    for table in ("access_logs", "vpc_logs"):
+        hi = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+        conn.execute(f"INSERT OR REPLACE INTO {STATE_TABLE} VALUES (?, ?)", (table, hi))
+    conn.commit()
+
+
+ACCESS_COLUMNS = "timestamp, user_id, status_code"
+VPC_COLUMNS = "timestamp, src_ip, action, bytes_sent"
+
+
+def detect_new(conn: sqlite3.Connection, lookback_hours: int = LOOKBACK_HOURS) -> int:
+    """Score the rows added since the last run, with LOOKBACK_HOURS of context, returns alerts written.
+
+    Only alerts whose windows reach the new rows are written; the context rows
+    complete the rolling windows and the baseline.
+    """
+    ensure_alert_tables(conn)
+    marks = _watermarks(conn)
+    first_new = None
+    for table in ("access_logs", "vpc_logs"):
+        earliest = conn.execute(
+            f"SELECT MIN(timestamp) FROM {table} WHERE rowid > ?", (marks.get(table, 0),)
+        ).fetchone()[0]
+        if earliest is not None:
+            first_new = min(first_new or earliest, earliest)
+    if first_new is None:
+        return 0
+    since = (datetime.fromisoformat(first_new) - timedelta(hours=lookback_hours)).isoformat()
+    access = pd.read_sql_query(f"SELECT {ACCESS_COLUMNS} FROM access_logs WHERE timestamp >= ?", conn, params=(since,))
+    vpc = pd.read_sql_query(f"SELECT {VPC_COLUMNS} FROM vpc_logs WHERE timestamp >= ?", conn, params=(since,))
+    alerts = detect(access, vpc)
+    written = write_alerts(conn, alerts[alerts["window_end"] > first_new])
+    mark_scanned(conn)
+    return written
+
+
+def rebuild(path: str = DB_PATH) -> int:
+    """Rescan the whole database, replacing its alerts"""
+    conn = connect(path)
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {ALERT_TABLE}")
+        access = pd.read_sql_query(f"SELECT {ACCESS_COLUMNS} FROM access_logs", conn)
+        vpc = pd.read_sql_query(f"SELECT {VPC_COLUMNS} FROM vpc_logs", conn)
+        written = write_alerts(conn, detect(access, vpc))
+        mark_scanned(conn)
+        return written
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Detect anomalous users and source IPs into the alerts table")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--full", action="store_true", help="rescan every row instead of the new ones")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.full:
+        written = rebuild(args.db)
+    else:
+        conn = connect(args.db)
+        try:
+            written = detect_new(conn)
+        finally:
+            conn.close()
+    print(f"✅ {written:,} alerts written to '{args.db}' in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import re
+import sqlite3
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional, fall back to plain pandas frames
+    pa = None
+
+# Rows pulled from the cursor per round trip. Only one batch of Python tuples
+# is alive at a time, everything else already sits in Arrow column buffers.
+FETCH_BATCH_SIZE = 65536
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def _column_array(values: Sequence):
+    """Build a typed Arrow array from one column of a batch"""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # SQLite columns are dynamically typed, mixed values degrade to text
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+PROBE_VIEW = "_arrow_result_types"
+# Quoted strings (kept) and parameter placeholders (made NULL), for describing a query as a view
+_PLACEHOLDER = re.compile(r"'(?:[^']|'')*'|\?\d*|[:@$]\w+")
+
+
+def _declared_type(declared: str):
+    """Arrow type for a declared SQLite column type, by SQLite's affinity rules; text for other declared types"""
+    declared = declared.upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(name in declared for name in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def result_types(conn: sqlite3.Connection, query: str) -> List[object]:
+    """Arrow type of each result column from the declared type of the table column it reads, by position;
+    int64 for expressions (COUNT, SUM...) and for queries SQLite cannot describe as a view"""
+    body = _PLACEHOLDER.sub(lambda m: m.group(0) if m.group(0).startswith("'") else "NULL", query.strip().rstrip(";"))
+    try:
+        conn.execute(f"CREATE TEMP VIEW {PROBE_VIEW} AS {body}")
+        try:
+            columns = conn.execute(f"PRAGMA temp.table_info({PROBE_VIEW})").fetchall()
+        finally:
+            conn.execute(f"DROP VIEW temp.{PROBE_VIEW}")
+    except sqlite3.Error:  # not a plain SELECT, e.g. a PRAGMA or a CTE SQLite rejects in a view
+        return []
+    return [_declared_type(declared) if declared else pa.int64() for _, _, declared, *_ in columns]
+
+
+def _unify_chunks(chunks: list, fallback=None):
+    """Cast per-batch arrays of one column to a single common type, `fallback` when all are null"""
+    types = {c.type for c in chunks if c.type != pa.null()}
+    if not types:
+        target = fallback or pa.int64()
+        return pa.chunked_array([c.cast(target) for c in chunks], type=target)
+    if len(types) == 1:
+        target = types.pop()
+    elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        target = pa.float64()
+    else:
+        target = pa.string()
+    return pa.chunked_array([c.cast(target) for c in chunks], type=target)
+
+
+def fetch_arrow(cursor: sqlite3.Cursor, batch_size: int = FETCH_BATCH_SIZE, query: Optional[str] = None):
+    """Drain an executed cursor into a pyarrow Table, one batch at a time; `query` types the columns that
+    come back without a typed value"""
+    names = [desc[0] for desc in cursor.description]
+    chunks = [[] for _ in names]
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for i, values in enumerate(zip(*rows)):
+            chunks[i].append(_column_array(values))
+
+    # Columns with no typed value (no rows, or only NULLs) take the type of their source column instead of
+    # Arrow's null type, which pandas and the comparisons on it cannot handle
+    untyped = any(all(a.type == pa.null() for a in c) for c in chunks)
+    types = result_types(cursor.connection, query) if untyped and query else []
+    if len(types) != len(names):
+        types = [pa.int64()] * len(names)
+    if not chunks or not chunks[0]:
+        return pa.table([pa.array([], type=t) for t in types], names=names)
+    return pa.table([_unify_chunks(c, t) for c, t in zip(chunks, types)], names=names)
+
+
+def query_arrow(conn: sqlite3.Connection, query: str, params: tuple = ()):
+    """Execute a query and return the result as a pyarrow Table"""
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples, whatever the connection uses
+    try:
+        cursor.execute(query, params)
+        return fetch_arrow(cursor, query=query)
+    finally:
+        cursor.close()
+
+
+def arrow_to_dataframe(table) -> pd.DataFrame:
+    """Arrow-backed DataFrame with typed, nullable columns (no NaN/object round trip)"""
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def query_dataframe(conn: sqlite3.Connection, query: str, params: tuple = ()) -> pd.DataFrame:
+    """Execute a query straight into a DataFrame, Arrow-backed when pyarrow is installed"""
+    if pa is None:
+        return pd.read_sql_query(query, conn, params=params)
+    return arrow_to_dataframe(query_arrow(conn, query, params))
+
+
+def result_rows(result, limit: Optional[int] = None) -> List[Tuple]:
+    """Row tuples from either a pyarrow Table or a list of tuples"""
+    if pa is not None and isinstance(result, pa.Table):
+        if limit is not None:
+            result = result.slice(0, limit)
+        return list(zip(*(col.to_pylist() for col in result.columns)))
+    return list(result) if limit is None else list(result)[:limit]
+
+
+def result_length(result) -> int:
+    if pa is not None and isinstance(result, pa.Table):
+        return result.num_rows
+    return len(result)
@@ -0,0 +1,46 @@
+"""
+Time bucket sizing for trend charts.
+
+The bucket is the smallest standard size that keeps the window under
+MAX_BUCKETS points, and rows are bucketed with integer arithmetic on epoch
+seconds instead of formatting and grouping timestamp strings.
+"""
+import math
+from datetime import datetime
+from typing import Tuple
+
+MAX_BUCKETS = 300
+DAY_SECONDS = 86_400
+BUCKET_SIZES = (
+    (60, "minute"),
+    (300, "5 minutes"),
+    (3_600, "hour"),
+    (DAY_SECONDS, "day"),
+)
+
+
+def choose_bucket(start: datetime, end: datetime, max_buckets: int = MAX_BUCKETS) -> Tuple[int, str]:
+    """(bucket seconds, label) of the finest standard bucket keeping the window under max_buckets"""
+    span = max((end - start).total_seconds(), 1)
+    for seconds, label in BUCKET_SIZES:
+        if bucket_count(span, seconds) <= max_buckets:
+            return seconds, label
+    # Longer custom ranges: whole days, as many as needed to stay in budget
+    days = math.ceil(span / max_buckets / DAY_SECONDS)
+    return days * DAY_SECONDS, f"{days} days"
+
+
+def bucket_count(span_seconds: float, bucket_seconds: int) -> int:
+    """Upper bound of buckets a window of span_seconds touches"""
+    return math.ceil(span_seconds / bucket_seconds) + 1
+
+
+def bucket_sql(column: str, bucket_seconds: int) -> str:
+    """SQL expression flooring an ISO timestamp column to its bucket start, as epoch seconds"""
+    seconds = int(bucket_seconds)
+    return f"(CAST(strftime('%s', {column}) AS INTEGER) / {seconds} * {seconds})"
+
+
+def bucket_label_sql(column: str, bucket_seconds: int) -> str:
+    """bucket_sql rendered back as an ISO timestamp for charting"""
+    return f"datetime({bucket_sql(column, bucket_seconds)}, 'unixepoch')"
@@ -0,0 +1,221 @@
+"""
+Schema catalog of the log tables for the SQL prompt.
+
+The prompt's schema section (DDL, three sample rows per table, plus row
+counts, min/max of timestamps and numbers, and the distinct values of
+low-cardinality columns such as method, status or action) is built once
+and kept in memory and in a sidecar file next to the database
+(`logs2.db.catalog.json`), so the chatbot never writes to the database.
+It is stamped with the schema cookie (PRAGMA schema_version) and the
+rowid range of each log table. A question then costs one PRAGMA and two
+rowid lookups per table: appends move the top of the range and retention
+deletes its bottom, which rebuilds the catalog, while a cookie moved by
+new alert or search tables only restamps it. Ingestion and maintenance
+still refresh it after loads and deletes, which also catches deletes and
+updates inside the range.
+
+    python -m utilities.catalog --db logs2.db           # refresh and print the prompt schema
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from utilities.db import DB_PATH, LOG_TABLES, connect
+from utilities.dictionary import data_table, storage_table
+
+CATALOG_SUFFIX = ".catalog.json"
+LEGACY_TABLE = "schema_catalog"  # where older versions stored the catalog, inside the database
+CATALOG_FORMAT = 2  # bump when the stored layout below changes
+MAX_VALUES = 20  # columns with at most this many distinct values get them listed
+SAMPLE_ROWS = 3
+SAMPLE_CHARS = 100  # sample values are cut to this length, as in LangChain's table info
+NUMERIC_TYPES = ("INT", "REAL", "FLOA", "DOUB", "NUM")
+
+_cache: Dict[str, dict] = {}  # path -> catalog last seen by this process
+_lock = threading.Lock()
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+
+def row_ranges(conn: sqlite3.Connection) -> Dict[str, list]:
+    """First and last rowid of each log table, two index lookups each (MIN and MAX in one SELECT would scan)"""
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    ranges = {}
+    for table in LOG_TABLES:
+        if table in present:
+            stored = storage_table(conn, table)
+            ranges[table] = list(conn.execute(
+                f"SELECT (SELECT MIN(rowid) FROM {stored}), (SELECT MAX(rowid) FROM {stored})").fetchone())
+    return ranges
+
+
+def fingerprint(conn: sqlite3.Connection) -> str:
+    """Hash of the log tables' DDL, and of the data tables behind them when dictionary-encoded"""
+    names = LOG_TABLES + tuple(data_table(table) for table in LOG_TABLES)
+    rows = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE type IN ('table', 'view') AND name IN "
+        f"({', '.join('?' * len(names))}) ORDER BY name", names).fetchall()
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+def _quote(value) -> str:
+    return "'" + value.replace("'", "''") + "'" if isinstance(value, str) else str(value)
+
+
+def describe_table(conn: sqlite3.Connection, table: str) -> dict:
+    """Columns, sample rows and cheap statistics of one table or view"""
+    columns = [(name, kind) for _, name, kind, *_ in conn.execute(f"PRAGMA table_info({table})")
+               if name != "rowid"]  # the decoding view of a dictionary-encoded table carries its rowid
+    names = [name for name, _ in columns]
+    samples = conn.execute(f"SELECT {', '.join(names)} FROM {table} LIMIT {SAMPLE_ROWS}").fetchall()
+
+    values = {}
+    for name in names:
+        # Stops after MAX_VALUES + 1 distinct values, a full scan only for the low-cardinality columns
+        found = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT {name} FROM {table} WHERE {name} IS NOT NULL LIMIT {MAX_VALUES + 1}")]
+        if found and len(found) <= MAX_VALUES:
+            values[name] = sorted(found, key=lambda v: (isinstance(v, str), v))
+    ranged = [name for name, kind in columns if name not in values
+              and (name == "timestamp" or kind.upper().startswith(NUMERIC_TYPES))]
+    aggregates = ["COUNT(*)"] + [f"MIN({name}), MAX({name})" for name in ranged]
+    row = conn.execute(f"SELECT {', '.join(aggregates)} FROM {table}").fetchone()
+    return {
+        "columns": columns,
+        "samples": [[str(v)[:SAMPLE_CHARS] if v is not None else None for v in sample] for sample in samples],
+        "rows": row[0],
+        "ranges": {name: [row[1 + 2 * i], row[2 + 2 * i]] for i, name in enumerate(ranged)},
+        "values": values,
+    }
+
+
+def build_catalog(conn: sqlite3.Connection) -> dict:
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    return {
+        "format": CATALOG_FORMAT,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "fingerprint": fingerprint(conn),
+        "tables": {table: describe_table(conn, table) for table in LOG_TABLES if table in present},
+    }
+
+
+def catalog_path(path: str) -> str:
+    return path + CATALOG_SUFFIX
+
+
+def _database_path(conn: sqlite3.Connection) -> str:
+    """File behind the connection's main database, empty for an in-memory one"""
+    return next((file for _, name, file in conn.execute("PRAGMA database_list") if name == "main"), "")
+
+
+def _stamp(conn: sqlite3.Connection, catalog: dict) -> dict:
+    return {**catalog, "version": schema_version(conn), "row_ranges": row_ranges(conn)}
+
+
+def _save(path: str, catalog: dict) -> None:
+    """Write the sidecar file through a temporary one, so a concurrent reader never sees half of it"""
+    if not path:
+        return
+    target = catalog_path(path)
+    temporary = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w") as f:
+            json.dump(catalog, f)
+        os.replace(temporary, target)
+    except OSError:  # read-only directory, keep it in memory until next time
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def _stored(path: str) -> Optional[dict]:
+    try:
+        with open(catalog_path(path)) as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):  # no sidecar yet, or a damaged one
+        return None
+    return catalog if isinstance(catalog, dict) and catalog.get("format") == CATALOG_FORMAT else None
+
+
+def _current(catalog: Optional[dict], version: int, ranges: Dict[str, list]) -> bool:
+    return bool(catalog) and catalog["version"] == version and catalog["row_ranges"] == ranges
+
+
+def refresh_catalog(conn: sqlite3.Connection) -> dict:
+    """Rebuild and save the catalog, for ingestion and maintenance after the data changed"""
+    conn.execute(f"DROP TABLE IF EXISTS {LEGACY_TABLE}")
+    conn.commit()
+    catalog = _stamp(conn, build_catalog(conn))
+    _save(_database_path(conn), catalog)
+    return catalog
+
+
+def get_catalog(path: str = DB_PATH) -> dict:
+    """The current catalog: from memory or the sidecar file while its stamp holds, rebuilt otherwise"""
+    if not os.path.exists(path):
+        return {"tables": {}}
+    conn = connect(path, read_only=True)
+    try:
+        version, ranges = schema_version(conn), row_ranges(conn)
+        cached = _cache.get(path)
+        if _current(cached, version, ranges):
+            return cached
+        with _lock:
+            cached = _cache.get(path)
+            if _current(cached, version, ranges):  # another session got here first
+                return cached
+            stored = _stored(path)
+            if not _current(stored, version, ranges):
+                if stored and stored["row_ranges"] == ranges and stored["fingerprint"] == fingerprint(conn):
+                    stored = {**stored, "version": version}  # only other tables changed
+                else:
+                    stored = {**build_catalog(conn), "version": version, "row_ranges": ranges}
+                _save(path, stored)
+            _cache[path] = stored
+            return stored
+    finally:
+        conn.close()
+
+
+def table_info(catalog: dict) -> str:
+    """Schema section of the SQL prompt: DDL, sample rows and column statistics per table"""
+    parts = []
+    for table, info in catalog["tables"].items():
+        columns = ", \n".join(f"\t{name} {kind}".rstrip() for name, kind in info["columns"])
+        samples = ["\t".join(name for name, _ in info["columns"])]
+        samples += ["\t".join(str(v) for v in sample) for sample in info["samples"]]
+        stats = [f"{name}: {lo} to {hi}" for name, (lo, hi) in info["ranges"].items() if lo is not None]
+        stats += [f"{name}: {', '.join(map(_quote, values))}" for name, values in info["values"].items()]
+        parts.append("\n".join([
+            f"CREATE TABLE {table} (\n{columns}\n)\n",
+            f"/*\n{len(info['samples'])} rows from {table} table:", *samples, "*/\n",
+            f"/*\n{info['rows']:,} rows, column ranges and values:", *stats, "*/",
+        ]))
+    return "\n\n\n".join(parts)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Rebuild the schema catalog used by the SQL prompt")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    conn = connect(args.db)
+    try:
+        catalog = refresh_catalog(conn)
+    finally:
+        conn.close()
+    print(table_info(catalog))
+    print(f"\n✅ Catalog of {len(catalog['tables'])} tables saved to '{catalog_path(args.db)}' (schema version "
+          f"{catalog['version']}) in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
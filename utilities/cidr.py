@@ -0,0 +1,176 @@
+"""
+IPv4 addresses as integers, for indexed subnet and CIDR range queries.
+
+vpc_logs keeps src_ip and dst_ip as text and gets src_ip_int and dst_ip_int
+next to them, each with a covering index, so a subnet is one index range
+instead of string matching on every row:
+
+    SELECT action, COUNT(*) FROM vpc_logs
+    WHERE src_ip_int BETWEEN CIDR_START('10.0.0.0/24') AND CIDR_END('10.0.0.0/24')
+    GROUP BY action
+
+Ingestion fills the columns; convert an existing database with
+
+    python -m utilities.cidr --db logs2.db
+"""
+import argparse
+import ipaddress
+import os
+import sqlite3
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from utilities.db import DB_PATH, SHARD_DIR, connect
+from utilities.dictionary import create_views, is_encoded, storage_table, stored_columns
+
+IP_COLUMNS = {"src_ip": "src_ip_int", "dst_ip": "dst_ip_int"}
+# Columns carried in each IP index, enough for subnet counts, actions and volumes without a table lookup
+INDEX_COLUMNS = ("timestamp", "action", "bytes_sent")
+PRIVATE_RANGES = ("10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16")
+UPDATE_BATCH_SIZE = 200_000  # rows per UPDATE transaction when converting an existing table
+
+PROMPT_HINT = """
+    vpc_logs also has src_ip_int and dst_ip_int, the IPs as indexed integers. For subnet or CIDR questions filter on
+    them with CIDR_START/CIDR_END, e.g. src_ip_int BETWEEN CIDR_START('10.0.0.0/24') AND CIDR_END('10.0.0.0/24');
+    private addresses are 10.0.0.0/8, 172.16.0.0/12 and 192.168.0.0/16. IN_CIDR(ip, cidr) tests a single value.
+    → SELECT DISTINCT src_ip FROM vpc_logs WHERE src_ip_int BETWEEN CIDR_START('10.0.0.0/24') AND CIDR_END('10.0.0.0/24') AND action = 'REJECT';
+"""
+
+
+def ip_to_int(ip: Optional[str]) -> Optional[int]:
+    """Integer of a dotted IPv4 address, None when it is not one"""
+    try:
+        return int(ipaddress.IPv4Address(ip))
+    except (ipaddress.AddressValueError, TypeError, ValueError):
+        return None
+
+
+def int_to_ip(value: Optional[int]) -> Optional[str]:
+    return None if value is None else str(ipaddress.IPv4Address(int(value)))
+
+
+@lru_cache(maxsize=1024)
+def cidr_range(cidr: str) -> Tuple[int, int]:
+    """First and last address of a CIDR block as integers; a bare address is a /32"""
+    network = ipaddress.IPv4Network(cidr.strip(), strict=False)
+    return int(network.network_address), int(network.broadcast_address)
+
+
+def cidr_condition(cidrs: Iterable[str], column: str = "src_ip") -> str:
+    """WHERE condition matching any of the blocks, on the integer column of `column`"""
+    int_column = IP_COLUMNS[column]
+    parts = [f"{int_column} BETWEEN {lo} AND {hi}" for lo, hi in map(cidr_range, cidrs)]
+    return parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+
+
+def ip_ints(values: pd.Series) -> pd.Series:
+    """ip_to_int over a column, converting each distinct address once"""
+    codes, uniques = pd.factorize(values)
+    lookup = pd.array([ip_to_int(ip) for ip in uniques] + [None], dtype="Int64")
+    return pd.Series(lookup[codes], index=values.index)  # code -1 (missing) picks the trailing None
+
+
+def with_ip_columns(frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """The frames with src_ip_int and dst_ip_int added to vpc_logs"""
+    if "vpc_logs" not in frames:
+        return frames
+    vpc = frames["vpc_logs"].assign(**{int_column: lambda df, c=column: ip_ints(df[c])
+                                       for column, int_column in IP_COLUMNS.items()})
+    return {**frames, "vpc_logs": vpc}
+
+
+def _in_cidr(ip: Optional[str], cidr: Optional[str]) -> Optional[int]:
+    value = ip_to_int(ip)
+    if value is None or cidr is None:
+        return None
+    lo, hi = cidr_range(cidr)
+    return int(lo <= value <= hi)
+
+
+def register_ip_functions(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """IP_TO_INT, INT_TO_IP, CIDR_START, CIDR_END and IN_CIDR on a connection"""
+    conn.create_function("ip_to_int", 1, ip_to_int, deterministic=True)
+    conn.create_function("int_to_ip", 1, int_to_ip, deterministic=True)
+    conn.create_function("cidr_start", 1, lambda cidr: cidr_range(cidr)[0], deterministic=True)
+    conn.create_function("cidr_end", 1, lambda cidr: cidr_range(cidr)[1], deterministic=True)
+    conn.create_function("in_cidr", 2, _in_cidr, deterministic=True)
+    return conn
+
+
+@lru_cache(maxsize=None)
+def ip_columns_enabled(path: str = DB_PATH) -> bool:
+    """Whether vpc_logs has the integer IP columns, in the database or the newest shard"""
+    if SHARD_DIR:
+        from utilities.shards import list_shards
+        shards = list_shards(SHARD_DIR)
+        path = shards[-1][2] if shards else ""
+    if not os.path.exists(path):
+        return False
+    conn = connect(path, read_only=True)
+    try:
+        return set(IP_COLUMNS.values()) <= {row[1] for row in conn.execute("PRAGMA table_info(vpc_logs)")}
+    finally:
+        conn.close()
+
+
+def ensure_ip_indexes(conn: sqlite3.Connection) -> None:
+    """Covering index on each integer IP column of vpc_logs, when it has them"""
+    table = storage_table(conn, "vpc_logs")
+    if not set(IP_COLUMNS.values()) <= {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+        return
+    covered = ", ".join(stored_columns(conn, "vpc_logs", INDEX_COLUMNS))
+    for int_column in IP_COLUMNS.values():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_vpc_logs_{int_column} ON {table}({int_column}, {covered})")
+    conn.commit()
+
+
+def ensure_ip_columns(conn: sqlite3.Connection, refill: bool = False,
+                      batch_size: int = UPDATE_BATCH_SIZE) -> int:
+    """Add and fill the integer IP columns of an existing vpc_logs, returns rows converted.
+
+    A table that has the columns already is left alone unless refill is set, which fills any rows still NULL.
+    """
+    table = storage_table(conn, "vpc_logs")
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if not columns or (set(IP_COLUMNS.values()) <= columns and not refill):
+        return 0
+    for int_column in IP_COLUMNS.values():
+        if int_column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {int_column} INTEGER")
+    if is_encoded(conn, "vpc_logs"):
+        create_views(conn)  # the view lists the data table's columns, add the new ones
+    register_ip_functions(conn)
+    converted = 0
+    last = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+    # Rowid ranges rather than "IS NULL LIMIT n": rows that are not IPv4 stay NULL and must not be picked again
+    for start in range(0, last, batch_size):
+        cursor = conn.execute(
+            f"UPDATE {table} SET src_ip_int = IP_TO_INT(src_ip), dst_ip_int = IP_TO_INT(dst_ip) "
+            "WHERE rowid > ? AND rowid <= ? AND src_ip_int IS NULL AND dst_ip_int IS NULL",
+            (start, start + batch_size),
+        )
+        conn.commit()
+        converted += cursor.rowcount
+    ensure_ip_indexes(conn)
+    return converted
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Add integer IP columns and indexes to vpc_logs")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    conn = connect(args.db)
+    try:
+        converted = ensure_ip_columns(conn, refill=True)
+    finally:
+        conn.close()
+    print(f"✅ {converted:,} vpc_logs rows converted on '{args.db}' in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -98,27 +98,48 @@
 # # print(f" - {vpc_log_file}")
 
 
-import csv
-import random
-import uuid
-from datetime import datetime, timedelta
-import math
+"""
+Synthetic access, execution and VPC logs with anomalies and injected attacks.
+
+Rows are generated with NumPy in time-ordered chunks, each chunk seeded from
+(seed, chunk index), so the output for a given seed, size and time window is
+identical whatever the number of worker processes.
+
+    python -m utilities.create_logs_db                                  # 5000 rows of CSV, like before
+    python -m utilities.create_logs_db --rows 100000000 --format parquet --out data --workers 8
+    python -m utilities.create_logs_db --rows 1000000 --format sqlite --out logs.db --end 2025-06-01
+"""
+import argparse
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.db import LOG_COLUMNS, LOG_TABLES
 
 # Config
-end_date = datetime.now()
-start_date = end_date - timedelta(days=90)  # 3 months of data
-num_entries = 5000
+DEFAULT_ROWS = 5000
+DEFAULT_DAYS = 90  # 3 months of data
+DEFAULT_ANOMALY_RATE = 0.05
+CHUNK_ROWS = 1_000_000
+FORMATS = ("csv", "parquet", "sqlite")
 
 # Extended endpoint and status code lists
-endpoints = [
+ENDPOINTS = np.array([
     "/api/login", "/api/logout", "/api/data", "/api/upload", "/api/profile",
     "/api/delete", "/api/update", "/api/health", "/api/payment", "/api/admin",
     "/api/config", "/api/backup", "/api/reset", "/api/token"
-]
-methods = ["GET", "POST", "PUT", "DELETE", "PATCH"]
-status_codes = [200, 201, 202, 204, 301, 302, 400, 401, 403, 404, 500, 502, 503]
+])
+METHODS = np.array(["GET", "POST", "PUT", "DELETE", "PATCH"])
+STATUS_CODES = np.array([200, 201, 202, 204, 301, 302, 400, 401, 403, 404, 500, 502, 503])
 
-functions_map = {
+FUNCTIONS_MAP = {
     "/api/login": "login_handler",
     "/api/logout": "auth_handler",
     "/api/data": "data_processor",
@@ -134,250 +155,374 @@ functions_map = {
     "/api/reset": "reset_handler",
     "/api/token": "token_generator"
 }
-
-function_statuses = ["SUCCESS", "FAILED", "TIMEOUT", "ERROR"]
-actions = ["ACCEPT", "REJECT", "DROP"]
+FUNCTIONS = np.array([FUNCTIONS_MAP[e] for e in ENDPOINTS])  # same codes as ENDPOINTS
+FUNCTION_STATUSES = np.array(["SUCCESS", "FAILED", "TIMEOUT", "ERROR"])
+ACTIONS = np.array(["ACCEPT", "REJECT", "DROP"])
 
 # IP ranges with some suspicious IPs mixed in
-normal_ips = [f"192.168.1.{i}" for i in range(1, 255)] + \
-              [f"10.0.0.{i}" for i in range(1, 255)]
-suspicious_ips = ["45.227.253.109", "185.143.223.15", "62.210.180.94", 
-                 "192.168.1.100", "10.0.0.15"]  # Internal IPs behaving badly
+NORMAL_IPS = [f"192.168.1.{i}" for i in range(1, 255)] + [f"10.0.0.{i}" for i in range(1, 255)]
+SUSPICIOUS_IPS = ["45.227.253.109", "185.143.223.15", "62.210.180.94",
+                  "192.168.1.100", "10.0.0.15"]  # Internal IPs behaving badly
+INSIDER_IPS = ["192.168.1.100", "10.0.0.15"]
+IPS = np.array(NORMAL_IPS + [ip for ip in SUSPICIOUS_IPS if ip not in NORMAL_IPS])
+
+ADMIN_USERS = ["admin", "superuser", "root"]
+REGULAR_USERS = [f"user_{i}" for i in range(1, 501)]  # 500 regular users
+ATTACK_USERS = ["attacker", "hacker", "anonymous"]
+USERS = np.array(ADMIN_USERS + REGULAR_USERS + ATTACK_USERS)
 
-admin_users = ["admin", "superuser", "root"]
-regular_users = [f"user_{i}" for i in range(1, 501)]  # 500 regular users
-all_users = admin_users + regular_users
+# More activity during business hours (~65% of rows between 9:00 and 17:59)
+HOUR_WEIGHTS = np.where((np.arange(24) >= 9) & (np.arange(24) <= 17), 1.0, 0.35)
 
 # File names
-access_log_file = "access_logs.csv"
-execution_log_file = "execution_logs.csv"
-vpc_log_file = "vpc_logs.csv"
-
-# Headers
-access_headers = ["timestamp", "user_id", "endpoint", "method", "status_code", "request_id"]
-execution_headers = ["timestamp", "function_name", "duration_ms", "status", "request_id"]
-vpc_headers = ["timestamp", "src_ip", "dst_ip", "action", "bytes_sent", "request_id"]
-
-def generate_timestamps(start, end, count):
-    """Generate realistic timestamps with bursts of activity"""
-    timestamps = []
-    for _ in range(count):
-        # Create time bias - more activity during business hours
-        hour = random.randint(0, 23)
-        if 9 <= hour <= 17:  # Business hours
-            if random.random() < 0.7:  # 70% of logs during business hours
-                base_date = start + (end - start) * random.random() ** 2  # More recent bias
-        else:
-            base_date = start + (end - start) * random.random()
-        
-        # Add some bursts of activity
-        if random.random() < 0.05:  # 5% chance of burst
-            burst_count = random.randint(5, 20)
-            burst_time = base_date
-            for _ in range(burst_count):
-                timestamps.append(burst_time)
-                burst_time += timedelta(seconds=random.uniform(0.1, 2))
-        
-        # Add random second offset
-        base_date += timedelta(seconds=random.randint(0, 86400))
-        timestamps.append(base_date)
-    
-    # Trim to exact count and sort
-    timestamps = sorted(timestamps[:count])
-    return timestamps
-
-def generate_realistic_user():
-    """Generate users with some having more activity"""
-    if random.random() < 0.8:  # 80% chance regular user
-        user = random.choice(regular_users)
-        if random.random() < 0.2:  # 20% of regulars are more active
-            return user, random.randint(1, 5)
-        return user, random.randint(1, 2)
-    else:  # 20% chance admin user
-        return random.choice(admin_users), random.randint(1, 10)
-
-# Generate master shared log entries with realistic distribution
-timestamps = generate_timestamps(start_date, end_date, num_entries)
-entries = []
-
-for i, timestamp in enumerate(timestamps):
-    request_id = f"req-{uuid.uuid4().hex[:8]}"
-    user_id, user_entries = generate_realistic_user()
-    
-    for _ in range(user_entries):
-        entries.append((timestamp.isoformat(), request_id, user_id))
-        # Add slight time variation for same-user entries
-        timestamp += timedelta(seconds=random.uniform(0.1, 1))
-
-# Build individual logs with anomalies
-access_data = []
-execution_data = []
-vpc_data = []
-
-for timestamp, request_id, user_id in entries:
-    # Determine if this is an anomalous entry (5% chance)
-    is_anomaly = random.random() < 0.05
-    is_suspicious_user = user_id in admin_users and random.random() < 0.1
-    
-    # Endpoint selection with anomalies
-    if is_anomaly or is_suspicious_user:
-        endpoint = random.choice(["/api/admin", "/api/config", "/api/backup", "/api/login"])
-        method = random.choice(["POST", "PUT", "DELETE"])
-    else:
-        endpoint = random.choice(endpoints)
-        method = random.choice(methods)
-    
-    # Status code with anomalies
-    if is_anomaly:
-        status_code = random.choice([401, 403, 404, 500])
-    elif is_suspicious_user:
-        status_code = random.choice([200, 201, 403])
-    else:
-        status_code = random.choice(status_codes)
-        if status_code >= 400 and random.random() < 0.7:  # Retry success
-            status_code = random.choice([200, 201])
-    
-    # Access log
-    access_data.append([timestamp, user_id, endpoint, method, status_code, request_id])
-    
-    # Execution log with anomalies
-    function_name = functions_map.get(endpoint, random.choice(list(functions_map.values())))
-    
-    if is_anomaly:
-        duration_ms = random.randint(5000, 30000)  # Very long duration
-        exec_status = random.choice(["FAILED", "TIMEOUT", "ERROR"])
-    else:
-        duration_ms = random.randint(50, 2000)
-        if duration_ms > 1500 and random.random() < 0.3:  # Some long but successful
-            exec_status = "SUCCESS"
-        else:
-            exec_status = random.choice(function_statuses)
-    
-    execution_data.append([timestamp, function_name, duration_ms, exec_status, request_id])
-    
-    # VPC log with anomalies
-    if is_anomaly or is_suspicious_user:
-        src_ip = random.choice(suspicious_ips)
-        action = random.choice(["REJECT", "DROP"])
-        bytes_sent = random.randint(10000, 500000)  # Large data transfer
-    else:
-        src_ip = random.choice(normal_ips)
-        action = "ACCEPT" if status_code < 400 else random.choice(["REJECT", "ACCEPT"])
-        bytes_sent = random.randint(500, 10000)
-    
-    dst_ip = random.choice(normal_ips)
-    vpc_data.append([timestamp, src_ip, dst_ip, action, bytes_sent, request_id])
-
-# Add some brute force attack patterns
-def add_attack_patterns():
-    """Inject some attack patterns into the logs"""
-    # Choose a random time for the attack
-    attack_time = start_date + (end_date - start_date) * random.random()
-    attack_user = random.choice(["attacker", "hacker", "anonymous"])
-    attack_ip = random.choice(suspicious_ips)
-    
-    for i in range(random.randint(50, 100)):  # Attack sequence
-        timestamp = (attack_time + timedelta(seconds=i*0.3)).isoformat()
-        request_id = f"req-{uuid.uuid4().hex[:8]}"
-        
-        # Access log - brute force login attempts
-        access_data.append([
-            timestamp,
-            attack_user,
-            "/api/login",
-            "POST",
-            401,
-            request_id
-        ])
-        
-        # Execution log - failed attempts
-        execution_data.append([
-            timestamp,
-            "login_handler",
-            random.randint(100, 500),
-            "FAILED",
-            request_id
-        ])
-        
-        # VPC log - rejected connections
-        vpc_data.append([
-            timestamp,
-            attack_ip,
-            random.choice(normal_ips),
-            "REJECT",
-            random.randint(100, 500),
-            request_id
-        ])
-
-# Add some data exfiltration pattern
-def add_exfiltration():
-    """Inject data exfiltration pattern"""
-    exfiltration_time = start_date + (end_date - start_date) * random.random()
-    malicious_user = random.choice(admin_users)  # Insider threat
-    malicious_ip = random.choice(["192.168.1.100", "10.0.0.15"])  # Internal malicious
-    
-    for i in range(random.randint(10, 30)):  # Data exfiltration
-        timestamp = (exfiltration_time + timedelta(minutes=i*5)).isoformat()
-        request_id = f"req-{uuid.uuid4().hex[:8]}"
-        
-        # Access log - data access
-        access_data.append([
-            timestamp,
-            malicious_user,
-            "/api/data",
-            "GET",
-            200,
-            request_id
-        ])
-        
-        # Execution log
-        execution_data.append([
-            timestamp,
-            "data_processor",
-            random.randint(2000, 5000),
-            "SUCCESS",
-            request_id
-        ])
-        
-        # VPC log - large data transfers
-        vpc_data.append([
-            timestamp,
-            malicious_ip,
-            random.choice(suspicious_ips),
-            "ACCEPT",  # Might not be caught
-            random.randint(100000, 500000),  # Large transfers
-            request_id
-        ])
-
-# Inject attack patterns
-add_attack_patterns()
-add_exfiltration()
-
-# Shuffle each log independently but keep related entries together
-random.shuffle(access_data)
-random.shuffle(execution_data)
-random.shuffle(vpc_data)
-
-# Save to CSV
-def save_to_csv(filename, headers, data):
-    with open(filename, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        writer.writerows(data)
-
-# Write all logs
-save_to_csv(access_log_file, access_headers, access_data)
-save_to_csv(execution_log_file, execution_headers, execution_data)
-save_to_csv(vpc_log_file, vpc_headers, vpc_data)
-
-print(f"✅ {len(access_data)} diversified & realistic logs saved to:")
-print(f" - {access_log_file}")
-print(f" - {execution_log_file}")
-print(f" - {vpc_log_file}")
-print("\nIncludes:")
-print("- 3 months of historical data with recent bias")
-print("- Realistic user activity patterns")
-print("- Anomalies (5% of entries)")
-print("- Attack patterns (brute force, data exfiltration)")
-print("- Suspicious internal behavior")
-print("- Business hours traffic patterns")
\ No newline at end of file
+LOG_FILES = {table: f"{table}.csv" for table in LOG_TABLES}
+
+
+def _codes(vocabulary: np.ndarray, values) -> np.ndarray:
+    """Positions of values in a vocabulary, string columns are generated as these codes"""
+    lookup = {value: code for code, value in enumerate(vocabulary)}
+    return np.array([lookup[value] for value in values])
+
+
+# Subsets drawn from, as codes into the vocabularies above
+SENSITIVE_ENDPOINT_CODES = _codes(ENDPOINTS, ["/api/admin", "/api/config", "/api/backup", "/api/login"])
+WRITE_METHOD_CODES = _codes(METHODS, ["POST", "PUT", "DELETE"])
+NORMAL_IP_CODES = _codes(IPS, NORMAL_IPS)
+SUSPICIOUS_IP_CODES = _codes(IPS, SUSPICIOUS_IPS)
+INSIDER_IP_CODES = _codes(IPS, INSIDER_IPS)
+ADMIN_CODES = _codes(USERS, ADMIN_USERS)
+REGULAR_CODES = _codes(USERS, REGULAR_USERS)
+ATTACK_CODES = _codes(USERS, ATTACK_USERS)
+CODE_COLUMNS = {"user_id": USERS, "endpoint": ENDPOINTS, "method": METHODS, "function_name": FUNCTIONS,
+                "status": FUNCTION_STATUSES, "src_ip": IPS, "dst_ip": IPS, "action": ACTIONS}
+ATTACK_REQUEST_BASE = 2 ** 31  # request counters above this belong to injected attacks
+
+
+def _rng(seed: int, *stream: int) -> np.random.Generator:
+    return np.random.default_rng([seed, *stream])
+
+
+def _pick(rng: np.random.Generator, values: np.ndarray, size: int) -> np.ndarray:
+    return values[rng.integers(0, len(values), size)]
+
+
+def _timestamps(rng: np.random.Generator, rows: int, lo: float, hi: float) -> np.ndarray:
+    """Sorted epoch seconds in [lo, hi), thinned by hour of day"""
+    kept: List[np.ndarray] = []
+    needed = rows
+    while needed > 0:
+        t = rng.uniform(lo, hi, int(needed * 1.8) + 16)
+        t = t[rng.random(len(t)) < HOUR_WEIGHTS[(t // 3600 % 24).astype(np.int64)]][:needed]
+        kept.append(t)
+        needed -= len(t)
+    return np.sort(np.concatenate(kept))
+
+
+def request_ids(counters: np.ndarray, seed: int) -> np.ndarray:
+    """req-xxxxxxxx ids, a seeded bijection of 32-bit counters so ids never collide"""
+    key = np.uint64((seed + 1) * 0x9E3779B1 & 0xFFFFFFFF)
+    x = (counters.astype(np.uint64) + key) & np.uint64(0xFFFFFFFF)
+    for shift, multiplier in ((16, 0x85EBCA6B), (13, 0xC2B2AE35)):
+        x = (x * np.uint64(multiplier)) & np.uint64(0xFFFFFFFF)
+        x ^= x >> np.uint64(shift)
+    nibbles = (x[:, None] >> np.arange(28, -4, -4, dtype=np.uint64)) & np.uint64(0xF)
+    digits = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)[nibbles.astype(np.int64)]
+    return np.char.add("req-", digits.view("S8").ravel().astype("U8"))
+
+
+def _iso(epoch: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string((epoch * 1e6).astype("datetime64[us]"), unit="us")
+
+
+def brute_force(rng: np.random.Generator, start: float) -> Dict[str, np.ndarray]:
+    """Failed login burst from one attacker and IP, 0.3 s apart"""
+    n = int(rng.integers(50, 101))
+    return dict(
+        epoch=start + np.arange(n) * 0.3, user_id=np.repeat(_pick(rng, ATTACK_CODES, 1), n),
+        endpoint=np.repeat(_codes(ENDPOINTS, ["/api/login"]), n), method=np.repeat(_codes(METHODS, ["POST"]), n),
+        status_code=np.repeat(401, n), duration_ms=rng.integers(100, 501, n), status=np.repeat(1, n),
+        src_ip=np.repeat(_pick(rng, SUSPICIOUS_IP_CODES, 1), n), dst_ip=_pick(rng, NORMAL_IP_CODES, n),
+        action=np.repeat(1, n), bytes_sent=rng.integers(100, 501, n),
+    )
+
+
+def exfiltration(rng: np.random.Generator, start: float) -> Dict[str, np.ndarray]:
+    """Insider admin pulling large transfers to a suspicious IP every 5 minutes"""
+    n = int(rng.integers(10, 31))
+    return dict(
+        epoch=start + np.arange(n) * 300.0, user_id=np.repeat(_pick(rng, ADMIN_CODES, 1), n),
+        endpoint=np.repeat(_codes(ENDPOINTS, ["/api/data"]), n), method=np.repeat(_codes(METHODS, ["GET"]), n),
+        status_code=np.repeat(200, n), duration_ms=rng.integers(2000, 5001, n), status=np.repeat(0, n),
+        src_ip=np.repeat(_pick(rng, INSIDER_IP_CODES, 1), n), dst_ip=_pick(rng, SUSPICIOUS_IP_CODES, n),
+        action=np.repeat(0, n), bytes_sent=rng.integers(100000, 500001, n),
+    )
+
+
+ATTACKS = {"brute_force": brute_force, "exfiltration": exfiltration}
+MAX_ATTACK_ROWS = 100
+
+
+def generate_chunk(rows: int, lo: float, hi: float, seed: int, index: int, first_request: int = 0,
+                   anomaly_rate: float = DEFAULT_ANOMALY_RATE,
+                   attacks: Tuple[Tuple[str, float, int], ...] = ()) -> Dict[str, pd.DataFrame]:
+    """`rows` log entries per table in [lo, hi) epoch seconds plus the given (kind, time, number) attacks.
+
+    Reproducible for (seed, index); request ids are numbered from first_request.
+    String columns come out as categoricals over the fixed vocabularies.
+    """
+    rng = _rng(seed, index)
+
+    # Requests: 80% regular users (a fifth of them more active), 20% admins with longer sessions
+    is_admin = rng.random(rows) >= 0.8
+    active = rng.random(rows) < 0.2
+    entries = np.where(is_admin, rng.integers(1, 11, rows),
+                       np.where(active, rng.integers(1, 6, rows), rng.integers(1, 3, rows)))
+    requests = int(np.searchsorted(np.cumsum(entries), rows)) + 1
+    entries = entries[:requests]
+    entries[-1] -= entries.sum() - rows
+    users = np.where(is_admin[:requests], _pick(rng, ADMIN_CODES, requests), _pick(rng, REGULAR_CODES, requests))
+
+    # Every entry of a request shares its user and request id, 0.1-1 s apart
+    starts = np.cumsum(entries) - entries
+    request_of_row = np.repeat(np.arange(requests), entries)
+    gaps = rng.uniform(0.1, 1.0, rows)
+    elapsed = np.cumsum(gaps) - gaps
+    epoch = _timestamps(rng, requests, lo, hi)[request_of_row] + elapsed - elapsed[starts][request_of_row]
+    user_id = users[request_of_row]
+
+    # Anomalies and suspicious admin activity
+    is_anomaly = rng.random(rows) < anomaly_rate
+    is_suspicious = (user_id < len(ADMIN_USERS)) & (rng.random(rows) < 0.1) & ~is_anomaly
+    unusual = is_anomaly | is_suspicious
+
+    endpoint = np.where(unusual, _pick(rng, SENSITIVE_ENDPOINT_CODES, rows), rng.integers(0, len(ENDPOINTS), rows))
+    method = np.where(unusual, _pick(rng, WRITE_METHOD_CODES, rows), rng.integers(0, len(METHODS), rows))
+    status_code = _pick(rng, STATUS_CODES, rows)
+    retried = (status_code >= 400) & (rng.random(rows) < 0.7)  # Retry success
+    status_code = np.where(retried, _pick(rng, np.array([200, 201]), rows), status_code)
+    status_code = np.where(is_suspicious, _pick(rng, np.array([200, 201, 403]), rows), status_code)
+    status_code = np.where(is_anomaly, _pick(rng, np.array([401, 403, 404, 500]), rows), status_code)
+
+    duration_ms = np.where(is_anomaly, rng.integers(5000, 30001, rows), rng.integers(50, 2001, rows))
+    exec_status = rng.integers(0, len(FUNCTION_STATUSES), rows)
+    exec_status = np.where((duration_ms > 1500) & (rng.random(rows) < 0.3), 0, exec_status)  # SUCCESS
+    exec_status = np.where(is_anomaly, rng.integers(1, len(FUNCTION_STATUSES), rows), exec_status)
+
+    src_ip = np.where(unusual, _pick(rng, SUSPICIOUS_IP_CODES, rows), _pick(rng, NORMAL_IP_CODES, rows))
+    action = np.where(status_code < 400, 0, rng.integers(0, 2, rows))  # ACCEPT, or REJECT/ACCEPT on errors
+    action = np.where(unusual, rng.integers(1, 3, rows), action)  # REJECT/DROP
+    bytes_sent = np.where(unusual, rng.integers(10000, 500001, rows), rng.integers(500, 10001, rows))
+
+    columns = dict(epoch=epoch, user_id=user_id, endpoint=endpoint, method=method, status_code=status_code,
+                   request=first_request + request_of_row, duration_ms=duration_ms, status=exec_status,
+                   src_ip=src_ip, dst_ip=_pick(rng, NORMAL_IP_CODES, rows), action=action, bytes_sent=bytes_sent)
+    for kind, start, number in attacks:
+        injected = ATTACKS[kind](_rng(seed, index, number), start)
+        n = len(injected["epoch"])
+        injected["request"] = ATTACK_REQUEST_BASE + number * MAX_ATTACK_ROWS + np.arange(n)
+        columns = {name: np.concatenate([values, injected[name]]) for name, values in columns.items()}
+    columns["function_name"] = columns["endpoint"]
+
+    order = np.argsort(columns["epoch"], kind="stable")
+    columns = {name: values[order] for name, values in columns.items()}
+    # Strings are built once per distinct value and shared by the three tables
+    shared = {name: pd.Categorical.from_codes(columns[name], vocabulary) for name, vocabulary in CODE_COLUMNS.items()}
+    numbers, positions = np.unique(columns["request"], return_inverse=True)
+    shared["request_id"] = pd.Categorical.from_codes(positions, request_ids(numbers, seed))
+    shared["timestamp"] = pd.array(_iso(columns["epoch"]), dtype="str")
+    for name in ("status_code", "duration_ms", "bytes_sent"):
+        shared[name] = columns[name]
+    return {table: pd.DataFrame({c: shared[c] for c in LOG_COLUMNS[table]}) for table in LOG_TABLES}
+
+
+# ==============================================
+# CHUNK PLAN
+# ==============================================
+def plan_chunks(rows: int, start: datetime, end: datetime, seed: int, attacks: int = 1,
+                chunk_rows: int = CHUNK_ROWS) -> List[Tuple[int, float, float, tuple]]:
+    """(rows, lo, hi, first request, attacks) per chunk; chunks cover consecutive slices of the window"""
+    # Naive times are UTC, like the generated timestamps, so output doesn't depend on the local zone
+    lo, hi = (t.replace(tzinfo=t.tzinfo or timezone.utc).timestamp() for t in (start, end))
+    rng = _rng(seed, 2 ** 32 - 1)  # own stream, the attack times don't depend on the chunking
+    injected = sorted((float(t), kind) for kind in ATTACKS for t in rng.uniform(lo, hi, attacks))
+
+    sizes = [chunk_rows] * (rows // chunk_rows) + ([rows % chunk_rows] if rows % chunk_rows else [])
+    firsts = np.cumsum([0] + sizes)  # a chunk has at most one request per row
+    bounds = lo + (hi - lo) * firsts / max(rows, 1)
+    last = len(sizes) - 1
+    return [
+        (size, bounds[i], bounds[i + 1], int(firsts[i]),
+         tuple((kind, t, number) for number, (t, kind) in enumerate(injected)
+               if bounds[i] <= t < bounds[i + 1] or (i == last and t == hi)))
+        for i, size in enumerate(sizes)
+    ]
+
+
+def _generate(args: tuple) -> Dict[str, pd.DataFrame]:
+    index, (rows, lo, hi, first_request, attacks), seed, anomaly_rate = args
+    return generate_chunk(rows, lo, hi, seed, index, first_request, anomaly_rate, attacks)
+
+
+def generate(rows: int = DEFAULT_ROWS, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             seed: int = 0, anomaly_rate: float = DEFAULT_ANOMALY_RATE, attacks: int = 1,
+             chunk_rows: int = CHUNK_ROWS, workers: int = 1) -> Iterator[Dict[str, pd.DataFrame]]:
+    """Log frames chunk by chunk, in time order; workers > 1 generates ahead in child processes"""
+    end = end or datetime.now()
+    start = start or end - timedelta(days=DEFAULT_DAYS)
+    tasks = [(i, chunk, seed, anomaly_rate)
+             for i, chunk in enumerate(plan_chunks(rows, start, end, seed, attacks, chunk_rows))]
+    if workers <= 1:
+        yield from map(_generate, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_generate, task))
+            if len(pending) > 2 * workers:  # bounded read-ahead, chunks come out in order
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# ==============================================
+# OUTPUTS
+# ==============================================
+class ArrowSink:
+    """One Arrow writer per table, later chunks are cast to the first chunk's schema"""
+    def __init__(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.writers = {}
+        self.schemas = {}
+        self.files = []
+
+    def open_writer(self, table: str, schema):
+        raise NotImplementedError
+
+    def write(self, frames: Dict[str, pd.DataFrame]) -> None:
+        import pyarrow as pa
+        for table, df in frames.items():
+            batch = pa.Table.from_pandas(df, preserve_index=False)
+            if table not in self.writers:
+                self.schemas[table] = batch.schema
+                self.writers[table] = self.open_writer(table, batch.schema)
+            self.writers[table].write_table(batch.cast(self.schemas[table]))  # dictionary index widths vary by chunk
+
+    def close(self) -> None:
+        for writer in self.writers.values():
+            writer.close()
+        for f in self.files:
+            f.close()
+
+
+class CsvSink(ArrowSink):
+    """CSV through Arrow's writer, several times faster than DataFrame.to_csv"""
+    def open_writer(self, table: str, schema):
+        import pyarrow.csv as pacsv
+        path = os.path.join(self.out_dir, LOG_FILES[table])
+        with open(path, "w") as f:
+            f.write(",".join(schema.names) + "\n")  # Arrow would quote the header names
+        options = pacsv.WriteOptions(include_header=False, quoting_style="none")
+        self.files.append(open(path, "ab"))
+        return pacsv.CSVWriter(self.files[-1], schema, write_options=options)
+
+
+class ParquetSink(ArrowSink):
+    def open_writer(self, table: str, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(os.path.join(self.out_dir, f"{table}.parquet"), schema)
+
+
+class SqliteSink:
+    """Log tables plus the dashboard's sketches, replaced on open and appended per chunk"""
+    def __init__(self, path: str, sketches: bool = True, encoded: bool = False):
+        from utilities.anomalies import ALERT_TABLE, STATE_TABLE
+        from utilities.dictionary import drop_log_tables
+        from utilities.sketches import SKETCH_TABLE
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = OFF")  # bulk load, the file is rebuilt from the seed if lost
+        drop_log_tables(self.conn)
+        for table in (SKETCH_TABLE, ALERT_TABLE, STATE_TABLE):
+            self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.sketches = sketches
+        self.encoded = encoded
+
+    def write(self, frames: Dict[str, pd.DataFrame]) -> None:
+        from utilities.cidr import with_ip_columns
+        from utilities.dictionary import encode
+        from utilities.sketches import write_sketches
+        tables = with_ip_columns(frames)
+        for table, df in (encode(self.conn, tables) if self.encoded else tables).items():
+            df.to_sql(table, self.conn, if_exists="append", index=False, chunksize=100_000)
+        if self.sketches:
+            write_sketches(self.conn, frames, append=True)
+        self.conn.commit()
+
+    def close(self) -> None:
+        from utilities.catalog import refresh_catalog
+        from utilities.cidr import ensure_ip_indexes
+        from utilities.dictionary import create_views
+        from utilities.search import ensure_search_index
+        from utilities.trail import ensure_trail_indexes
+        create_views(self.conn)
+        # Built once after the bulk load, cheaper than maintaining them per chunk
+        ensure_trail_indexes(self.conn)
+        ensure_ip_indexes(self.conn)
+        ensure_search_index(self.conn, rebuild=True)
+        refresh_catalog(self.conn)
+        self.conn.execute("PRAGMA synchronous = FULL")
+        self.conn.close()
+
+
+def open_sink(fmt: str, out: str, sketches: bool = True, encoded: bool = False):
+    if fmt == "sqlite":
+        return SqliteSink(out, sketches, encoded)
+    return ParquetSink(out) if fmt == "parquet" else CsvSink(out)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Generate synthetic access, execution and VPC logs")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="rows per table, before injected attacks")
+    parser.add_argument("--days", type=float, default=DEFAULT_DAYS, help="time span ending at --end")
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None,
+                        help="end of the window (default now); fix it for byte-identical reruns")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--anomaly-rate", type=float, default=DEFAULT_ANOMALY_RATE)
+    parser.add_argument("--attacks", type=int, default=1, help="brute-force and exfiltration patterns, each")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--out", default=".", help="directory for csv/parquet, database file for sqlite")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1, help="generator processes")
+    parser.add_argument("--no-sketches", action="store_true", help="sqlite: skip the hourly sketches")
+    parser.add_argument("--encode", action="store_true",
+                        help="sqlite: dictionary-encode users, endpoints, methods, functions, statuses and actions "
+                             "(smaller file, slower queries on them)")
+    args = parser.parse_args(argv)
+
+    end = args.end or datetime.now()
+    started = time.perf_counter()
+    sink = open_sink(args.format, args.out, sketches=not args.no_sketches, encoded=args.encode)
+    written = 0
+    try:
+        for frames in generate(args.rows, end - timedelta(days=args.days), end, args.seed, args.anomaly_rate,
+                               args.attacks, args.chunk_rows, args.workers):
+            sink.write(frames)
+            written += len(frames["access_logs"])
+    finally:
+        sink.close()
+    seconds = time.perf_counter() - started
+
+    print(f"✅ {written:,} rows per table written as {args.format} to '{args.out}' "
+          f"in {seconds:.1f}s ({written / seconds:,.0f} rows/s)")
+    print("\nIncludes:")
+    print(f"- {args.days:g} days of data ending {end:%Y-%m-%d %H:%M}, seed {args.seed}")
+    print("- Realistic user activity patterns and business hours traffic")
+    print(f"- Anomalies ({args.anomaly_rate:.0%} of entries) and suspicious internal behavior")
+    print(f"- Attack patterns: {args.attacks} brute force and {args.attacks} data exfiltration")
+    if args.format == "sqlite":
+        print(f"Score alerts with: python -m utilities.anomalies --db {args.out} --full")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,15 @@
+import argparse
 import sqlite3
 import pandas as pd
 
+from utilities.anomalies import ALERT_TABLE, detect, mark_scanned, write_alerts
+from utilities.catalog import refresh_catalog
+from utilities.cidr import ensure_ip_indexes, with_ip_columns
+from utilities.dictionary import create_views, drop_log_tables, encode
+from utilities.search import ensure_search_index
+from utilities.sketches import SKETCH_TABLE, write_sketches
+from utilities.trail import ensure_trail_indexes
+
 # CSV files
 access_csv = "access_logs.csv"
 execution_csv = "execution_logs.csv"
@@ -9,23 +18,74 @@ vpc_csv = "vpc_logs.csv"
 # SQLite DB file
 db_file = "logs.db"
 
-# Read CSVs using pandas
-access_df = pd.read_csv(access_csv)
-execution_df = pd.read_csv(execution_csv)
-vpc_df = pd.read_csv(vpc_csv)
 
-# Connect to SQLite DB (or create if it doesn't exist)
-conn = sqlite3.connect(db_file)
+def load_frames(access_path: str = access_csv, execution_path: str = execution_csv,
+                vpc_path: str = vpc_csv) -> dict:
+    """Read the three log CSVs into DataFrames keyed by table name"""
+    return {
+        "access_logs": pd.read_csv(access_path),
+        "execution_logs": pd.read_csv(execution_path),
+        "vpc_logs": pd.read_csv(vpc_path),
+    }
+
+
+def write_database(frames: dict, path: str = db_file, encoded: bool = False) -> None:
+    """Save each DataFrame as a table in a single SQLite database, dictionary-encoded behind views if asked"""
+    # Connect to SQLite DB (or create if it doesn't exist)
+    conn = sqlite3.connect(path)
+    try:
+        # Either layout may be there from an earlier import
+        drop_log_tables(conn)
+        # vpc_logs gets integer copies of its IPs for indexed subnet queries
+        tables = with_ip_columns(frames)
+        for table, df in (encode(conn, tables) if encoded else tables).items():
+            df.to_sql(table, conn, if_exists="replace", index=False)
+        create_views(conn)
+        ensure_ip_indexes(conn)
+        # Covering request_id indexes for the request trail lookup
+        ensure_trail_indexes(conn)
+        # Trigram search over endpoints, users, functions and IPs; the replaced tables have new rowids
+        ensure_search_index(conn, rebuild=True)
+        # Hourly user/IP sketches for the dashboard's approximate counts
+        conn.execute(f"DROP TABLE IF EXISTS {SKETCH_TABLE}")
+        write_sketches(conn, frames)
+        # Scored anomalies for the security panels, later rows are picked up by `python -m utilities.anomalies`
+        conn.execute(f"DROP TABLE IF EXISTS {ALERT_TABLE}")
+        write_alerts(conn, detect(frames["access_logs"], frames["vpc_logs"]))
+        mark_scanned(conn)
+        # Schema, samples and column values for the SQL prompt, last so it is stamped with the final schema
+        refresh_catalog(conn)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the log CSVs into SQLite")
+    parser.add_argument("--db", default=db_file, help="target database file")
+    parser.add_argument("--sharded", metavar="DIR", help="write one database per day/week into DIR instead")
+    parser.add_argument("--granularity", choices=["day", "week"], default="day")
+    parser.add_argument("--encode", action="store_true",
+                        help="dictionary-encode users, endpoints, methods, functions, statuses and actions "
+                             "(smaller file, slower queries on them)")
+    args = parser.parse_args()
+    if args.encode and args.sharded:
+        parser.error("--encode is not supported for sharded storage")
+
+    frames = load_frames()
+
+    if args.sharded:
+        from utilities.shards import write_shards
+        paths = write_shards(frames, args.sharded, args.granularity)
+        print(f"✅ Logs split into {len(paths)} {args.granularity} shards under '{args.sharded}'")
+        return
+
+    write_database(frames, args.db, encoded=args.encode)
 
-# Save each DataFrame as a table in the database
-access_df.to_sql("access_logs", conn, if_exists="replace", index=False)
-execution_df.to_sql("execution_logs", conn, if_exists="replace", index=False)
-vpc_df.to_sql("vpc_logs", conn, if_exists="replace", index=False)
+    print(f"✅ Logs successfully imported into '{args.db}' with tables:")
+    print("   - access_logs")
+    print("   - execution_logs")
+    print("   - vpc_logs")
 
-# Close connection
-conn.close()
 
-print("✅ Logs successfully imported into 'logs.db' with tables:")
-print("   - access_logs")
-print("   - execution_logs")
-print("   - vpc_logs")
+if __name__ == "__main__":
+    main()
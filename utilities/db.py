@@ -0,0 +1,21 @@
+import os
+import sqlite3
+
+# Main log database used by the chatbot and the dashboard
+DB_PATH = "logs2.db"
+LOG_TABLES = ("access_logs", "execution_logs", "vpc_logs")
+LOG_COLUMNS = {
+    "access_logs": ("timestamp", "user_id", "endpoint", "method", "status_code", "request_id"),
+    "execution_logs": ("timestamp", "function_name", "duration_ms", "status", "request_id"),
+    "vpc_logs": ("timestamp", "src_ip", "dst_ip", "action", "bytes_sent", "request_id"),
+}
+
+# Directory of per-day/per-week shards, sharded mode is on when this is set
+SHARD_DIR = os.getenv("LOGBOT_SHARD_DIR")
+
+
+def connect(path: str = DB_PATH, read_only: bool = False, timeout: float = 30.0) -> sqlite3.Connection:
+    """Open a connection to the log database, optionally read-only"""
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=timeout, check_same_thread=False)
+    return sqlite3.connect(path, timeout=timeout, check_same_thread=False)
@@ -0,0 +1,194 @@
+"""
+Dictionary encoding of the repeated text columns of the log tables.
+
+An encoded log table is stored as `<table>_data`, with each of its columns
+below replaced by an integer code into `dict_<column>` (id, value), and the
+table's own name becomes a view that decodes them. Queries, the SQL prompt
+and the dashboard read the same columns as before:
+
+    CREATE VIEW access_logs AS SELECT d.timestamp,
+        (SELECT value FROM dict_user_id WHERE id = d.user_id_id) AS user_id, ..., d.rowid AS rowid
+    FROM access_logs_data AS d
+
+The codes are decoded by scalar subqueries rather than joins, so a query
+only pays for the columns it reads; rowid is carried by the view for the
+live tail, the alert scanner and the search index. Encoding is a storage
+saving, not a speed-up: it shrinks the file and its covering indexes, but
+every decoded value is one dictionary lookup per row, so GROUP BY and
+filters on these columns run 1.3-4.6x slower than on plain text. A view of
+LEFT JOINs on the dictionaries was measured too: equality filters use the
+code index through it, but grouping gets slower still and queries that read
+no encoded column pay for every join. Hence opt-in, see
+`python -m benchmarks.bench_dictionary`.
+
+    python -m utilities.create_logs_db --format sqlite --out logs2.db --encode
+    python -m utilities.dictionary --db logs2.db      # encode an existing database
+"""
+import argparse
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from utilities.db import DB_PATH, LOG_TABLES, connect
+
+ENCODED_COLUMNS = {
+    "access_logs": ("user_id", "endpoint", "method"),
+    "execution_logs": ("function_name", "status"),
+    "vpc_logs": ("action",),
+}
+
+
+def data_table(table: str) -> str:
+    return f"{table}_data"
+
+
+def dictionary_table(column: str) -> str:
+    return f"dict_{column}"
+
+
+def code_column(column: str) -> str:
+    return f"{column}_id"
+
+
+def _tables(conn: sqlite3.Connection) -> set:
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def is_encoded(conn: sqlite3.Connection, table: str) -> bool:
+    return data_table(table) in _tables(conn)
+
+
+def storage_table(conn: sqlite3.Connection, table: str) -> str:
+    """Table holding the rows of a log table: `<table>_data` when encoded, the table itself otherwise"""
+    return data_table(table) if is_encoded(conn, table) else table
+
+
+def stored_columns(conn: sqlite3.Connection, table: str, columns: Iterable[str]) -> List[str]:
+    """Columns as named in storage_table, codes in place of the encoded ones, e.g. for indexes"""
+    if not is_encoded(conn, table):
+        return list(columns)
+    return [code_column(c) if c in ENCODED_COLUMNS[table] else c for c in columns]
+
+
+# ==============================================
+# ENCODING
+# ==============================================
+def ensure_dictionaries(conn: sqlite3.Connection) -> None:
+    for columns in ENCODED_COLUMNS.values():
+        for column in columns:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {dictionary_table(column)} "
+                         "(id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+
+
+def codes(conn: sqlite3.Connection, column: str, values: pd.Series) -> pd.Series:
+    """Dictionary codes of a column's values, adding the values not seen before; NULL stays NULL"""
+    name = dictionary_table(column)
+    distinct = pd.unique(values.dropna())
+    conn.executemany(f"INSERT OR IGNORE INTO {name} (value) VALUES (?)", ((str(v),) for v in distinct))
+    lookup = dict(conn.execute(f"SELECT value, id FROM {name}").fetchall())
+    return values.map(lambda v: lookup.get(str(v)) if pd.notna(v) else None).astype("Int64")
+
+
+def encode(conn: sqlite3.Connection, frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """The frames with their encoded columns as codes, keyed by data table, ready to append"""
+    ensure_dictionaries(conn)
+    encoded = {}
+    for table, df in frames.items():
+        columns = [c for c in ENCODED_COLUMNS.get(table, ()) if c in df.columns]
+        df = df.assign(**{c: codes(conn, c, df[c]) for c in columns})
+        encoded[data_table(table) if table in ENCODED_COLUMNS else table] = df.rename(
+            columns={c: code_column(c) for c in columns})
+    return encoded
+
+
+def create_views(conn: sqlite3.Connection) -> None:
+    """(Re)create the decoding view of each encoded table, over all the columns its data table has now"""
+    present = _tables(conn)
+    for table, encoded in ENCODED_COLUMNS.items():
+        if data_table(table) not in present:
+            continue
+        select = []
+        for _, name, *_ in conn.execute(f"PRAGMA table_info({data_table(table)})"):
+            column = name[:-len("_id")] if name.endswith("_id") else None
+            if column in encoded:
+                select.append(f"(SELECT value FROM {dictionary_table(column)} WHERE id = d.{name}) AS {column}")
+            else:
+                select.append(f"d.{name}")
+        conn.execute(f"DROP VIEW IF EXISTS {table}")
+        conn.execute(f"CREATE VIEW {table} AS SELECT {', '.join(select)}, d.rowid AS rowid "
+                     f"FROM {data_table(table)} AS d")
+    conn.commit()
+
+
+def drop_log_tables(conn: sqlite3.Connection) -> None:
+    """Drop the log tables in either layout, with their dictionaries, before a reload"""
+    for table in LOG_TABLES:
+        conn.execute(f"DROP VIEW IF EXISTS {table}")
+        conn.execute(f"DROP TABLE IF EXISTS {data_table(table)}")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    for columns in ENCODED_COLUMNS.values():
+        for column in columns:
+            conn.execute(f"DROP TABLE IF EXISTS {dictionary_table(column)}")
+
+
+def encode_table(conn: sqlite3.Connection, table: str) -> int:
+    """Move a plain log table into its data table, keeping rowids, and put the view in its place; returns rows"""
+    if is_encoded(conn, table) or table not in _tables(conn):
+        return 0
+    ensure_dictionaries(conn)
+    encoded = ENCODED_COLUMNS[table]
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns, definitions, select = [], [], []
+    for _, name, kind, *_ in info:
+        if name in encoded:
+            conn.execute(f"INSERT OR IGNORE INTO {dictionary_table(name)} (value) "
+                         f"SELECT DISTINCT {name} FROM {table} WHERE {name} IS NOT NULL")
+            columns.append(code_column(name))
+            definitions.append(f"{code_column(name)} INTEGER")
+            select.append(f"(SELECT id FROM {dictionary_table(name)} WHERE value = t.{name})")
+        else:
+            columns.append(name)
+            definitions.append(f"{name} {kind}".strip())
+            select.append(f"t.{name}")
+    conn.execute(f"CREATE TABLE {data_table(table)} ({', '.join(definitions)})")
+    rows = conn.execute(f"INSERT INTO {data_table(table)} (rowid, {', '.join(columns)}) "
+                        f"SELECT t.rowid, {', '.join(select)} FROM {table} AS t").rowcount
+    conn.execute(f"DROP TABLE {table}")  # its indexes go with it, callers rebuild them on the data table
+    create_views(conn)
+    return rows
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Dictionary-encode the log tables of an existing database: "
+                                                 "a smaller file, slower queries on the encoded columns")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    from utilities.cidr import ensure_ip_indexes
+    from utilities.search import ensure_search_index, search_tables
+    from utilities.trail import ensure_trail_indexes
+
+    started = time.perf_counter()
+    size_before = os.path.getsize(args.db)
+    conn = connect(args.db)
+    try:
+        indexed = bool(search_tables(conn))
+        rows = {table: encode_table(conn, table) for table in LOG_TABLES}
+        conn.commit()
+        ensure_trail_indexes(conn)
+        ensure_ip_indexes(conn)
+        if indexed:  # the search tables read through the views, whose rowids are unchanged, but rebuild anyway
+            ensure_search_index(conn, rebuild=True)
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    print(f"✅ Encoded {', '.join(f'{t} ({n:,} rows)' for t, n in rows.items() if n) or 'nothing new'} "
+          f"on '{args.db}' in {time.perf_counter() - started:.1f}s: "
+          f"{size_before / 2 ** 20:.1f} MiB -> {os.path.getsize(args.db) / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
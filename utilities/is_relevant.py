@@ -1,6 +1,6 @@
 from sentence_transformers import SentenceTransformer, util
 from transformers import pipeline
-from langchain.chat_models import init_chat_model
+from utilities.llm import get_llm
 import os
 
 
@@ -108,7 +108,7 @@ def is_relevant_log_query_pre_trained(question:str)->bool:
     os.environ["LANGSMITH_TRACING"] = "false"
     os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY", "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")
 
-    llm = init_chat_model("gemma2-9b-it", model_provider="groq")
+    llm = get_llm()
 
     prompt = f"""Classify this query as 'log_query' or 'non_log_query':
     
@@ -0,0 +1,169 @@
+"""
+Incremental live tail over the log tables.
+
+The first poll reads the whole window once; every later poll only reads rows
+with a rowid above the last one seen, folds them into per-bucket running
+aggregates and drops buckets that slid out of the window. A refresh therefore
+costs O(new rows + buckets), not O(rows in the window).
+"""
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import pandas as pd
+
+from utilities.db import LOG_TABLES
+
+LIVE_BUCKET_SECONDS = 60
+LIVE_REFRESH_SECONDS = 5
+
+# Bucket of a row, integer epoch seconds floored to the bucket size
+BUCKET_SQL = "CAST(strftime('%s', {ts}) AS INTEGER) / :bucket * :bucket"
+
+ACCESS_SQL = f"""
+SELECT {BUCKET_SQL.format(ts='timestamp')} AS bucket, COUNT(*) AS requests,
+       SUM(CASE WHEN status_code >= 400 THEN 1 ELSE 0 END) AS errors
+FROM access_logs
+WHERE rowid > :lo AND rowid <= :hi AND timestamp >= :since
+GROUP BY bucket
+"""
+USERS_SQL = f"""
+SELECT DISTINCT {BUCKET_SQL.format(ts='timestamp')} AS bucket, user_id
+FROM access_logs
+WHERE rowid > :lo AND rowid <= :hi AND timestamp >= :since
+"""
+EXECUTION_SQL = f"""
+SELECT {BUCKET_SQL.format(ts='timestamp')} AS bucket, COUNT(*) AS executions,
+       SUM(duration_ms) AS latency_sum,
+       SUM(CASE WHEN status = 'SUCCESS' THEN 1 ELSE 0 END) AS successes,
+       SUM(CASE WHEN status = 'FAILED' THEN 1 ELSE 0 END) AS failures
+FROM execution_logs
+WHERE rowid > :lo AND rowid <= :hi AND timestamp >= :since
+GROUP BY bucket
+"""
+ERROR_REQUESTS_SQL = f"""
+SELECT {BUCKET_SQL.format(ts='timestamp')} AS bucket, request_id AS error_request
+FROM access_logs
+WHERE rowid > :lo AND rowid <= :hi AND timestamp >= :since AND status_code >= 400
+"""
+# Raw rows: per-IP errors are matched against the errored request ids seen so far,
+# which avoids a join against the (unindexed) access table on every poll
+VPC_SQL = f"""
+SELECT {BUCKET_SQL.format(ts='timestamp')} AS bucket, src_ip, action, request_id
+FROM vpc_logs
+WHERE rowid > :lo AND rowid <= :hi AND timestamp >= :since
+"""
+TABLE_QUERIES = {
+    "access_logs": (ACCESS_SQL, USERS_SQL, ERROR_REQUESTS_SQL),
+    "execution_logs": (EXECUTION_SQL,),
+    "vpc_logs": (VPC_SQL,),
+}
+COUNTERS = ("requests", "errors", "executions", "latency_sum", "successes", "failures", "rejected")
+
+
+def _empty_bucket() -> dict:
+    bucket = dict.fromkeys(COUNTERS, 0)
+    bucket.update(users=set(), error_requests=set(), ip_requests=Counter(), ip_errors=Counter())
+    return bucket
+
+
+class LiveTail:
+    def __init__(self, window: timedelta, bucket_seconds: int = LIVE_BUCKET_SECONDS):
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.last_rowid: Dict[str, int] = dict.fromkeys(LOG_TABLES, 0)
+        self.buckets: Dict[int, dict] = {}
+        self._errored: set = set()  # errored request ids of the buckets in the window
+        self.last_poll = {"rows": 0, "ms": 0.0}
+
+    def poll(self, conn: sqlite3.Connection, now: Optional[datetime] = None) -> int:
+        """Fold rows added since the last poll into the aggregates, returns the number read"""
+        started = time.perf_counter()
+        now = now or datetime.now()
+        since = (now - self.window).isoformat()
+        # strftime('%s') reads the naive log timestamps as UTC, so does the cutoff
+        cutoff = int((now - self.window).replace(tzinfo=timezone.utc).timestamp())
+        cutoff = cutoff // self.bucket_seconds * self.bucket_seconds
+        read = 0
+        for table, queries in TABLE_QUERIES.items():
+            hi = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+            if hi < self.last_rowid[table]:  # rows were deleted and rowids reused, start over
+                self.reset()
+                return self.poll(conn, now)
+            params = {"lo": self.last_rowid[table], "hi": hi, "since": since, "bucket": self.bucket_seconds}
+            for query in queries:
+                cursor = conn.execute(query, params)
+                columns = [c[0] for c in cursor.description]
+                for row in cursor:
+                    read += self._fold(dict(zip(columns, row)))
+            self.last_rowid[table] = hi
+        expired = [b for b in self.buckets if b is not None and b < cutoff]
+        for bucket in expired:
+            self._errored -= self.buckets.pop(bucket)["error_requests"]
+        self.last_poll = {"rows": read, "ms": (time.perf_counter() - started) * 1000}
+        return read
+
+    def _fold(self, row: dict) -> int:
+        """Add one aggregated row to its bucket, returns the source rows it stands for"""
+        bucket = self.buckets.setdefault(row.pop("bucket"), _empty_bucket())
+        if "user_id" in row:
+            bucket["users"].add(row["user_id"])
+            return 0  # already counted by the access aggregate
+        if "error_request" in row:
+            bucket["error_requests"].add(row["error_request"])
+            self._errored.add(row["error_request"])
+            return 0
+        if "src_ip" in row:
+            bucket["ip_requests"][row["src_ip"]] += 1
+            bucket["ip_errors"][row["src_ip"]] += row["request_id"] in self._errored
+            bucket["rejected"] += row["action"] == "REJECT"
+            return 1
+        for key, value in row.items():
+            bucket[key] += value or 0
+        return row.get("requests") or row.get("executions") or 0
+
+    def reset(self) -> None:
+        self.last_rowid = dict.fromkeys(LOG_TABLES, 0)
+        self.buckets.clear()
+        self._errored.clear()
+
+    def totals(self) -> dict:
+        """Headline metrics over the window, summed from the buckets"""
+        sums = dict.fromkeys(COUNTERS, 0)
+        users = set()
+        for bucket in self.buckets.values():
+            for key in COUNTERS:
+                sums[key] += bucket[key]
+            users |= bucket["users"]
+        return {
+            "total_requests": sums["requests"],
+            "avg_latency": sums["latency_sum"] / sums["executions"] if sums["executions"] else 0,
+            "active_users": len(users),
+            "success_rate": 100.0 * sums["successes"] / sums["executions"] if sums["executions"] else 0,
+            "rejected_connections": sums["rejected"],
+            "failed_executions": sums["failures"],
+        }
+
+    def series(self) -> pd.DataFrame:
+        """Per-bucket requests, latency and success rate, oldest first"""
+        rows = [
+            {
+                "time": datetime.fromtimestamp(b, timezone.utc).replace(tzinfo=None),
+                "requests": v["requests"],
+                "avg_latency": v["latency_sum"] / v["executions"] if v["executions"] else None,
+                "success_rate": 100.0 * v["successes"] / v["executions"] if v["executions"] else None,
+            }
+            for b, v in sorted(self.buckets.items()) if b is not None
+        ]
+        return pd.DataFrame(rows, columns=["time", "requests", "avg_latency", "success_rate"])
+
+    def error_ips(self, limit: int = 10) -> pd.DataFrame:
+        """Source IPs with the most errored or rejected requests in the window"""
+        requests, errors = Counter(), Counter()
+        for bucket in self.buckets.values():
+            requests.update(bucket["ip_requests"])
+            errors.update(bucket["ip_errors"])
+        top = [(ip, n, requests[ip]) for ip, n in errors.most_common(limit) if n]
+        return pd.DataFrame(top, columns=["src_ip", "errors", "requests"])
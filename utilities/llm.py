@@ -0,0 +1,80 @@
+"""
+Chat model provider for SQL generation, summaries and query classification.
+
+The provider is chosen with LOGBOT_LLM_PROVIDER:
+- groq (default): gemma2-9b-it over the Groq API
+- llamacpp: a local GGUF model in this process, LOGBOT_LLM_MODEL is the file path
+- ollama: a model served by a local Ollama daemon
+
+Local models are loaded once per process and kept warm; LOGBOT_LLM_CTX and
+LOGBOT_LLM_THREADS set their context size and CPU threads. Every model is
+wrapped in the shared client of utilities/llm_client.py; LOGBOT_LLM_BASE_URL
+points the remote provider at another endpoint, e.g. a local stand-in server.
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from utilities.llm_client import MAX_CONCURRENT, SharedLLM, http_client
+
+REMOTE_MODEL = "gemma2-9b-it"
+PROVIDER = os.getenv("LOGBOT_LLM_PROVIDER", "groq")
+MODEL = os.getenv("LOGBOT_LLM_MODEL")
+BASE_URL = os.getenv("LOGBOT_LLM_BASE_URL")
+CONTEXT_TOKENS = int(os.getenv("LOGBOT_LLM_CTX", "4096"))  # the SQL prompt with table info is about 2k tokens
+THREADS = int(os.getenv("LOGBOT_LLM_THREADS", str(os.cpu_count() or 4)))
+MAX_TOKENS = 512
+
+
+def _groq(temperature: float):
+    from langchain.chat_models import init_chat_model
+    endpoint = {"base_url": BASE_URL} if BASE_URL else {}
+    # Retries are left to SharedLLM, which backs off across all callers at once
+    return init_chat_model(MODEL or REMOTE_MODEL, model_provider="groq", temperature=temperature,
+                           http_client=http_client(), max_retries=0, **endpoint)
+
+
+def _llamacpp(temperature: float):
+    from langchain_community.chat_models import ChatLlamaCpp
+    if not MODEL or not os.path.exists(MODEL):
+        raise ValueError(f"LOGBOT_LLM_MODEL must point to a GGUF file for the llamacpp provider, got {MODEL!r}")
+    return ChatLlamaCpp(model_path=MODEL, n_ctx=CONTEXT_TOKENS, n_threads=THREADS, n_batch=512,
+                        temperature=temperature, max_tokens=MAX_TOKENS, verbose=False)
+
+
+def _ollama(temperature: float):
+    from langchain.chat_models import init_chat_model
+    return init_chat_model(MODEL or "sqlcoder", model_provider="ollama", temperature=temperature,
+                           num_ctx=CONTEXT_TOKENS, num_thread=THREADS, num_predict=MAX_TOKENS)
+
+
+PROVIDERS: Dict[str, Callable[[float], object]] = {"groq": _groq, "llamacpp": _llamacpp, "ollama": _ollama}
+LOCAL_PROVIDERS = ("llamacpp", "ollama")
+CONCURRENCY = {"llamacpp": 1}  # one llama.cpp context cannot serve two calls at once
+_load_lock = threading.Lock()  # two sessions starting together must not load a local model twice
+
+
+@lru_cache(maxsize=None)
+def _load(provider: str, temperature: float):
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LOGBOT_LLM_PROVIDER {provider!r}, expected one of {', '.join(PROVIDERS)}")
+    return SharedLLM(PROVIDERS[provider](temperature), CONCURRENCY.get(provider, MAX_CONCURRENT))
+
+
+def get_llm(temperature: float = 0.0, provider: Optional[str] = None):
+    """The shared chat model of the configured provider, built once per process and temperature"""
+    with _load_lock:
+        return _load(provider or PROVIDER, float(temperature))
+
+
+def warm_up(provider: Optional[str] = None) -> float:
+    """Load the model and run one tiny completion, returns the seconds it took.
+
+    Local models map their weights and fill caches on the first call; doing
+    it at startup keeps that out of the first user's question.
+    """
+    started = time.perf_counter()
+    get_llm(provider=provider).invoke("Reply with OK.")
+    return time.perf_counter() - started
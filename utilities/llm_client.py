@@ -0,0 +1,198 @@
+"""
+Process-wide LLM client shared by every chat session.
+
+- one keep-alive httpx connection pool for the remote provider
+- identical prompts in flight at the same time are sent once, callers share the reply
+- at most LOGBOT_LLM_CONCURRENCY calls at a time, rate limits (HTTP 429) retried
+  with jittered exponential backoff, honouring Retry-After
+
+Counters for the Pipeline Latency page are in STATS.
+"""
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+MAX_CONCURRENT = int(os.getenv("LOGBOT_LLM_CONCURRENCY", "4"))
+MAX_CONNECTIONS = 8
+KEEPALIVE_SECONDS = 60.0
+REQUEST_TIMEOUT_SECONDS = 60.0
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 8.0
+
+
+class ClientStats:
+    """Thread-safe counters of the shared client"""
+    FIELDS = ("requests", "connections", "calls", "coalesced", "retries", "rate_limited", "peak_in_flight")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += n
+
+    def enter(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self.counts["peak_in_flight"] = max(self.counts["peak_in_flight"], self._in_flight)
+
+    def leave(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """Counters plus the share of HTTP requests that reused a pooled connection"""
+        with self._lock:
+            counts = dict(self.counts)
+        requests = counts["requests"]
+        counts["reuse_ratio"] = 1 - counts["connections"] / requests if requests else 0.0
+        return counts
+
+
+STATS = ClientStats()
+
+_http = None
+_http_lock = threading.Lock()
+
+
+def _trace(event: str, info: dict) -> None:
+    # httpcore reports every new TCP connection; pooled requests skip this event
+    if event == "connection.connect_tcp.complete":
+        STATS.add("connections")
+
+
+def _on_request(request) -> None:
+    STATS.add("requests")
+    request.extensions["trace"] = _trace
+
+
+def http_client():
+    """The shared keep-alive httpx client, created on first use"""
+    global _http
+    import httpx
+    with _http_lock:
+        if _http is None:
+            _http = httpx.Client(
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS,
+                                    keepalive_expiry=KEEPALIVE_SECONDS),
+                timeout=httpx.Timeout(REQUEST_TIMEOUT_SECONDS, connect=10.0),
+                event_hooks={"request": [_on_request]},
+            )
+    return _http
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked to wait if `error` is a rate limit, None for any other error"""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429 and type(error).__name__ != "RateLimitError":
+        return None
+    try:
+        return float(getattr(response, "headers", {}).get("retry-after"))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Coalescer:
+    """Single flight: concurrent calls with the same key run once and share the outcome"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            STATS.add("coalesced")
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+def _key(prompt: Any) -> str:
+    return prompt if isinstance(prompt, str) else repr(prompt)
+
+
+class SharedLLM:
+    """Chat model wrapper with coalescing, a concurrency limit and rate-limit backoff.
+
+    Exposes the two calls the pipeline uses, invoke and with_structured_output;
+    anything else is passed to the wrapped model.
+    """
+    def __init__(self, model, max_concurrent: int = MAX_CONCURRENT):
+        self.model = model
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._coalescer = Coalescer()
+        self._structured: "weakref.WeakKeyDictionary[Any, _StructuredLLM]" = weakref.WeakKeyDictionary()
+
+    def __getattr__(self, name: str):
+        return getattr(self.model, name)
+
+    def _call(self, runnable, prompt: Any) -> Any:
+        with self._slots:
+            STATS.enter()
+            try:
+                for attempt in range(MAX_RETRIES + 1):
+                    STATS.add("calls")
+                    try:
+                        return runnable.invoke(prompt)
+                    except Exception as e:
+                        wait = retry_after(e)
+                        if wait is None or attempt == MAX_RETRIES:
+                            raise
+                        STATS.add("rate_limited")
+                        STATS.add("retries")
+                        backoff = min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** attempt)
+                        # The slot is held while waiting, fewer calls go out while the provider is throttling
+                        time.sleep(max(wait, backoff * random.uniform(0.5, 1.0)))
+            finally:
+                STATS.leave()
+
+    def run(self, scope: str, runnable, prompt: Any) -> Any:
+        return self._coalescer.run((scope, _key(prompt)), lambda: self._call(runnable, prompt))
+
+    def invoke(self, prompt: Any) -> Any:
+        return self.run("text", self.model, prompt)
+
+    def with_structured_output(self, schema) -> "_StructuredLLM":
+        """Structured runnable per schema object, so calls share it and coalesce; two schemas that only share
+        a name stay apart. A schema given as a dict is neither hashable nor weakly referenced and is not kept"""
+        try:
+            structured = self._structured.get(schema)
+        except TypeError:
+            return _StructuredLLM(self, self.model.with_structured_output(schema))
+        if structured is None:
+            structured = self._structured[schema] = _StructuredLLM(self, self.model.with_structured_output(schema))
+        return structured
+
+
+class _StructuredLLM:
+    def __init__(self, shared: SharedLLM, runnable):
+        self.shared = shared
+        self.runnable = runnable
+
+    def invoke(self, prompt: Any) -> Any:
+        # Coalesces by this object, the runnable of one schema
+        return self.shared.run(self, self.runnable, prompt)
@@ -0,0 +1,180 @@
+"""
+Retention, compaction and statistics maintenance for the log database.
+
+    python -m utilities.maintenance --once --dry-run
+    python -m utilities.maintenance --every-hours 6
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from utilities.catalog import refresh_catalog
+from utilities.db import DB_PATH, LOG_TABLES, connect
+from utilities.dictionary import storage_table
+from utilities.search import ensure_search_index, search_tables
+from utilities.sketches import drop_sketches_before
+
+logger = logging.getLogger("logbot.maintenance")
+
+# Days of data kept per table, None keeps everything
+RETENTION_DAYS: Dict[str, Optional[int]] = {
+    "access_logs": 180,
+    "execution_logs": 180,
+    "vpc_logs": 90,
+}
+
+DELETE_BATCH_SIZE = 5000  # rows per DELETE transaction, keeps write locks short
+BATCH_PAUSE_SECONDS = 0.05  # lets readers and the ingester in between batches
+VACUUM_PAGES_PER_RUN = 20000  # upper bound for one incremental_vacuum pass
+
+# Cheap queries timed after every run to track scan latency over time
+PROBE_QUERIES = {
+    "access_logs_24h": "SELECT COUNT(*) FROM access_logs WHERE timestamp >= ?",
+    "execution_latency_24h": "SELECT AVG(duration_ms) FROM execution_logs WHERE timestamp >= ?",
+    "vpc_rejects_24h": "SELECT COUNT(*) FROM vpc_logs WHERE action = 'REJECT' AND timestamp >= ?",
+}
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _free_bytes(conn: sqlite3.Connection) -> int:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_size * free_pages
+
+
+def enforce_retention(conn: sqlite3.Connection, table: str, days: int,
+                      batch_size: int = DELETE_BATCH_SIZE, dry_run: bool = False) -> int:
+    """Delete rows older than the retention window in bounded batches, returns rows removed"""
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    if dry_run:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE timestamp < ?", (cutoff,)).fetchone()[0]
+
+    deleted = 0
+    while True:
+        cursor = conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN "
+            f"(SELECT rowid FROM {table} WHERE timestamp < ? LIMIT ?)",
+            (cutoff, batch_size),
+        )
+        conn.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return deleted
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """Switch the file to incremental auto-vacuum, needs one full VACUUM the first time; True if it ran"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    logger.info("Switching database to incremental auto_vacuum (one-off full VACUUM)")
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def incremental_vacuum(conn: sqlite3.Connection, max_pages: int = VACUUM_PAGES_PER_RUN) -> int:
+    """Return up to max_pages free pages to the file system, returns bytes reclaimed"""
+    before = _free_bytes(conn)
+    conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+    return before - _free_bytes(conn)
+
+
+def probe_latency(conn: sqlite3.Connection) -> Dict[str, float]:
+    """Time the probe queries, in milliseconds"""
+    since = (datetime.now() - timedelta(days=1)).isoformat()
+    timings = {}
+    for name, query in PROBE_QUERIES.items():
+        start = time.perf_counter()
+        conn.execute(query, (since,)).fetchall()
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+    return timings
+
+
+def run_maintenance(path: str = DB_PATH, retention: Dict[str, Optional[int]] = None,
+                    dry_run: bool = False) -> dict:
+    """Run one maintenance pass: retention, incremental vacuum, ANALYZE and PRAGMA optimize"""
+    retention = RETENTION_DAYS if retention is None else retention
+    size_before = os.path.getsize(path)
+    conn = connect(path)
+    try:
+        deleted = {}
+        for table in LOG_TABLES:
+            days = retention.get(table)
+            stored = storage_table(conn, table)  # rows of an encoded table are deleted from its data table
+            if days is not None and _table_exists(conn, stored):
+                deleted[table] = enforce_retention(conn, stored, days, dry_run=dry_run)
+                if not dry_run:
+                    drop_sketches_before(conn, table, (datetime.now() - timedelta(days=days)).isoformat())
+
+        if not dry_run:
+            vacuumed = enable_incremental_vacuum(conn)
+            incremental_vacuum(conn)
+            # The search index points at rowids, which deletes and a full VACUUM invalidate
+            if (vacuumed or any(deleted.values())) and search_tables(conn):
+                ensure_search_index(conn, rebuild=True)
+            if any(deleted.values()):
+                conn.execute("ANALYZE")
+                refresh_catalog(conn)  # row counts and time ranges in the SQL prompt
+            conn.execute("PRAGMA optimize")
+
+        size_after = os.path.getsize(path)
+        report = {
+            "dry_run": dry_run,
+            "deleted_rows": deleted,
+            "reclaimed_bytes": size_before - size_after,
+            "file_bytes_before": size_before,
+            "file_bytes_after": size_after,
+            "probe_latency_ms": probe_latency(conn),
+        }
+    finally:
+        conn.close()
+
+    logger.info(
+        "Maintenance %s: deleted %s, reclaimed %.1f MB (%.1f MB -> %.1f MB), probe latency %s",
+        "dry run" if dry_run else "done",
+        report["deleted_rows"],
+        report["reclaimed_bytes"] / 2**20,
+        report["file_bytes_before"] / 2**20,
+        report["file_bytes_after"] / 2**20,
+        report["probe_latency_ms"],
+    )
+    return report
+
+
+def run_forever(path: str = DB_PATH, every_hours: float = 6.0) -> None:
+    """Simple scheduler loop, one maintenance pass every `every_hours`"""
+    while True:
+        try:
+            run_maintenance(path)
+        except sqlite3.Error as e:
+            logger.error("Maintenance run failed: %s", e)
+        time.sleep(every_hours * 3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log database maintenance")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--every-hours", type=float, default=6.0)
+    parser.add_argument("--dry-run", action="store_true", help="only count rows outside retention")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.once or args.dry_run:
+        run_maintenance(args.db, dry_run=args.dry_run)
+    else:
+        run_forever(args.db, args.every_hours)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Bounded store for chat results so the session history only keeps references.
+
+The most recently used results stay in memory; older ones are spilled to disk
+(DataFrames as Parquet, figures as Plotly JSON) and loaded back on demand.
+The spill directory is capped at SPILL_BYTES, dropping the least recently
+used results past it, and removed with its store: when the session's state
+is garbage collected, on clear() or at exit. Directories a crashed process
+left behind are swept after STALE_SECONDS.
+"""
+import glob
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import List, Optional
+
+import pandas as pd
+import plotly.io as pio
+
+MEMORY_ENTRIES = 4  # results kept in memory per session
+SPILL_BYTES = int(os.getenv("LOGBOT_RESULT_SPILL_MB", "256")) * 2 ** 20  # disk per session
+SPILL_PREFIX = "logbot_results_"
+STALE_SECONDS = 24 * 3600
+
+
+def sweep_stale(root: Optional[str] = None, max_age: float = STALE_SECONDS) -> None:
+    """Remove spill directories untouched for max_age, left by processes that did not exit cleanly"""
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(root or tempfile.gettempdir(), SPILL_PREFIX + "*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:  # removed by another process meanwhile
+            pass
+
+
+class ResultStore:
+    def __init__(self, capacity: int = MEMORY_ENTRIES, spill_dir: Optional[str] = None,
+                 max_spill_bytes: int = SPILL_BYTES):
+        self.capacity = capacity
+        self.max_spill_bytes = max_spill_bytes
+        if spill_dir is None:
+            sweep_stale()
+            spill_dir = tempfile.mkdtemp(prefix=SPILL_PREFIX)
+        self.spill_dir = spill_dir
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._spilled: "OrderedDict[str, int]" = OrderedDict()  # ref -> bytes on disk, least recently used first
+        # Streamlit has no session end hook: the directory goes when the session state drops the store
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.spill_dir, ignore_errors=True)
+
+    def put(self, df: Optional[pd.DataFrame], figs: Optional[list]) -> str:
+        """Store a result and return the reference to keep in the chat history"""
+        ref = uuid.uuid4().hex
+        self._memory[ref] = {"df": df, "figs": figs}
+        self._evict()
+        return ref
+
+    def get(self, ref: str) -> dict:
+        """Result as {"df", "figs"}, loaded back from disk if it was spilled"""
+        if ref in self._memory:
+            self._memory.move_to_end(ref)
+            return self._memory[ref]
+        if ref in self._spilled:
+            self._spilled.move_to_end(ref)
+        entry = {"df": self._load_df(ref), "figs": self._load_figs(ref)}
+        self._memory[ref] = entry
+        self._evict()
+        return entry
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._spilled.clear()
+        shutil.rmtree(self.spill_dir, ignore_errors=True)  # the finalizer stays armed for later spills
+
+    def spilled_bytes(self) -> int:
+        return sum(self._spilled.values())
+
+    # -- spilling ---------------------------------------------------------
+    def _evict(self) -> None:
+        while len(self._memory) > self.capacity:
+            ref, entry = self._memory.popitem(last=False)
+            self._spill(ref, entry)
+        # Past the disk budget the least recently used results are dropped, their turns show the text only
+        while self._spilled and self.spilled_bytes() > self.max_spill_bytes:
+            ref, _ = self._spilled.popitem(last=False)
+            for path in self._files(ref):
+                os.remove(path)
+
+    def _files(self, ref: str) -> List[str]:
+        return glob.glob(self._path(ref, ".*"))
+
+    def _path(self, ref: str, suffix: str) -> str:
+        return os.path.join(self.spill_dir, f"{ref}{suffix}")
+
+    def _spill(self, ref: str, entry: dict) -> None:
+        os.makedirs(self.spill_dir, exist_ok=True)
+        df = entry["df"]
+        if df is not None and not self._df_spilled(ref):
+            if df.columns.is_unique:
+                df.rename(columns=str).to_parquet(self._path(ref, ".parquet"), index=False)
+            else:  # Parquet needs unique column names, joins can repeat them
+                df.to_pickle(self._path(ref, ".pkl"))
+        for i, fig in enumerate(entry["figs"] or []):
+            fig_path = self._path(ref, f".fig{i}.json")
+            if not os.path.exists(fig_path):
+                with open(fig_path, "w") as f:
+                    f.write(pio.to_json(fig))
+        size = sum(os.path.getsize(path) for path in self._files(ref))
+        if size:
+            self._spilled[ref] = size
+            self._spilled.move_to_end(ref)
+
+    def _df_spilled(self, ref: str) -> bool:
+        return os.path.exists(self._path(ref, ".parquet")) or os.path.exists(self._path(ref, ".pkl"))
+
+    def _load_df(self, ref: str) -> Optional[pd.DataFrame]:
+        if os.path.exists(self._path(ref, ".parquet")):
+            return pd.read_parquet(self._path(ref, ".parquet"), dtype_backend="pyarrow")
+        if os.path.exists(self._path(ref, ".pkl")):
+            return pd.read_pickle(self._path(ref, ".pkl"))
+        return None
+
+    def _load_figs(self, ref: str) -> Optional[List]:
+        figs = []
+        while os.path.exists(self._path(ref, f".fig{len(figs)}.json")):
+            with open(self._path(ref, f".fig{len(figs)}.json")) as f:
+                figs.append(pio.from_json(f.read()))
+        return figs or None
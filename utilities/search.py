@@ -0,0 +1,233 @@
+"""
+Trigram full-text index over the searchable text columns of the log tables.
+
+Each log table gets an external-content FTS5 table, `<table>_search`, that
+indexes the columns below with the trigram tokenizer, so a LIKE pattern
+with three or more literal characters, '%hack%' or '45.227.%', is answered
+from the index instead of a scan of every row. That only pays off when the
+pattern is selective: a trigram shared by most rows ('192.168.1.%' on a
+network that is mostly 192.168.1.x) costs more through the index than a
+scan. rewrite_query therefore looks up the document count of each trigram
+in `search_terms`, written with the index, and only routes selective
+patterns to it:
+
+    endpoint LIKE '%admin%'
+    -> access_logs.rowid IN (SELECT rowid FROM access_logs_search WHERE endpoint LIKE '%admin%')
+
+The index follows the base table's rowids, so it is rebuilt after loads,
+deletes and VACUUM; ingestion and maintenance take care of that. The last
+rowid it covers is kept in `search_state`: rows appended since are added by
+ensure_search_index, and until then rewrite_query leaves that table's LIKE
+filters as scans rather than miss the new rows.
+
+    python -m utilities.search --db logs2.db
+"""
+import argparse
+import os
+import re
+import sqlite3
+import time
+from typing import Optional, Set
+
+from utilities.db import DB_PATH, LOG_TABLES, SHARD_DIR, connect
+from utilities.dictionary import storage_table
+
+SEARCH_COLUMNS = {
+    "access_logs": ("endpoint", "user_id"),
+    "execution_logs": ("function_name",),
+    "vpc_logs": ("src_ip", "dst_ip"),
+}
+COLUMN_TABLES = {column: table for table, columns in SEARCH_COLUMNS.items() for column in columns}
+TERMS_TABLE = "search_terms"
+STATE_TABLE = "search_state"  # last base table rowid each search table covers
+# Use the index when the pattern's rarest trigram is in at most this share of the rows
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+MAX_SELECTIVITY = float(os.getenv("LOGBOT_SEARCH_MAX_SELECTIVITY", "0.03"))
+
+# `[alias.]column LIKE 'pattern'` on a searchable column; NOT LIKE, ESCAPE and wrapped columns are left alone,
+# and so is a negated filter (see _negated)
+LIKE_FILTER = re.compile(
+    r"(?<![\w.])(?:(\w+)\.)?(" + "|".join(COLUMN_TABLES) + r")\s+LIKE\s+'((?:[^']|'')*)'(?!\s*ESCAPE)",
+    re.IGNORECASE,
+)
+
+PROMPT_HINT = """
+    endpoint, user_id, function_name, src_ip and dst_ip have a trigram index that serves `column LIKE '...'`
+    filters with at least three literal characters. Write partial matches as a plain LIKE on the column (LIKE is
+    already case-insensitive), e.g. src_ip LIKE '10.0.0.%' or user_id LIKE '%admin%', not LOWER(), SUBSTR() or INSTR().
+"""
+
+
+def search_table(table: str) -> str:
+    return f"{table}_search"
+
+
+def _names(conn: sqlite3.Connection) -> Set[str]:
+    """Tables and views; a dictionary-encoded log table is a view, which the search table reads through"""
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+
+
+def search_tables(conn: sqlite3.Connection) -> Set[str]:
+    """Search tables, their FTS5 shadow tables, term counts and state, none of use to the SQL prompt"""
+    prefixes = tuple(search_table(table) for table in LOG_TABLES) + (TERMS_TABLE, STATE_TABLE)
+    return {name for name in _names(conn) if name.startswith(prefixes)}
+
+
+def _write_terms(conn: sqlite3.Connection, table: str) -> None:
+    """Documents per trigram and column; the index's own vocab table reads every posting list to tell"""
+    vocab = f"temp.{search_table(table)}_vocab"
+    conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {vocab} USING fts5vocab(main, {search_table(table)}, 'col')")
+    conn.execute(f"DELETE FROM {TERMS_TABLE} WHERE table_name = ?", (table,))
+    conn.execute(f"INSERT INTO {TERMS_TABLE} SELECT ?, col, term, doc FROM {vocab}", (table,))
+    conn.execute(f"DROP TABLE {vocab}")
+
+
+def _max_rowid(conn: sqlite3.Connection, table: str) -> int:
+    """Last rowid of a log table, read from its data table when dictionary-encoded"""
+    return conn.execute(f"SELECT MAX(rowid) FROM {storage_table(conn, table)}").fetchone()[0] or 0
+
+
+def indexed_rowid(conn: sqlite3.Connection, table: str) -> Optional[int]:
+    """Last rowid the table's search index covers, None when unknown"""
+    try:
+        row = conn.execute(f"SELECT max_rowid FROM {STATE_TABLE} WHERE table_name = ?", (table,)).fetchone()
+    except sqlite3.OperationalError:  # index built before the state was kept
+        return None
+    return row[0] if row else None
+
+
+def _mark(conn: sqlite3.Connection, table: str, max_rowid: int) -> None:
+    conn.execute(f"INSERT OR REPLACE INTO {STATE_TABLE} VALUES (?, ?)", (table, max_rowid))
+
+
+def ensure_search_index(conn: sqlite3.Connection, rebuild: bool = False) -> None:
+    """Create the search table of each log table present: new ones, or all with rebuild, are (re)filled,
+    the others catch up on rows appended since"""
+    present = _names(conn)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {TERMS_TABLE} (table_name TEXT, column_name TEXT, term TEXT, "
+                 "docs INTEGER, PRIMARY KEY (table_name, column_name, term)) WITHOUT ROWID")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} (table_name TEXT PRIMARY KEY, max_rowid INTEGER)")
+    for table, columns in SEARCH_COLUMNS.items():
+        if table not in present:
+            continue
+        name = search_table(table)
+        max_rowid = _max_rowid(conn, table)
+        covered = indexed_rowid(conn, table)
+        if name in present and not rebuild and covered is not None:
+            if max_rowid > covered:  # term counts stay as they are, they only steer the index-or-scan choice
+                conn.execute(f"INSERT INTO {name}(rowid, {', '.join(columns)}) "
+                             f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE rowid > ?", (covered,))
+                _mark(conn, table, max_rowid)
+            continue
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({', '.join(columns)}, "
+                     f"content='{table}', content_rowid='rowid', tokenize='trigram')")
+        conn.execute(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+        _write_terms(conn, table)
+        _mark(conn, table, max_rowid)
+    conn.commit()
+
+
+def index_current(conn: sqlite3.Connection, table: str) -> bool:
+    """Whether the table's search index covers exactly its rows up to the last rowid"""
+    covered = indexed_rowid(conn, table)
+    return covered is not None and covered == _max_rowid(conn, table)
+
+
+def search_enabled(path: str = DB_PATH) -> bool:
+    """Whether the database has the search index, checked per question as maintenance may rebuild or drop it;
+    shards are queried through views, which have none"""
+    if SHARD_DIR or not os.path.exists(path):
+        return False
+    conn = connect(path, read_only=True)
+    try:
+        return TERMS_TABLE in _names(conn)
+    finally:
+        conn.close()
+
+
+def trigrams(pattern: str) -> Set[str]:
+    """Trigrams the index can look up for a LIKE pattern, from its runs of literal characters"""
+    runs = re.split(r"[%_]", pattern.lower())
+    return {run[i:i + 3] for run in runs for i in range(len(run) - 2)}
+
+
+def selective(conn: sqlite3.Connection, table: str, column: str, pattern: str) -> bool:
+    """Whether the index beats a scan: some trigram of the pattern is in few enough rows"""
+    grams = trigrams(pattern)
+    if not grams:
+        return False  # shorter than a trigram, the index would scan too
+    rows = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+    docs = dict(conn.execute(
+        f"SELECT term, docs FROM {TERMS_TABLE} WHERE table_name = ? AND column_name = ? "
+        f"AND term IN ({', '.join('?' * len(grams))})", (table, column, *grams)).fetchall())
+    return min(docs.get(gram, 0) for gram in grams) <= rows * MAX_SELECTIVITY
+
+
+def search_condition(table: str, column: str, pattern: str, alias: Optional[str] = None) -> str:
+    """WHERE condition for `column LIKE pattern` answered from the search index"""
+    literal = "'" + pattern.replace("'", "''") + "'"
+    return f"{alias or table}.rowid IN (SELECT rowid FROM {search_table(table)} WHERE {column} LIKE {literal})"
+
+
+def _negated(query: str, start: int) -> bool:
+    """Whether a NOT applies to the filter at start, directly or to a parenthesised group around it.
+    The index lookup is false, not NULL, on a NULL column, so `NOT rowid IN (...)` would keep rows that
+    `NOT column LIKE` drops"""
+    query = STRING_LITERAL.sub(lambda m: "'" + " " * (len(m.group(0)) - 2) + "'", query)  # parens in literals
+    position, depth = start, 0
+    while position >= 0:
+        if re.search(r"\bNOT\s*$", query[:position], re.IGNORECASE):
+            return True
+        for position in range(position - 1, -2, -1):  # the group's opening parenthesis, -1 at the top level
+            if position < 0 or query[position] == "(" and depth == 0:
+                break
+            depth += {")": 1, "(": -1}.get(query[position], 0)
+    return False
+
+
+def rewrite_query(conn: sqlite3.Connection, query: str) -> str:
+    """The query with its selective LIKE filters served by the search index, unchanged when there is none
+    or the index is behind its table"""
+    if not LIKE_FILTER.search(query) or TERMS_TABLE not in _names(conn):
+        return query
+    current = {}
+
+    def replace(m) -> str:
+        alias, column, pattern = m.group(1), m.group(2).lower(), m.group(3).replace("''", "'")
+        table = COLUMN_TABLES[column]
+        if _negated(query, m.start()):
+            return m.group(0)
+        if table not in current:
+            current[table] = index_current(conn, table)
+        if not current[table] or not selective(conn, table, column, pattern):
+            return m.group(0)
+        return search_condition(table, column, pattern, alias)
+
+    rewritten = LIKE_FILTER.sub(replace, query)
+    if rewritten == query:
+        return query
+    try:  # an alias of a subquery or CTE has no rowid, keep the scan then
+        conn.execute("EXPLAIN " + rewritten).fetchall()
+    except sqlite3.Error:
+        return query
+    return rewritten
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Build the trigram search index of a log database")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    size_before = os.path.getsize(args.db)
+    conn = connect(args.db)
+    try:
+        ensure_search_index(conn, rebuild=True)
+    finally:
+        conn.close()
+    print(f"✅ Search index rebuilt on '{args.db}' in {time.perf_counter() - started:.1f}s "
+          f"(+{(os.path.getsize(args.db) - size_before) / 2 ** 20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
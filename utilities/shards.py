@@ -0,0 +1,246 @@
+"""
+Sharded storage: one SQLite file per day (or week) of logs.
+
+Ingestion only ever locks the shard it writes to, and a query only touches
+the shards overlapping its time window, either through ATTACH + TEMP views
+(existing SQL runs unchanged) or through the parallel fan-out executor.
+LLM generated SQL whose window cannot be read off its timestamp filters, or
+spans more shards than one connection can attach, runs on a temporary copy
+of the shards it needs, gathered a few ATTACHes at a time.
+"""
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from utilities.cidr import ensure_ip_columns, ensure_ip_indexes, with_ip_columns
+from utilities.db import LOG_COLUMNS, LOG_TABLES, connect
+from utilities.trail import ensure_trail_indexes
+
+GRANULARITIES = {"day": timedelta(days=1), "week": timedelta(days=7)}
+SHARD_FILE = re.compile(r"^logs_(day|week)_(\d{4}-\d{2}-\d{2})\.db$")
+DATE_LITERAL = re.compile(r"\d{4}-\d{2}-\d{2}")
+# `[alias.]timestamp` or `date([alias.]timestamp)` compared with a quoted date or timestamp literal
+_TIMESTAMP = r"(?:\bdate\s*\(\s*(?:\w+\.)?timestamp\s*\)|(?:\b\w+\.)?\btimestamp\b)"
+_LITERAL = r"'(\d{4}-\d{2}-\d{2})[^']*'"
+TIMESTAMP_COMPARISON = re.compile(_TIMESTAMP + r"\s*(>=|<=|>|<|=|LIKE)\s*" + _LITERAL, re.IGNORECASE)
+TIMESTAMP_BETWEEN = re.compile(_TIMESTAMP + r"\s+BETWEEN\s+" + _LITERAL + r"\s+AND\s+" + _LITERAL, re.IGNORECASE)
+FAN_OUT_WORKERS = 8
+
+
+class ShardWindowTooLarge(ValueError):
+    """The window needs more shards than SQLite can ATTACH to one connection"""
+
+
+def shard_path(shard_dir: str, start: datetime, granularity: str = "day") -> str:
+    return os.path.join(shard_dir, f"logs_{granularity}_{start:%Y-%m-%d}.db")
+
+
+def list_shards(shard_dir: str) -> List[Tuple[datetime, datetime, str]]:
+    """All shards in shard_dir as (start, end, path), sorted by start"""
+    if not os.path.isdir(shard_dir):
+        return []
+    shards = []
+    for name in os.listdir(shard_dir):
+        match = SHARD_FILE.match(name)
+        if match:
+            start = datetime.strptime(match.group(2), "%Y-%m-%d")
+            shards.append((start, start + GRANULARITIES[match.group(1)], os.path.join(shard_dir, name)))
+    return sorted(shards)
+
+
+def shards_for_window(shard_dir: str, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+    """Paths of the shards overlapping [start, end], open ends match everything"""
+    lo = datetime.fromisoformat(start) if start else datetime.min
+    hi = datetime.fromisoformat(end) if end else datetime.max
+    return [path for s, e, path in list_shards(shard_dir) if s <= hi and e > lo]
+
+
+# ==============================================
+# INGESTION
+# ==============================================
+def write_shards(frames: Dict[str, pd.DataFrame], shard_dir: str, granularity: str = "day") -> List[str]:
+    """Split each table by shard period and append it to the matching shard files"""
+    os.makedirs(shard_dir, exist_ok=True)
+    written = set()
+    for table, df in with_ip_columns(frames).items():
+        ts = pd.to_datetime(df["timestamp"], format="ISO8601")
+        starts = ts.dt.floor("D")
+        if granularity == "week":  # weeks start on Monday
+            starts = starts - pd.to_timedelta(starts.dt.weekday, unit="D")
+        for start, part in df.groupby(starts):
+            path = shard_path(shard_dir, start.to_pydatetime(), granularity)
+            conn = sqlite3.connect(path, timeout=30)
+            try:
+                if table == "vpc_logs":
+                    ensure_ip_columns(conn)  # shards written before the integer IP columns
+                part.to_sql(table, conn, if_exists="append", index=False)
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table}(timestamp)")
+                ensure_trail_indexes(conn)
+                if table == "vpc_logs":
+                    ensure_ip_indexes(conn)
+            finally:
+                conn.close()
+            written.add(path)
+    return sorted(written)
+
+
+# ==============================================
+# ATTACH ROUTER
+# ==============================================
+def _tables_in(conn: sqlite3.Connection, schema: str) -> set:
+    rows = conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'").fetchall()
+    return {row[0] for row in rows}
+
+
+def _attach(conn: sqlite3.Connection, path: str, alias: str) -> Dict[str, List[str]]:
+    """ATTACH a shard read-only; the columns of each log table it has"""
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{path}?mode=ro",))
+    present = _tables_in(conn, alias)
+    return {table: [row[1] for row in conn.execute(f"PRAGMA {alias}.table_info({table})")]
+            for table in LOG_TABLES if table in present}
+
+
+def _common_columns(columns: List[List[str]]) -> List[str]:
+    """Columns every shard has, older shards may lack later additions such as the integer IPs"""
+    return [c for c in columns[0] if all(c in other for other in columns)]
+
+
+def attach_shards(conn: sqlite3.Connection, paths: Sequence[str]) -> None:
+    """ATTACH the shards and expose each log table as a TEMP view over all of them"""
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(paths) > limit:
+        raise ShardWindowTooLarge(
+            f"The selected time range spans {len(paths)} shards but SQLite can only attach {limit}; "
+            "pick a shorter range or use weekly shards"
+        )
+
+    parts = {table: [] for table in LOG_TABLES}
+    for i, path in enumerate(paths):
+        alias = f"shard_{i}"
+        for table, columns in _attach(conn, path, alias).items():
+            parts[table].append((alias, columns))
+
+    for table, shards in parts.items():
+        if shards:
+            select = ", ".join(_common_columns([columns for _, columns in shards]))
+            conn.execute(f"CREATE TEMP VIEW {table} AS " +
+                         " UNION ALL ".join(f"SELECT {select} FROM {alias}.{table}" for alias, _ in shards))
+        else:  # no data in the window, queries still see an empty table
+            conn.execute(f"CREATE TEMP TABLE {table} ({', '.join(LOG_COLUMNS[table])})")
+
+
+def gather_shards(paths: Sequence[str]) -> sqlite3.Connection:
+    """Connection to a private temporary database holding the log tables of all the shards, for windows
+    over the ATTACH limit; copied a batch of ATTACHes at a time, the copy spills to disk when large"""
+    conn = sqlite3.connect("", check_same_thread=False)
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    batches = [paths[i:i + limit] for i in range(0, len(paths), limit)]
+    columns: Dict[str, List[List[str]]] = {table: [] for table in LOG_TABLES}
+    for batch in batches:  # first pass: the columns all shards share
+        for i, path in enumerate(batch):
+            for table, found in _attach(conn, path, f"shard_{i}").items():
+                columns[table].append(found)
+        for i in range(len(batch)):
+            conn.execute(f"DETACH DATABASE shard_{i}")
+
+    common = {table: _common_columns(found) if found else list(LOG_COLUMNS[table])
+              for table, found in columns.items()}
+    for table, names in common.items():
+        conn.execute(f"CREATE TABLE {table} ({', '.join(names)})")
+    for batch in batches:
+        for i, path in enumerate(batch):
+            alias = f"shard_{i}"
+            for table in _attach(conn, path, alias):
+                select = ", ".join(common[table])
+                conn.execute(f"INSERT INTO {table} ({select}) SELECT {select} FROM {alias}.{table}")
+        conn.commit()
+        for i in range(len(batch)):
+            conn.execute(f"DETACH DATABASE shard_{i}")
+    return conn
+
+
+def connect_window(shard_dir: str, start: Optional[str] = None, end: Optional[str] = None) -> sqlite3.Connection:
+    """Connection where the log tables cover exactly the shards overlapping the window"""
+    conn = sqlite3.connect("file::memory:", uri=True, check_same_thread=False)
+    attach_shards(conn, shards_for_window(shard_dir, start, end))
+    return conn
+
+
+def window_from_sql(query: str) -> Tuple[Optional[str], Optional[str]]:
+    """Time window a generated query provably stays in, None for a side its filters leave open.
+
+    Only a single SELECT whose date literals all sit in ANDed timestamp comparisons is bounded, by
+    day: `timestamp >= '2025-05-01'` is open above, `timestamp < '2025-05-01'` open below. ORs,
+    subqueries and dates anywhere else give no bounds at all, as do queries without dates.
+    """
+    literals = len(DATE_LITERAL.findall(query))
+    if (not literals or re.search(r"\bOR\b", query, re.IGNORECASE)
+            or len(re.findall(r"\bSELECT\b", query, re.IGNORECASE)) > 1):
+        return None, None
+    lows, highs, placed = [], [], 0
+    for m in TIMESTAMP_BETWEEN.finditer(query):
+        lows.append(m.group(1))
+        highs.append(m.group(2))
+        placed += 2
+    for m in TIMESTAMP_COMPARISON.finditer(TIMESTAMP_BETWEEN.sub(" ", query)):
+        operator, date = m.group(1).upper(), m.group(2)
+        if operator in (">=", ">", "=", "LIKE"):
+            lows.append(date)
+        if operator in ("<=", "<", "=", "LIKE"):
+            highs.append(date)
+        placed += 1
+    if placed != literals:  # a date the window cannot account for, e.g. in a CASE or a function call
+        return None, None
+    return (max(lows) if lows else None), (f"{min(highs)}T23:59:59.999999" if highs else None)
+
+
+def connect_for_query(shard_dir: str, query: str) -> sqlite3.Connection:
+    """Router for LLM generated SQL: attaches the shards its window can touch, or gathers them into a
+    temporary database when there are more than one connection can attach"""
+    paths = shards_for_window(shard_dir, *window_from_sql(query))
+    conn = sqlite3.connect("file::memory:", uri=True, check_same_thread=False)
+    if len(paths) <= conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+        attach_shards(conn, paths)
+        return conn
+    conn.close()
+    return gather_shards(paths)
+
+
+# ==============================================
+# FAN-OUT EXECUTOR
+# ==============================================
+def _query_shard(path: str, query: str, params: tuple) -> pd.DataFrame:
+    conn = connect(path, read_only=True)
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+
+def fan_out(shard_dir: str, query: str, params: tuple = (), start: Optional[str] = None,
+            end: Optional[str] = None, max_workers: int = FAN_OUT_WORKERS) -> List[pd.DataFrame]:
+    """Run the same query on every overlapping shard in parallel, one frame per shard"""
+    paths = shards_for_window(shard_dir, start, end)
+    if not paths:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+        return list(pool.map(lambda path: _query_shard(path, query, params), paths))
+
+
+def merge_aggregates(frames: List[pd.DataFrame], group_by: Sequence[str] = (),
+                     sums: Sequence[str] = (), mins: Sequence[str] = (),
+                     maxs: Sequence[str] = ()) -> pd.DataFrame:
+    """Combine per-shard partial aggregates; averages and ratios are derived from merged sums"""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=[*group_by, *sums, *mins, *maxs])
+    combined = pd.concat(frames, ignore_index=True)
+    agg = {**{c: "sum" for c in sums}, **{c: "min" for c in mins}, **{c: "max" for c in maxs}}
+    if not group_by:
+        return combined.agg(agg).to_frame().T
+    return combined.groupby(list(group_by), as_index=False).agg(agg)
@@ -0,0 +1,507 @@
+"""
+Mergeable cardinality and frequency sketches, built per hour at ingest.
+
+- HyperLogLog (distinct users / IPs): relative standard error 1.04 / sqrt(2**p),
+  about 1.6% with p = 12; merging takes the register-wise max, so any window
+  costs one pass over its hourly registers.
+- Count-Min (count of one user / IP): overestimates by at most EPSILON * N with
+  probability 1 - DELTA, never underestimates.
+- Top-K summary (top users / IPs): the exact top TOP_K of each hour plus the
+  largest count left out ("floor"). Merged counts are upper bounds and
+  count - error is a lower bound, so the true count lies in [count - error, count];
+  error <= N / TOP_K for every item.
+- Latency digest (execution_logs.duration_ms, overall and per function and
+  endpoint): log-spaced histogram, every quantile is within DIGEST_ACCURACY
+  (1%) relative error of a true sample value; merging adds bucket counts.
+
+Windows are resolved to whole hours, rows at the edges of a window may be
+counted in or out by up to one bucket. Dashboards fall back to exact SQL when
+the sketch table is missing or exact mode is asked for.
+
+    python -m utilities.sketches --db logs2.db   # (re)build for an existing database
+"""
+import argparse
+import json
+import math
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.cidr import register_ip_functions
+from utilities.db import DB_PATH, connect
+
+SKETCH_TABLE = "log_sketches"
+SKETCH_BUCKET_SECONDS = 3_600
+HLL_PRECISION = 12
+EPSILON, DELTA = 0.01, 0.01
+TOP_K = 100
+DIGEST_ACCURACY = 0.01
+
+# (table, column) pairs sketched at ingest
+SKETCHED_COLUMNS = (("access_logs", "user_id"), ("vpc_logs", "src_ip"))
+# Latency digests: overall, and per value of these dimensions
+LATENCY_SOURCE = "execution_logs.duration_ms"
+LATENCY_DIMENSIONS = ("function_name", "endpoint")
+
+_HASH_KEYS = [f"logbot-sketch-{i:02d}" for i in range(16)]  # 16 chars each, one per Count-Min row
+
+
+def _hash(values: np.ndarray, row: int = 0) -> np.ndarray:
+    """Stable 64-bit hashes of the string form of the values"""
+    return pd.util.hash_array(values.astype(str).astype(object), hash_key=_HASH_KEYS[row], categorize=True)
+
+
+def _pack(array: np.ndarray) -> bytes:
+    """Dense bytes, or (flat index, value) pairs when most cells are zero as in quiet hours"""
+    nonzero = np.flatnonzero(array)
+    if len(nonzero) * (4 + array.itemsize) < array.nbytes:
+        return b"S" + np.uint32(len(nonzero)).tobytes() + nonzero.astype(np.uint32).tobytes() + array.ravel()[nonzero].tobytes()
+    return b"D" + array.tobytes()
+
+
+def _unpack(data: bytes, dtype, shape) -> np.ndarray:
+    if data[:1] == b"D":
+        return np.frombuffer(data[1:], dtype=dtype).reshape(shape).copy()
+    n = int(np.frombuffer(data[1:5], dtype=np.uint32)[0])
+    array = np.zeros(int(np.prod(shape)), dtype=dtype)
+    array[np.frombuffer(data[5:5 + 4 * n], dtype=np.uint32)] = np.frombuffer(data[5 + 4 * n:], dtype=dtype)
+    return array.reshape(shape)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Bit length of uint64 values, exact (split in halves to stay within float64 precision)"""
+    hi, lo = (x >> np.uint64(32)).astype(np.float64), (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+# ==============================================
+# HYPERLOGLOG
+# ==============================================
+class HyperLogLog:
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[np.ndarray] = None):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, values: np.ndarray) -> "HyperLogLog":
+        if len(values):
+            h = _hash(values)
+            index = (h >> np.uint64(64 - self.p)).astype(np.int64)
+            rest = h & np.uint64((1 << (64 - self.p)) - 1)
+            rank = ((64 - self.p) - _bit_length(rest) + 1).astype(np.uint8)
+            np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @classmethod
+    def merge_all(cls, sketches: List["HyperLogLog"]) -> "HyperLogLog":
+        return cls(sketches[0].p, np.max([s.registers for s in sketches], axis=0))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:  # small-range correction: linear counting
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return np.uint8(self.p).tobytes() + _pack(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        p = data[0]
+        return cls(p, _unpack(data[1:], np.uint8, (1 << p,)))
+
+
+# ==============================================
+# COUNT-MIN
+# ==============================================
+class CountMin:
+    def __init__(self, epsilon: float = EPSILON, delta: float = DELTA, table: Optional[np.ndarray] = None):
+        width, depth = math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta))
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.int64)
+
+    def _columns(self, values: np.ndarray) -> List[np.ndarray]:
+        width = np.uint64(self.table.shape[1])
+        return [(_hash(values, row) % width).astype(np.int64) for row in range(self.table.shape[0])]
+
+    def add(self, values: np.ndarray) -> "CountMin":
+        if len(values):
+            for row, columns in enumerate(self._columns(values)):
+                self.table[row] += np.bincount(columns, minlength=self.table.shape[1])
+        return self
+
+    def merge(self, other: "CountMin") -> "CountMin":
+        self.table += other.table
+        return self
+
+    @classmethod
+    def merge_all(cls, sketches: List["CountMin"]) -> "CountMin":
+        return cls(table=np.sum([s.table for s in sketches], axis=0))  # a new sketch, the inputs stay as they are
+
+    def estimate(self, value) -> int:
+        columns = self._columns(np.array([value], dtype=object))
+        return int(min(self.table[row, col[0]] for row, col in enumerate(columns)))
+
+    def to_bytes(self) -> bytes:
+        return np.asarray(self.table.shape, dtype=np.int64).tobytes() + _pack(self.table)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMin":
+        depth, width = (int(n) for n in np.frombuffer(data[:16], dtype=np.int64))
+        return cls(math.e / width, math.exp(-depth), _unpack(data[16:], np.int64, (depth, width)))
+
+
+# ==============================================
+# TOP-K SUMMARY
+# ==============================================
+class TopK:
+    def __init__(self, k: int = TOP_K, counts: Optional[Dict[str, int]] = None,
+                 errors: Optional[Dict[str, int]] = None, floor: int = 0):
+        self.k = k
+        self.counts = counts or {}
+        self.errors = errors or {}
+        self.floor = floor  # upper bound for the count of any item not kept
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, k: int = TOP_K) -> "TopK":
+        counts = pd.Series(values).dropna().astype(str).value_counts()
+        floor = int(counts.iloc[k]) if len(counts) > k else 0
+        return cls(k, {key: int(n) for key, n in counts.iloc[:k].items()}, {}, floor)
+
+    def merge(self, other: "TopK") -> "TopK":
+        return TopK.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, summaries: List["TopK"]) -> "TopK":
+        """n-way merge, truncated to k once at the end so errors do not compound"""
+        k = summaries[0].k
+        keys, counts, errors, floors = [], [], [], []
+        for s in summaries:
+            keys.extend(s.counts)
+            counts.extend(s.counts.values())
+            errors.extend(s.errors.get(key, 0) for key in s.counts)
+            floors.extend([s.floor] * len(s.counts))
+        total_floor = sum(s.floor for s in summaries)
+        if not keys:
+            return cls(k, floor=total_floor)
+        kept = pd.DataFrame({"count": counts, "error": errors, "floor": floors}, index=keys).groupby(level=0).sum()
+        # An item missing from a summary counted at most that summary's floor there
+        missing_floor = total_floor - kept["floor"]
+        kept["count"] += missing_floor
+        kept["error"] += missing_floor
+        kept = kept.sort_values("count", ascending=False, kind="stable")
+        dropped = int(kept["count"].iloc[k]) if len(kept) > k else 0
+        kept = kept.iloc[:k]
+        return cls(k, {str(key): int(n) for key, n in kept["count"].items()},
+                   {str(key): int(n) for key, n in kept["error"].items()}, max(total_floor, dropped))
+
+    def top(self, limit: int = 10) -> pd.DataFrame:
+        """Most frequent items with upper-bound count and its maximum overestimate"""
+        rows = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return pd.DataFrame(
+            [(key, count, self.errors.get(key, 0)) for key, count in rows],
+            columns=["item", "count", "error"],
+        )
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({"k": self.k, "floor": self.floor, "counts": self.counts, "errors": self.errors}).encode()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TopK":
+        state = json.loads(data)
+        return cls(state["k"], state["counts"], state["errors"], state["floor"])
+
+
+# ==============================================
+# LATENCY DIGEST
+# ==============================================
+class LatencyDigest:
+    """Counts per log-spaced bucket: bucket i holds (gamma**(i-1), gamma**i]"""
+
+    def __init__(self, accuracy: float = DIGEST_ACCURACY, offset: int = 0,
+                 counts: Optional[np.ndarray] = None, zeros: int = 0):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.offset = offset  # bucket index of counts[0]
+        self.counts = counts if counts is not None else np.zeros(0, dtype=np.int64)
+        self.zeros = zeros  # values <= 0
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum()) + self.zeros
+
+    def _grow(self, lo: int, hi: int) -> None:
+        if not len(self.counts):
+            self.offset, self.counts = lo, np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        new_lo, new_hi = min(lo, self.offset), max(hi, self.offset + len(self.counts) - 1)
+        if new_lo < self.offset or new_hi >= self.offset + len(self.counts):
+            grown = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+            grown[self.offset - new_lo:self.offset - new_lo + len(self.counts)] = self.counts
+            self.offset, self.counts = new_lo, grown
+
+    def add(self, values: np.ndarray) -> "LatencyDigest":
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        self.zeros += len(values) - len(positive)
+        if len(positive):
+            index = np.ceil(np.log(positive) / np.log(self.gamma)).astype(np.int64)
+            lo, hi = int(index.min()), int(index.max())
+            self._grow(lo, hi)
+            self.counts += np.bincount(index - self.offset, minlength=len(self.counts))
+        return self
+
+    def merge(self, other: "LatencyDigest") -> "LatencyDigest":
+        return LatencyDigest.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, digests: List["LatencyDigest"]) -> "LatencyDigest":
+        merged = cls(digests[0].accuracy)
+        filled = [d for d in digests if len(d.counts)]
+        merged.zeros = sum(d.zeros for d in digests)
+        if filled:
+            merged._grow(min(d.offset for d in filled), max(d.offset + len(d.counts) - 1 for d in filled))
+            for d in filled:
+                merged.counts[d.offset - merged.offset:d.offset - merged.offset + len(d.counts)] += d.counts
+        return merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0..1), None when empty"""
+        n = self.count
+        if not n:
+            return None
+        rank = q * (n - 1)
+        if rank < self.zeros:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.counts), rank - self.zeros, side="right"))
+        bucket = self.offset + min(i, len(self.counts) - 1)
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def to_bytes(self) -> bytes:
+        header = np.array([self.offset, self.zeros, len(self.counts)], dtype=np.int64).tobytes()
+        return np.float64(self.accuracy).tobytes() + header + _pack(self.counts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LatencyDigest":
+        accuracy = float(np.frombuffer(data[:8], dtype=np.float64)[0])
+        offset, zeros, size = (int(n) for n in np.frombuffer(data[8:32], dtype=np.int64))
+        return cls(accuracy, offset, _unpack(data[32:], np.int64, (size,)), zeros)
+
+
+class Percentile:
+    """SQL aggregate PERCENTILE(value, p) with p in 0..100, approximate (within 1%) as backed by a LatencyDigest"""
+
+    BATCH = 10_000
+
+    def __init__(self):
+        self.digest = LatencyDigest()
+        self.buffer: List[float] = []
+        self.p = None
+
+    def step(self, value, p) -> None:
+        self.p = p
+        if value is not None:
+            self.buffer.append(value)
+            if len(self.buffer) >= self.BATCH:
+                self.digest.add(np.array(self.buffer, dtype=np.float64))
+                self.buffer.clear()
+
+    def finalize(self):
+        self.digest.add(np.array(self.buffer, dtype=np.float64))
+        return self.digest.quantile(min(max(float(self.p or 0), 0.0), 100.0) / 100)
+
+
+def register_sql_functions(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Make PERCENTILE(value, p) and the IP/CIDR functions of utilities.cidr available on a connection"""
+    conn.create_aggregate("percentile", 2, Percentile)
+    return register_ip_functions(conn)
+
+
+SKETCH_KINDS = {"hll": HyperLogLog, "cms": CountMin, "topk": TopK, "digest": LatencyDigest}
+
+
+# ==============================================
+# STORAGE
+# ==============================================
+def _epoch(timestamp: str) -> int:
+    return int(datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp())
+
+
+def ensure_sketch_table(conn: sqlite3.Connection) -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SKETCH_TABLE} (
+            bucket INTEGER,
+            source TEXT,
+            kind TEXT,
+            rows INTEGER,
+            data BLOB,
+            PRIMARY KEY (source, kind, bucket)
+        )
+    """)
+
+
+def sketches_available(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SKETCH_TABLE,)
+    ).fetchone() is not None
+
+
+def _buckets(timestamps: pd.Series, bucket_seconds: int = SKETCH_BUCKET_SECONDS) -> np.ndarray:
+    epoch = (pd.to_datetime(timestamps, format="ISO8601") - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    return (epoch // bucket_seconds * bucket_seconds).to_numpy()
+
+
+def build_sketches(df: pd.DataFrame, column: str, bucket_seconds: int = SKETCH_BUCKET_SECONDS) -> Iterable[Tuple]:
+    """(bucket, kind, rows, blob) for every hourly bucket of a log frame"""
+    buckets = _buckets(df["timestamp"], bucket_seconds)
+    values = df[column].to_numpy()
+    order = np.argsort(buckets, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(buckets[order]) != 0])
+    for chunk in np.split(order, starts[1:]):
+        bucket, chunk_values = int(buckets[chunk[0]]), values[chunk]
+        yield bucket, "hll", len(chunk), HyperLogLog().add(chunk_values).to_bytes()
+        yield bucket, "cms", len(chunk), CountMin().add(chunk_values).to_bytes()
+        yield bucket, "topk", len(chunk), TopK.from_values(chunk_values).to_bytes()
+
+
+def build_digests(execution: pd.DataFrame, access: Optional[pd.DataFrame] = None,
+                  bucket_seconds: int = SKETCH_BUCKET_SECONDS) -> Iterable[Tuple]:
+    """(bucket, source, rows, blob) hourly latency digests: overall, per function and per endpoint"""
+    df = execution[["timestamp", "duration_ms", "function_name", "request_id"]]
+    if access is not None and "endpoint" in access:
+        endpoints = access[["request_id", "endpoint"]].drop_duplicates("request_id")
+        df = df.merge(endpoints, on="request_id", how="left")
+    df = df.assign(bucket=_buckets(df["timestamp"], bucket_seconds))
+    parts = [df[["bucket", "duration_ms"]].assign(source=LATENCY_SOURCE)]
+    for dimension in LATENCY_DIMENSIONS:
+        if dimension in df:
+            rows = df.dropna(subset=[dimension])
+            parts.append(rows[["bucket", "duration_ms"]].assign(
+                source=f"{LATENCY_SOURCE}|{dimension}=" + rows[dimension].astype(str)))
+    for (bucket, source), group in pd.concat(parts).groupby(["bucket", "source"], sort=False):
+        yield int(bucket), source, len(group), LatencyDigest().add(group["duration_ms"].to_numpy()).to_bytes()
+
+
+def write_sketches(conn: sqlite3.Connection, frames: Dict[str, pd.DataFrame], append: bool = False) -> int:
+    """Write the sketches of every bucket in the frames, returns rows written.
+
+    With append the new rows are merged into the stored sketch of their bucket,
+    otherwise the bucket's sketch is replaced (the tables were reloaded).
+    """
+    ensure_sketch_table(conn)
+    rows = []
+    for table, column in SKETCHED_COLUMNS:
+        if table in frames and not frames[table].empty:
+            source = f"{table}.{column}"
+            rows.extend((bucket, source, kind, n, blob) for bucket, kind, n, blob in build_sketches(frames[table], column))
+    if "execution_logs" in frames and not frames["execution_logs"].empty:
+        rows.extend((bucket, source, "digest", n, blob)
+                    for bucket, source, n, blob in build_digests(frames["execution_logs"], frames.get("access_logs")))
+
+    if append:
+        for i, (bucket, source, kind, n, blob) in enumerate(rows):
+            stored = conn.execute(
+                f"SELECT rows, data FROM {SKETCH_TABLE} WHERE source = ? AND kind = ? AND bucket = ?",
+                (source, kind, bucket),
+            ).fetchone()
+            if stored:
+                cls = SKETCH_KINDS[kind]
+                merged = cls.merge_all([cls.from_bytes(stored[1]), cls.from_bytes(blob)])
+                rows[i] = (bucket, source, kind, n + stored[0], merged.to_bytes())
+    conn.executemany(f"INSERT OR REPLACE INTO {SKETCH_TABLE} VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    return len(rows)
+
+
+def merged_sketch(conn: sqlite3.Connection, source: str, kind: str, start: str, end: str):
+    """Merge of the bucket sketches of one source and kind overlapping [start, end]"""
+    lo = _epoch(start) // SKETCH_BUCKET_SECONDS * SKETCH_BUCKET_SECONDS
+    cursor = conn.execute(
+        f"SELECT data FROM {SKETCH_TABLE} WHERE source = ? AND kind = ? AND bucket BETWEEN ? AND ?",
+        (source, kind, lo, _epoch(end)),
+    )
+    cls = SKETCH_KINDS[kind]
+    sketches = [cls.from_bytes(data) for (data,) in cursor]
+    return cls.merge_all(sketches) if sketches else cls()
+
+
+def approx_distinct(conn: sqlite3.Connection, source: str, start: str, end: str) -> int:
+    return merged_sketch(conn, source, "hll", start, end).count()
+
+
+def approx_top(conn: sqlite3.Connection, source: str, start: str, end: str, limit: int = 10) -> pd.DataFrame:
+    return merged_sketch(conn, source, "topk", start, end).top(limit)
+
+
+def approx_count(conn: sqlite3.Connection, source: str, item: str, start: str, end: str) -> int:
+    return merged_sketch(conn, source, "cms", start, end).estimate(item)
+
+
+def latency_percentiles(conn: sqlite3.Connection, start: str, end: str, dimension: Optional[str] = None,
+                        quantiles: Tuple[float, ...] = (0.5, 0.95, 0.99)) -> pd.DataFrame:
+    """Latency count and quantiles over [start, end], overall or per value of a dimension"""
+    prefix = f"{LATENCY_SOURCE}|{dimension}=" if dimension else LATENCY_SOURCE
+    lo = _epoch(start) // SKETCH_BUCKET_SECONDS * SKETCH_BUCKET_SECONDS
+    cursor = conn.execute(
+        f"SELECT source, data FROM {SKETCH_TABLE} WHERE kind = 'digest' AND bucket BETWEEN ? AND ? "
+        f"AND {'source LIKE ?' if dimension else 'source = ?'}",
+        (lo, _epoch(end), prefix + "%" if dimension else prefix),
+    )
+    grouped: Dict[str, List[LatencyDigest]] = {}
+    for source, data in cursor:
+        grouped.setdefault(source[len(prefix):] if dimension else "all", []).append(LatencyDigest.from_bytes(data))
+    key = dimension or "scope"
+    columns = [key, "count"] + [f"p{round(q * 100)}" for q in quantiles]
+    rows = []
+    for value, digests in grouped.items():
+        digest = LatencyDigest.merge_all(digests)
+        rows.append([value, digest.count] + [digest.quantile(q) for q in quantiles])
+    return pd.DataFrame(rows, columns=columns).sort_values("count", ascending=False, ignore_index=True)
+
+
+def drop_sketches_before(conn: sqlite3.Connection, table: str, cutoff: str) -> int:
+    """Delete a table's sketch buckets older than cutoff, kept in step with row retention"""
+    if not sketches_available(conn):
+        return 0
+    cursor = conn.execute(
+        f"DELETE FROM {SKETCH_TABLE} WHERE source LIKE ? AND bucket < ?", (f"{table}.%", _epoch(cutoff))
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+def rebuild(path: str = DB_PATH) -> int:
+    """Build sketches for every row already in a database"""
+    conn = connect(path)
+    try:
+        frames = {
+            table: pd.read_sql_query(f"SELECT timestamp, {column} FROM {table}", conn)
+            for table, column in SKETCHED_COLUMNS
+        }
+        frames["access_logs"] = pd.read_sql_query("SELECT timestamp, user_id, endpoint, request_id FROM access_logs", conn)
+        frames["execution_logs"] = pd.read_sql_query(
+            "SELECT timestamp, function_name, duration_ms, request_id FROM execution_logs", conn)
+        conn.execute(f"DROP TABLE IF EXISTS {SKETCH_TABLE}")
+        return write_sketches(conn, frames)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the hourly user/IP sketches and latency digests of a log database")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+    print(f"✅ {rebuild(args.db):,} sketches written to '{args.db}'")
+
+
+if __name__ == "__main__":
+    main()
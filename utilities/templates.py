@@ -0,0 +1,398 @@
+"""
+Template fast path: common question shapes get their SQL locally, without an LLM call.
+
+The question is scanned for slots with regexes and a small vocabulary: table,
+metric, group-by column, filters, time window and top-N. Each word has to be
+consumed by a slot or be known filler. If any word is unknown (a year, a
+second entity, "rate"...), the slots point at more than one table, or the question negates something ("not",
+"except", "without"...), there is no match and the question goes to the LLM as
+before.
+
+    >>> match_question("What are the top 5 IP addresses by bytes sent?").sql
+    'SELECT src_ip, SUM(bytes_sent) AS total_bytes FROM vpc_logs GROUP BY src_ip ORDER BY total_bytes DESC LIMIT 5'
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from utilities.arrow_results import result_length, result_rows
+from utilities.cidr import PRIVATE_RANGES, cidr_condition, ip_columns_enabled
+from utilities.db import LOG_COLUMNS
+from utilities.trail import trail_sql
+
+MIN_CONFIDENCE = 1.0  # share of the question's words the slots and filler account for, all of them:
+# a word left over may be a filter (a year, a value) and dropping it would answer another question
+DEFAULT_TOP = 10
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"  # same ISO form as the stored timestamps
+COLUMN_NAMES = {column for columns in LOG_COLUMNS.values() for column in columns}
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+
+# Words naming a column a question can group by or list
+ENTITIES = {
+    "user": ("access_logs", "user_id"), "users": ("access_logs", "user_id"),
+    "endpoint": ("access_logs", "endpoint"), "endpoints": ("access_logs", "endpoint"),
+    "method": ("access_logs", "method"), "methods": ("access_logs", "method"),
+    "function": ("execution_logs", "function_name"), "functions": ("execution_logs", "function_name"),
+    "ip": ("vpc_logs", "src_ip"), "ips": ("vpc_logs", "src_ip"),
+    "address": ("vpc_logs", "src_ip"), "addresses": ("vpc_logs", "src_ip"),
+    "source": ("vpc_logs", "src_ip"), "sources": ("vpc_logs", "src_ip"),
+    "destination": ("vpc_logs", "dst_ip"), "destinations": ("vpc_logs", "dst_ip"),
+}
+# Words that only tell which table is meant
+TABLE_WORDS = {
+    "vpc": "vpc_logs", "connection": "vpc_logs", "connections": "vpc_logs", "packets": "vpc_logs",
+    "traffic": "vpc_logs", "flow": "vpc_logs",
+    "execution": "execution_logs", "executions": "execution_logs", "lambda": "execution_logs",
+    "executed": "execution_logs", "run": "execution_logs", "ran": "execution_logs",
+    "access": "access_logs", "accessed": "access_logs", "login": "access_logs",
+}
+# Measures: word -> (table, column)
+MEASURES = {
+    "duration": ("execution_logs", "duration_ms"), "durations": ("execution_logs", "duration_ms"),
+    "latency": ("execution_logs", "duration_ms"), "bytes": ("vpc_logs", "bytes_sent"),
+    "data": ("vpc_logs", "bytes_sent"), "traffic": ("vpc_logs", "bytes_sent"),
+}
+AGGREGATES = {"average": "AVG", "avg": "AVG", "mean": "AVG", "total": "SUM", "sum": "SUM"}
+EXTREMES = {"longest": "DESC", "slowest": "DESC", "largest": "DESC", "biggest": "DESC",
+            "shortest": "ASC", "fastest": "ASC", "smallest": "ASC"}
+ALIASES = {("SUM", "bytes_sent"): "total_bytes", ("AVG", "bytes_sent"): "avg_bytes",
+           ("SUM", "duration_ms"): "total_duration_ms", ("AVG", "duration_ms"): "avg_duration_ms"}
+# Filters: word -> (table, condition); outcome words depend on the table, resolved later
+ACTION_FILTERS = {
+    "accepted": "action = 'ACCEPT'", "accept": "action = 'ACCEPT'",
+    "rejected": "action = 'REJECT'", "reject": "action = 'REJECT'", "denied": "action = 'REJECT'",
+    "blocked": "action = 'REJECT'", "dropped": "action = 'DROP'",
+}
+OUTCOMES = {"failed": "failed", "failure": "failed", "failures": "failed", "error": "failed",
+            "errors": "failed", "successful": "success", "success": "success", "succeeded": "success"}
+OUTCOME_FILTERS = {
+    ("execution_logs", "failed"): "status = 'FAILED'", ("execution_logs", "success"): "status = 'SUCCESS'",
+    ("access_logs", "failed"): "status_code >= 400", ("access_logs", "success"): "status_code < 400",
+    ("vpc_logs", "failed"): "action IN ('REJECT', 'DROP')", ("vpc_logs", "success"): "action = 'ACCEPT'",
+}
+COUNT_WORDS = {"count", "number"}
+DISTINCT_WORDS = {"distinct", "unique", "different"}
+# Negated filters have no slot, dropping the negation would answer the opposite question
+NEGATION = re.compile(r"\b(?:not|no|never|except|excluding|exclude|without|other than|besides|"
+                      r"dont|doesnt|didnt|isnt|arent|wasnt|werent|havent|hasnt|hadnt|cant|cannot|wont)\b")
+ROW_WORDS = {"show", "list", "get", "find", "display", "give"}
+QUESTION_WORDS = {"which", "what", "who"}
+GROUP_WORDS = {"per", "each", "by"}
+# Word before "containing ..." / "starting with ..." -> (table, column) the pattern applies to
+PATTERN_COLUMNS = {
+    "endpoint": ("access_logs", "endpoint"), "endpoints": ("access_logs", "endpoint"),
+    "path": ("access_logs", "endpoint"), "paths": ("access_logs", "endpoint"),
+    "user": ("access_logs", "user_id"), "users": ("access_logs", "user_id"),
+    "username": ("access_logs", "user_id"), "usernames": ("access_logs", "user_id"),
+    "function": ("execution_logs", "function_name"), "functions": ("execution_logs", "function_name"),
+    "ip": ("vpc_logs", "src_ip"), "ips": ("vpc_logs", "src_ip"),
+    "address": ("vpc_logs", "src_ip"), "addresses": ("vpc_logs", "src_ip"),
+    "source": ("vpc_logs", "src_ip"), "destination": ("vpc_logs", "dst_ip"),
+}
+PATTERN_SHAPES = {"containing": "%{}%", "contains": "%{}%", "contain": "%{}%", "matching": "%{}%",
+                  "like": "%{}%", "starting with": "{}%", "beginning with": "{}%", "ending with": "%{}"}
+FILLER = {
+    "the", "a", "an", "all", "me", "of", "in", "on", "for", "to", "is", "are", "was", "were", "be", "been",
+    "did", "do", "does", "had", "has", "have", "there", "any", "and", "their", "its", "that", "with", "from",
+    "where", "how", "many", "times", "time", "logs", "log", "entries", "records", "rows", "calls", "call",
+    "requests", "request", "id", "status", "code", "sent", "system", "api", "s", "whats", "most", "top",
+    "made", "ever", "so", "far", "please", "invoked", "called", "hits", "hit", "recorded", "seen",
+}
+
+
+class Template(NamedTuple):
+    intent: str  # count, distinct_count, grouped_count, aggregate, extreme, top, distinct, rows, trail
+    sql: str
+    confidence: float
+
+    def answer(self, result) -> str:
+        """Short reply for the result, in place of the LLM summary"""
+        rows = result_length(result)
+        if self.intent == "count":
+            count = result_rows(result, 1)[0][0] if rows else 0
+            return f"There are {count or 0:,} matching records."
+        if self.intent == "distinct_count":
+            count = result_rows(result, 1)[0][0] if rows else 0
+            return f"There are {count or 0:,} distinct values."
+        if not rows:
+            return "No matching records were found."
+        if self.intent == "aggregate" and rows == 1 and len(result_rows(result, 1)[0]) == 1:
+            value = result_rows(result, 1)[0][0]
+            return f"The result is {value:,.2f}." if isinstance(value, float) else f"The result is {value}."
+        return f"Found {rows:,} {'row' if rows == 1 else 'rows'}, shown below."
+
+
+class _Slots:
+    def __init__(self):
+        self.tables = set()
+        self.filters: List[str] = []
+        self.outcome: Optional[str] = None
+        self.entity: Optional[Tuple[str, str]] = None
+        self.counted: Optional[Tuple[str, str]] = None  # entity right after "how many" / "number of"
+        self.rank_by_count = False  # "by number of ..." / "by count", a ranking rather than a count
+        self.exact_status = False  # a status code is given, no success/failure class on top of it
+        self.group: Optional[Tuple[str, str]] = None
+        self.measure: Optional[Tuple[str, str]] = None
+        self.aggregate: Optional[str] = None
+        self.extreme: Optional[str] = None
+        self.limit: Optional[int] = None
+        self.latest = False
+        self.words = set()
+        self.request_id: Optional[str] = None
+        self.unknown = 0
+
+    def where(self, table: str, condition: str) -> None:
+        self.tables.add(table)
+        if condition not in self.filters:
+            self.filters.append(condition)
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _like(slots: _Slots, table: str, column: str, pattern: str) -> None:
+    slots.where(table, f"{column} LIKE {_literal(pattern)}")  # served by the search index when selective
+
+
+def _window(slots: _Slots, start: datetime, end: Optional[datetime] = None) -> None:
+    slots.filters.append(f"timestamp >= '{start:{DATE_FORMAT}}'")
+    if end is not None:
+        slots.filters.append(f"timestamp < '{end:{DATE_FORMAT}}'")
+
+
+def _month(now: datetime, month: int) -> Tuple[datetime, datetime]:
+    year = now.year if month <= now.month else now.year - 1
+    start = datetime(year, month, 1)
+    return start, datetime(year + month // 12, month % 12 + 1, 1)
+
+
+UNITS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1),
+         "week": timedelta(weeks=1)}
+
+
+def _time_slots(now: datetime) -> List[Tuple[str, Callable]]:
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        (r"\btoday\b", lambda m, s: _window(s, midnight)),
+        (r"\byesterday\b", lambda m, s: _window(s, midnight - timedelta(days=1), midnight)),
+        (r"\b(?:in )?(?:the )?(?:last|past) (\d+) (minute|hour|day|week)s?\b",
+         lambda m, s: _window(s, now - int(m.group(1)) * UNITS[m.group(2)])),
+        (r"\b(?:in the |over the )?(?:last|past) (minute|hour|day|week)\b",
+         lambda m, s: _window(s, now - UNITS[m.group(1)])),
+        (r"\bthis week\b", lambda m, s: _window(s, midnight - timedelta(days=now.weekday()))),
+        (r"\bthis month\b", lambda m, s: _window(s, midnight.replace(day=1))),
+        (r"\blast month\b", lambda m, s: _window(s, *_month(now, (now.month - 2) % 12 + 1))),
+        (r"\b(?:in |during )?(?:the month of )?(" + "|".join(MONTHS) + r")\b",
+         lambda m, s: _window(s, *_month(now, MONTHS.index(m.group(1)) + 1))),
+    ]
+
+
+def _set_limit(slots: _Slots, n: int, latest: bool = False) -> None:
+    slots.limit = n
+    slots.latest = latest
+
+
+def _measure(slots: _Slots, table: str, column: str) -> None:
+    slots.measure = (table, column)
+    slots.tables.add(table)
+
+
+def _function_name(m, slots: _Slots) -> None:
+    name = m.group(1)
+    if name in COLUMN_NAMES:
+        slots.unknown += 1  # a column name where a value was expected, not a shape we know
+    else:
+        slots.where("execution_logs", f"function_name = {_literal(name)}")
+
+
+def _pattern(m, slots: _Slots) -> None:
+    before = re.findall(r"\w+", m.string[:m.start()])
+    column = PATTERN_COLUMNS.get(before[-1]) if before else None
+    if column is None:
+        slots.unknown += 1  # a pattern with nothing to apply it to
+    else:
+        _like(slots, *column, PATTERN_SHAPES[m.group(1)].format(m.group(2).rstrip(".")))
+
+
+def _cidr(slots: _Slots, direction: Optional[str], cidrs: List[str]) -> None:
+    column = "dst_ip" if direction in ("destination", "dst", "to") else "src_ip"
+    if ip_columns_enabled():
+        slots.where("vpc_logs", cidr_condition(cidrs, column))
+    else:  # database from before the integer IP columns, one function call per row
+        slots.where("vpc_logs", "(" + " OR ".join(f"IN_CIDR({column}, {_literal(cidr)})" for cidr in cidrs) + ")")
+
+
+def _status_code(slots: _Slots, code: int) -> None:
+    slots.exact_status = True
+    slots.where("access_logs", f"status_code = {code}")
+
+
+def _ip_prefix(m, slots: _Slots) -> None:
+    octets = m.group(2).split(".")
+    _cidr(slots, m.group(1), [".".join(octets + ["0"] * (4 - len(octets))) + f"/{8 * len(octets)}"])
+
+
+# Slot patterns run on the original text, before the word scan; matched spans are removed
+VALUE_SLOTS: List[Tuple[str, Callable]] = [
+    (r"\brequest[ _]?id\s+([\w-]+)|\b(req-[0-9a-f]{8})\b",
+     lambda m, s: setattr(s, "request_id", m.group(1) or m.group(2))),
+    (r"\b(" + "|".join(PATTERN_SHAPES) + r')\s+"?([\w/.-]{3,})"?', _pattern),
+    (r"\b(?:(destination|dst|source|src)(?: ips?)?(?: address(?:es)?)?(?: in| from)?\s+)?"
+     r"(\d{1,3}(?:\.\d{1,3}){0,2})\.(?:\*|%|x)(?![\w.])", _ip_prefix),
+    (r"\b(?:(destination|dst|source|src|to|from)(?: ips?)?(?: address(?:es)?)?(?: in)?\s+)?"
+     r"(?:(?:the )?(?:subnet|network|range|block) )?(\d{1,3}(?:\.\d{1,3}){3}/\d{1,2})(?![\w.])",
+     lambda m, s: _cidr(s, m.group(1), [m.group(2)])),
+    (r"\b(?:(destination|dst|source|src|to|from) )?(?:the )?private "
+     r"(?:subnets?|networks?|ranges?|ip addresses|ips?|addresses)\b",
+     lambda m, s: _cidr(s, m.group(1), list(PRIVATE_RANGES))),
+    (r"\b(destination|dst|source|src)(?: ip)?(?: address)?(?: is| of| =)?\s+(\d{1,3}(?:\.\d{1,3}){3})\b",
+     lambda m, s: s.where("vpc_logs", f"{'dst_ip' if m.group(1) in ('destination', 'dst') else 'src_ip'} = "
+                                      f"{_literal(m.group(2))}")),
+    (r"\b(?:ip(?: address)? )?(\d{1,3}(?:\.\d{1,3}){3})\b",
+     lambda m, s: s.where("vpc_logs", f"src_ip = {_literal(m.group(1))}")),
+    (r"(?:\bthe )?(/[\w/.-]+)(?: endpoint)?",
+     lambda m, s: _like(s, "access_logs", "endpoint", "%" + m.group(1))),
+    (r"\buser(?:[ _]?id)?\s+([a-z]*_?\d+)\b|\b(user_\d+)\b",
+     lambda m, s: s.where("access_logs", f"user_id = {_literal(m.group(1) or m.group(2))}")),
+    (r"\bstatus(?: code)?(?: is| of| =)?\s+(\d{3})\b|\b(\d{3}) status(?: code)?\b",
+     lambda m, s: _status_code(s, int(m.group(1) or m.group(2)))),
+    (r"\btop (\d+)\b", lambda m, s: _set_limit(s, int(m.group(1)))),
+    (r"\b(?:the )?(?:last|latest|most recent) (\d+)\b(?! (?:minute|hour|day|week)s?\b)",
+     lambda m, s: _set_limit(s, int(m.group(1)), latest=True)),
+    (r"\b(?:execution|response|run) ?time\b", lambda m, s: _measure(s, "execution_logs", "duration_ms")),
+    (r"\b([a-z]+_[a-z_]+)\b", _function_name),
+]
+METHOD_SLOT = r"\b(GET|POST|PUT|DELETE|PATCH)\b"  # upper case only, "get me" is not a method
+
+
+def _scan(question: str, now: datetime) -> Tuple[_Slots, float]:
+    """Slots of the question and the share of its words they account for"""
+    slots = _Slots()
+    text = question.replace("’", "'").replace("'", "").strip().rstrip("?.!")
+    if NEGATION.search(text.lower()):
+        return slots, 0.0
+    total = len(re.findall(r"[\w/.-]+", text))
+
+    def consume(pattern: str, apply: Callable, source: str, flags: int = 0) -> str:
+        def replace(m):
+            apply(m, slots)
+            return " "
+        return re.sub(pattern, replace, source, flags=flags)
+
+    text = consume(METHOD_SLOT, lambda m, s: s.where("access_logs", f"method = {_literal(m.group(1))}"), text)
+    text = text.lower()
+    for pattern, apply in _time_slots(now) + VALUE_SLOTS:
+        text = consume(pattern, apply, text)
+
+    unknown = slots.unknown
+    previous = None
+    counting = False  # inside "how many ..." / "number of ..." / "count of ..."
+    for word in re.findall(r"[\w/.-]+", text):
+        slots.words.add(word)
+        if word in ENTITIES:
+            table_column = ENTITIES[word]
+            if previous in GROUP_WORDS:
+                slots.group = table_column
+            elif slots.entity is None or (word in ("destination", "destinations")):
+                slots.entity = table_column
+            elif slots.entity != table_column:
+                unknown += 1  # "users who accessed the admin endpoint": one entity too many for any shape
+            if counting:
+                slots.counted = table_column
+            slots.tables.add(table_column[0])
+        elif word in MEASURES:
+            _measure(slots, *MEASURES[word])
+        elif word in TABLE_WORDS:
+            slots.tables.add(TABLE_WORDS[word])
+            if word == "login":
+                _like(slots, "access_logs", "endpoint", "%/login")
+        elif word in ACTION_FILTERS:
+            slots.where("vpc_logs", ACTION_FILTERS[word])
+        elif word in OUTCOMES:
+            slots.outcome = OUTCOMES[word]
+        elif word in AGGREGATES:
+            slots.aggregate = AGGREGATES[word]
+        elif word in EXTREMES:
+            slots.extreme = EXTREMES[word]
+        elif word == "attempts":
+            slots.tables.add("access_logs")
+        elif not (word in FILLER or word in COUNT_WORDS or word in ROW_WORDS or word in QUESTION_WORDS
+                  or word in GROUP_WORDS or word in DISTINCT_WORDS
+                  or word in ("trail", "full", "details", "associated")):
+            unknown += 1
+        if word in COUNT_WORDS and previous == "by":
+            slots.rank_by_count = True
+        counting = word in COUNT_WORDS or word == "many" or (counting and word in DISTINCT_WORDS | {"of", "the"})
+        previous = word
+    return slots, 1 - unknown / total if total else 0.0
+
+
+def _build(slots: _Slots) -> Optional[Tuple[str, str]]:
+    """(intent, SQL) for the slots, None when they do not form a known shape"""
+    words = slots.words
+    if slots.request_id is not None:
+        if slots.tables or slots.filters or slots.group or slots.aggregate:
+            return None
+        return "trail", trail_sql([slots.request_id])
+    if len(slots.tables) != 1:
+        return None
+    if slots.extreme and not slots.measure:
+        return None  # "which endpoints are slowest" needs a measure the question does not name
+    table = slots.tables.pop()
+    if slots.outcome and not (table == "access_logs" and slots.exact_status):
+        slots.filters.append(OUTCOME_FILTERS[(table, slots.outcome)])
+    where = f" WHERE {' AND '.join(slots.filters)}" if slots.filters else ""
+    entity = slots.group or slots.entity
+    measure = slots.measure[1] if slots.measure else None
+    top = slots.limit if slots.limit and not slots.latest else None
+
+    if (words & COUNT_WORDS or {"how", "many"} <= words) and not (slots.rank_by_count and entity):
+        if slots.group:
+            column = slots.group[1]
+            return "grouped_count", (f"SELECT {column}, COUNT(*) AS count FROM {table}{where} GROUP BY {column} "
+                                     f"ORDER BY count DESC" + (f" LIMIT {top}" if top else ""))
+        if slots.counted:
+            column = slots.counted[1]
+            return "distinct_count", f"SELECT COUNT(DISTINCT {column}) AS count FROM {table}{where}"
+        return "count", f"SELECT COUNT(*) AS count FROM {table}{where}"
+    if slots.aggregate and measure:
+        alias = ALIASES[(slots.aggregate, measure)]
+        if entity:
+            column = entity[1]
+            return "aggregate", (f"SELECT {column}, {slots.aggregate}({measure}) AS {alias} FROM {table}{where} "
+                                 f"GROUP BY {column} ORDER BY {alias} DESC" + (f" LIMIT {top}" if top else ""))
+        return "aggregate", f"SELECT {slots.aggregate}({measure}) AS {alias} FROM {table}{where}"
+    if slots.extreme and measure:
+        columns = f"{entity[1]}, {measure}" if entity else ", ".join(LOG_COLUMNS[table])
+        return "extreme", f"SELECT {columns} FROM {table}{where} ORDER BY {measure} {slots.extreme} LIMIT {top or 1}"
+    if ("most" in words or "top" in words or top or slots.rank_by_count) and entity:
+        column = entity[1]
+        if measure == "bytes_sent":
+            return "top", (f"SELECT {column}, SUM(bytes_sent) AS total_bytes FROM {table}{where} GROUP BY {column} "
+                           f"ORDER BY total_bytes DESC LIMIT {top or DEFAULT_TOP}")
+        if measure:
+            return None  # "most duration" has no single reading
+        return "top", (f"SELECT {column}, COUNT(*) AS count FROM {table}{where} GROUP BY {column} "
+                       f"ORDER BY count DESC LIMIT {top or DEFAULT_TOP}")
+    if words & QUESTION_WORDS and entity and not words & ROW_WORDS:
+        return "distinct", f"SELECT DISTINCT {entity[1]} FROM {table}{where}"
+    if words & ROW_WORDS or words & QUESTION_WORDS:
+        order = f" ORDER BY timestamp DESC LIMIT {slots.limit}" if slots.latest else ""
+        # The log columns only, not the integer IP copies
+        return "rows", f"SELECT {', '.join(LOG_COLUMNS[table])} FROM {table}{where}{order}"
+    return None
+
+
+def match_question(question: str, now: Optional[datetime] = None,
+                   min_confidence: float = MIN_CONFIDENCE) -> Optional[Template]:
+    """SQL for a recognised question shape, None when the LLM should write the query"""
+    slots, confidence = _scan(question, now or datetime.now())
+    if confidence < min_confidence:
+        return None
+    built = _build(slots)
+    if built is None:
+        return None
+    return Template(built[0], built[1], round(confidence, 3))
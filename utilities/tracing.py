@@ -0,0 +1,165 @@
+"""
+Lightweight span tracing for the chat pipeline.
+
+Spans are buffered per trace and written to a local SQLite table in one
+transaction when the trace ends, so the hot path only pays for a
+perf_counter call and a list append. The table is opened, created and
+migrated once per process; later traces reuse that connection.
+
+    with trace("chat"):
+        with span("sql_generation"):
+            ...
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+TRACE_DB = "traces.db"
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"  # ISO with a "T", like the log timestamps and the dashboard's window bounds
+SCHEMA_VERSION = 1  # PRAGMA user_version; 1: started_at in TIME_FORMAT
+STAGES = (
+    "trail_lookup", "relevance", "template_match", "schema_fetch", "sql_generation", "sql_execution",
+    "summary", "dataframe_build", "chart_build",
+)
+RERUN_STAGE = "chat_rerun"  # chat history render after a question, recorded outside any trace
+
+# (trace_id, buffered span rows) of the trace running in this context
+_current: ContextVar[Optional[tuple]] = ContextVar("logbot_trace", default=None)
+_connections: Dict[str, sqlite3.Connection] = {}  # path -> open, migrated connection of this process
+_lock = threading.Lock()  # held while using one of them, the Streamlit sessions share it
+
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS spans (
+            trace_id TEXT,
+            stage TEXT,
+            started_at TEXT,
+            duration_ms REAL,
+            attrs TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_started_at ON spans(started_at)")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        # Spans written before were "YYYY-MM-DD HH:MM:SS", which sorts before the "T" bounds of the same day
+        conn.execute("UPDATE spans SET started_at = REPLACE(started_at, ' ', 'T') WHERE started_at LIKE '% %'")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    return conn
+
+
+def _connect(path: Optional[str] = None) -> sqlite3.Connection:
+    """The process's connection to the trace database, opened and migrated on first use; call under _lock"""
+    path = path or TRACE_DB
+    if path not in _connections:
+        _connections[path] = _open(path)
+    return _connections[path]
+
+
+def _discard(path: Optional[str] = None) -> None:
+    """Drop a failed connection, the next use reopens it and recreates the table if the file was removed"""
+    conn = _connections.pop(path or TRACE_DB, None)
+    if conn is not None:
+        conn.close()
+
+
+def _flush(rows: List[tuple], path: Optional[str] = None) -> None:
+    if not rows:
+        return
+    with _lock:
+        try:
+            conn = _connect(path)
+            with conn:
+                conn.executemany("INSERT INTO spans VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:  # tracing must never break a user request
+            _discard(path)
+            print(f"Tracing write failed: {e}")
+
+
+@contextmanager
+def trace(name: str = "chat"):
+    """Group the spans recorded inside the block and persist them when it exits"""
+    trace_id = f"{name}-{uuid.uuid4().hex[:12]}"
+    rows = []
+    token = _current.set((trace_id, rows))
+    try:
+        yield trace_id
+    finally:
+        _current.reset(token)
+        _flush(rows)
+
+
+def record(stage: str, duration_ms: float, started_at: Optional[datetime] = None, **attrs) -> None:
+    """Record an already measured span, standalone spans are written straight away"""
+    started_at = started_at or datetime.now()
+    current = _current.get()
+    trace_id = current[0] if current else f"span-{uuid.uuid4().hex[:12]}"
+    row = (trace_id, stage, started_at.strftime(TIME_FORMAT), duration_ms,
+           json.dumps(attrs, default=str) if attrs else None)
+    if current:
+        current[1].append(row)
+    else:
+        _flush([row])
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Time the block as one stage; the yielded dict can be filled with extra attributes"""
+    started_at = datetime.now()
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record(stage, (time.perf_counter() - start) * 1000, started_at, **attrs)
+
+
+def load_spans(start: Optional[str] = None, end: Optional[str] = None, path: Optional[str] = None) -> pd.DataFrame:
+    """Spans started inside [start, end] as a DataFrame; the bounds may use a space or a "T" separator"""
+    with _lock:
+        try:
+            return pd.read_sql_query(
+                "SELECT * FROM spans WHERE started_at BETWEEN ? AND ?",
+                _connect(path),
+                params=((start or "0000").replace(" ", "T"), (end or "9999").replace(" ", "T")),
+            )
+        except (sqlite3.Error, pd.errors.DatabaseError):
+            _discard(path)
+            raise
+
+
+def stage_percentiles(spans: pd.DataFrame) -> pd.DataFrame:
+    """Count, p50, p95 and p99 latency (ms) per stage"""
+    if spans.empty:
+        return pd.DataFrame(columns=["stage", "count", "p50_ms", "p95_ms", "p99_ms"])
+    grouped = spans.groupby("stage")["duration_ms"]
+    stats = pd.DataFrame({
+        "count": grouped.size(),
+        "p50_ms": grouped.quantile(0.50),
+        "p95_ms": grouped.quantile(0.95),
+        "p99_ms": grouped.quantile(0.99),
+    }).reset_index()
+    order = {stage: i for i, stage in enumerate(STAGES)}
+    return stats.sort_values("stage", key=lambda s: s.map(lambda x: order.get(x, len(order)))).reset_index(drop=True)
+
+
+def rerun_by_turns(spans: pd.DataFrame) -> pd.DataFrame:
+    """Median and p95 chat history render time (ms) after a question, per number of turns in the history"""
+    reruns = spans[spans["stage"] == RERUN_STAGE]
+    if reruns.empty:
+        return pd.DataFrame(columns=["turns", "reruns", "p50_ms", "p95_ms"])
+    turns = reruns["attrs"].map(lambda a: json.loads(a).get("turns") if a else None)
+    grouped = reruns.assign(turns=turns).dropna(subset=["turns"]).groupby("turns")["duration_ms"]
+    return pd.DataFrame({
+        "reruns": grouped.size(),
+        "p50_ms": grouped.quantile(0.50),
+        "p95_ms": grouped.quantile(0.95),
+    }).reset_index()
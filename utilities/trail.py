@@ -0,0 +1,142 @@
+"""
+Request trail lookup: every access, execution and VPC row of some request ids.
+
+Each log table gets a covering index led by request_id, so a lookup reads
+only index pages, no table rows and no scans. Ids are passed as one JSON
+array parameter, so one lookup handles one id or thousands.
+
+    python -m utilities.trail --db logs2.db req-118ab9fe req-fc133d2e
+    python -m utilities.trail --db logs2.db --index     # build the indexes on an existing database
+"""
+import argparse
+import json
+import re
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from utilities.arrow_results import query_dataframe
+from utilities.db import DB_PATH, LOG_COLUMNS, LOG_TABLES, SHARD_DIR, connect
+from utilities.dictionary import storage_table, stored_columns
+
+REQUEST_ID_PATTERN = re.compile(r"\breq-[0-9a-f]{8}\b", re.IGNORECASE)
+TRAIL_COLUMNS = ["request_id", "source", "timestamp", "actor", "detail", "outcome"]
+# Words that, next to request ids, still ask for nothing more than their trail
+TRAIL_WORDS = {"show", "the", "full", "request", "requests", "trail", "trace", "for", "of", "id", "ids", "lookup",
+               "look", "up", "find", "details", "and", "me", "get", "what", "happened", "to", "with", "all",
+               "these", "those", "both", "or"}
+
+TRAIL_SQL = """
+SELECT request_id, 'access' AS source, timestamp, user_id AS actor, method || ' ' || endpoint AS detail,
+       CAST(status_code AS TEXT) AS outcome
+FROM access_logs WHERE request_id IN (SELECT value FROM json_each(?1))
+UNION ALL
+SELECT request_id, 'execution', timestamp, function_name, CAST(duration_ms AS TEXT) || ' ms', status
+FROM execution_logs WHERE request_id IN (SELECT value FROM json_each(?1))
+UNION ALL
+SELECT request_id, 'vpc', timestamp, src_ip, dst_ip || ' (' || bytes_sent || ' bytes)', action
+FROM vpc_logs WHERE request_id IN (SELECT value FROM json_each(?1))
+ORDER BY request_id, timestamp
+"""
+
+
+def index_name(table: str) -> str:
+    return f"idx_{table}_request"
+
+
+def ensure_trail_indexes(conn: sqlite3.Connection) -> None:
+    """Covering (request_id, timestamp, other columns) index on each log table present, codes if encoded"""
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in LOG_TABLES:
+        stored = storage_table(conn, table)
+        if stored not in present:
+            continue
+        rest = [c for c in LOG_COLUMNS[table] if c not in ("request_id", "timestamp")]
+        columns = ", ".join(stored_columns(conn, table, ["request_id", "timestamp", *rest]))
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name(table)} ON {stored}({columns})")
+    conn.commit()
+
+
+def find_request_ids(text: str) -> List[str]:
+    """Distinct req-xxxxxxxx tokens in the text, in order of appearance"""
+    return list(dict.fromkeys(m.lower() for m in REQUEST_ID_PATTERN.findall(text)))
+
+
+def trail_question(text: str) -> Optional[List[str]]:
+    """The request ids when a chat message asks only for their trail, None otherwise"""
+    ids = find_request_ids(text)
+    if not ids:
+        return None
+    rest = set(re.findall(r"[a-z]+", REQUEST_ID_PATTERN.sub(" ", text).lower()))
+    return ids if rest <= TRAIL_WORDS else None  # "which of req-a and req-b failed?" is a question for the LLM
+
+
+def trail_sql(request_ids: Iterable[str]) -> str:
+    """TRAIL_SQL with the ids inlined, for callers that run SQL text without parameters"""
+    ids = json.dumps(list(request_ids)).replace("'", "''")
+    return TRAIL_SQL.replace("?1", f"'{ids}'")
+
+
+def lookup(conn: sqlite3.Connection, request_ids: Iterable[str]) -> pd.DataFrame:
+    """TRAIL_COLUMNS rows of the given ids, grouped by id and in time order"""
+    return query_dataframe(conn, TRAIL_SQL, (json.dumps(list(request_ids)),))
+
+
+def lookup_sharded(shard_dir: str, request_ids: Iterable[str]) -> pd.DataFrame:
+    """Same as lookup, over every shard in parallel; request ids carry no date to route on"""
+    from utilities.shards import fan_out
+    frames = [f for f in fan_out(shard_dir, TRAIL_SQL, (json.dumps(list(request_ids)),)) if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=TRAIL_COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values(["request_id", "timestamp"], ignore_index=True)
+
+
+def request_trail(request_ids: Iterable[str], path: str = DB_PATH) -> pd.DataFrame:
+    """Trail of the ids from the app's database, or its shards in sharded mode"""
+    if SHARD_DIR:
+        return lookup_sharded(SHARD_DIR, request_ids)
+    conn = connect(path, read_only=True)
+    try:
+        return lookup(conn, request_ids)
+    finally:
+        conn.close()
+
+
+def describe(trail: pd.DataFrame, request_ids: List[str]) -> str:
+    """One-line chat answer for a trail"""
+    if trail.empty:
+        return f"No log entries were found for {', '.join(request_ids[:5])}{'...' if len(request_ids) > 5 else ''}."
+    if len(request_ids) == 1:
+        sources = ", ".join(trail["source"].drop_duplicates())
+        return (f"Request {request_ids[0]} has {len(trail)} log entries ({sources}) "
+                f"from {trail['timestamp'].min()} to {trail['timestamp'].max()}.")
+    found = trail["request_id"].nunique()
+    return f"Found {len(trail):,} log entries for {found:,} of the {len(request_ids):,} request IDs."
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Look up the full log trail of request ids")
+    parser.add_argument("request_ids", nargs="*")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--index", action="store_true", help="create the request_id indexes first")
+    args = parser.parse_args(argv)
+
+    if args.index:
+        started = time.perf_counter()
+        conn = connect(args.db)
+        try:
+            ensure_trail_indexes(conn)
+        finally:
+            conn.close()
+        print(f"✅ request_id indexes ready on '{args.db}' in {time.perf_counter() - started:.1f}s")
+    if args.request_ids:
+        started = time.perf_counter()
+        trail = request_trail(args.request_ids, args.db)
+        print(trail.to_string(index=False))
+        print(f"\n{describe(trail, args.request_ids)} ({(time.perf_counter() - started) * 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()